@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Encode/decode benchmark for the conductor message codecs.
+
+Times turning typical messages into frame bodies and back, without any
+socket I/O, for the current JSON and binary codecs and for the two JSON
+envelopes used before the protocol modules were merged: json_protocol's
+{"version", "type", "data"} with default separators, and protocol.py's
+compact {"version", "type", "payload"}.
+
+Usage: python benchmarks/bench_codec.py [--seconds N]
+"""
+
+import argparse
+import json
+import time
+
+from conductor import binary_codec
+from conductor.json_protocol import (
+    CODEC_BINARY,
+    CODEC_JSON,
+    MSG_PHASE,
+    MSG_RESULT,
+    MSG_RESULTS,
+    _decode_payload,
+    _encode_frames,
+)
+
+MESSAGES = {
+    "result": (MSG_RESULT, {"code": 0, "message": "phase received"}),
+    "phase": (
+        MSG_PHASE,
+        {
+            "resulthost": "10.0.0.1",
+            "resultport": 6971,
+            "steps": [
+                {"command": f"iperf3 -c 10.0.0.{i} -t 10", "spawn": False, "timeout": 30}
+                for i in range(20)
+            ],
+        },
+    ),
+    "results batch": (
+        MSG_RESULTS,
+        {
+            "results": [
+                {"code": 0, "message": f"tcp 0 0 10.0.0.1:{i} 10.0.0.2:22 ESTABLISHED\n" * 4}
+                for i in range(500)
+            ]
+        },
+    ),
+}
+
+
+def legacy_data(msg_type, data):
+    body = json.dumps({"version": 1, "type": msg_type, "data": data}).encode("utf-8")
+    message = json.loads(body.decode("utf-8"))
+    return message["type"], message["data"]
+
+
+def legacy_payload(msg_type, data):
+    body = json.dumps(
+        {"version": 1, "type": msg_type, "payload": data}, separators=(",", ":")
+    ).encode("utf-8")
+    message = json.loads(body.decode("utf-8"))
+    return message["type"], message["payload"]
+
+
+def current(codec):
+    def round_trip(msg_type, data):
+        [(header, body)] = _encode_frames(msg_type, data, codec=codec)
+        if len(header) > 4:
+            body = header[4:] + bytes(body)
+        return _decode_payload(body)
+
+    return round_trip
+
+
+CODECS = [
+    ("legacy data", legacy_data),
+    ("legacy payload", legacy_payload),
+    ("json", current(CODEC_JSON)),
+    ("binary", current(CODEC_BINARY)),
+]
+
+
+def measure(round_trip, msg_type, data, seconds):
+    """Return microseconds per encode/decode round trip."""
+    assert round_trip(msg_type, data) == (msg_type, data)
+    count = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(count):
+            round_trip(msg_type, data)
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return elapsed / count * 1e6
+        count = max(count * 2, int(count * seconds / max(elapsed, 1e-6)))
+
+
+def body_size(name, msg_type, data):
+    if name == "binary":
+        return len(binary_codec.encode_message(1, msg_type, data)) + 1
+    if name == "legacy data":
+        return len(json.dumps({"version": 1, "type": msg_type, "data": data}))
+    [(_, body)] = _encode_frames(msg_type, data)
+    return len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--seconds",
+        type=float,
+        default=0.5,
+        help="Approximate time to spend per measurement (default: 0.5)",
+    )
+    args = parser.parse_args()
+
+    print(f"{'message':>14} {'codec':>15} {'bytes':>8} {'us/round trip':>14}")
+    for label, (msg_type, data) in MESSAGES.items():
+        for name, round_trip in CODECS:
+            size = body_size(name, msg_type, data)
+            usec = measure(round_trip, msg_type, data, args.seconds)
+            print(f"{label:>14} {name:>15} {size:>8} {usec:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Receive-path throughput benchmark for the conductor wire framing.
+
+Streams length-prefixed frames of 1 KB to 10 MB over a local socket pair
+and reports how fast the receiver reassembles them, for the current
+json_protocol._recv_exactly and for the previous 4 KB "data += chunk"
+loop kept here as a baseline.
+
+Usage: python benchmarks/bench_framing.py [--seconds N]
+"""
+
+import argparse
+import socket
+import struct
+import threading
+import time
+
+from conductor.json_protocol import _recv_exactly, _send_frame
+
+SIZES = [1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024]
+
+
+def legacy_recv_exactly(sock, length):
+    """The original receive loop: 4 KB reads appended to an immutable bytes."""
+    data = b""
+    while len(data) < length:
+        chunk = sock.recv(min(4096, length - len(data)))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def sender(sock, payload, count):
+    header = struct.pack("!I", len(payload))
+    for _ in range(count):
+        _send_frame(sock, header, payload)
+
+
+def measure(recv_exactly, size, seconds):
+    """Return (frames, MB/s) received with recv_exactly for frames of size."""
+    payload = b"x" * size
+    # Estimate how many frames fit in the time budget from one warm-up frame
+    count = 1
+    while True:
+        a, b = socket.socketpair()
+        thread = threading.Thread(target=sender, args=(a, payload, count))
+        start = time.perf_counter()
+        thread.start()
+        for _ in range(count):
+            length = struct.unpack("!I", recv_exactly(b, 4))[0]
+            recv_exactly(b, length)
+        elapsed = time.perf_counter() - start
+        thread.join()
+        a.close()
+        b.close()
+        if elapsed >= seconds or count >= 100000:
+            return count, (size * count) / elapsed / (1024 * 1024)
+        count = max(count * 2, int(count * seconds / max(elapsed, 1e-6)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--seconds",
+        type=float,
+        default=1.0,
+        help="Approximate time to spend per measurement (default: 1.0)",
+    )
+    args = parser.parse_args()
+
+    print(f"{'frame size':>12} {'legacy MB/s':>14} {'current MB/s':>14} {'speedup':>8}")
+    for size in SIZES:
+        _, legacy = measure(legacy_recv_exactly, size, args.seconds)
+        _, current = measure(_recv_exactly, size, args.seconds)
+        print(f"{size:>12} {legacy:>14.1f} {current:>14.1f} {current / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Step launch latency benchmark for direct exec and /bin/sh.
+
+Runs short steps ("date" by default) back to back through Step.run()
+and Step.async_run(), once exec'd directly and once through the shell
+as every step used to be, and reports the mean and median time per
+step.  --heap-mb grows the benchmark's own heap first, to show that
+launch time does not depend on the size of the player process.
+
+Usage: python benchmarks/bench_launch.py [--steps N] [--heap-mb N] [--command CMD]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+from conductor.step import Step
+
+
+def launch_times(step, steps, engine_async):
+    """Return the wall time of each of steps runs of step, in seconds."""
+    times = []
+    # Step prints every result; keep that out of the timings' output
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(steps):
+            start = time.perf_counter()
+            if engine_async:
+                asyncio.run(step.async_run())
+            else:
+                step.run()
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--steps",
+        type=int,
+        default=200,
+        help="Steps to run per measurement (default: 200)",
+    )
+    parser.add_argument(
+        "--heap-mb",
+        type=int,
+        default=0,
+        help="Megabytes of heap to allocate before measuring (default: 0)",
+    )
+    parser.add_argument(
+        "--command",
+        default="date",
+        help="Step command to launch; must need no shell (default: date)",
+    )
+    args = parser.parse_args()
+
+    # Many small objects, like buffered results, rather than one block
+    ballast = [bytearray(1024) for _ in range(args.heap_mb * 1024)]
+
+    direct = Step(args.command)
+    if direct.shell:
+        parser.error(f"{args.command!r} needs a shell, so has no direct path")
+    shell = Step(args.command)
+    shell.shell = True
+
+    print(f"{args.command!r}, {args.steps} steps, {len(ballast)} KB of ballast")
+    print(
+        f"{'engine':>8} {'path':>8} {'mean ms':>9} {'median ms':>10} {'speedup':>8}"
+    )
+    for engine_async, engine in ((False, "thread"), (True, "asyncio")):
+        baseline = None
+        for path, step in (("shell", shell), ("direct", direct)):
+            times = launch_times(step, args.steps, engine_async)
+            mean = statistics.mean(times) * 1000
+            median = statistics.median(times) * 1000
+            baseline = baseline or mean
+            print(
+                f"{engine:>8} {path:>8} {mean:>9.3f} {median:>10.3f}"
+                f" {baseline / mean:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Capability negotiation for conductor control sessions.
+
+When a session opens the conductor sends MSG_HELLO with an offer of
+everything it can do: the protocol versions it speaks, its codecs and
+compression algorithms in order of preference, whether it understands
+batched results, raw streams, uploaded trial plans and request IDs,
+and the largest frame it accepts.  The player answers with the single feature set both
+sides will use.
+
+Offers and answers are plain dicts so that they travel as ordinary
+message data.  Fields a peer does not send are treated as unsupported,
+which keeps older peers on the plain JSON behaviour they already have:
+
+    offer    {"versions": [1], "codecs": [...], "compression": [...],
+              "batching": true, "streaming": true, "plans": true,
+              "request_ids": true, "max_frame_size": n, "heartbeat_interval": seconds}
+    answer   {"version": 1, "codec": "...", "compression": "...",
+              "batching": bool, "streaming": bool, "plans": bool,
+              "request_ids": bool, "max_frame_size": n, "heartbeat_interval": seconds}
+"""
+
+from typing import Any, Dict, Optional
+
+from conductor.json_protocol import (
+    PROTOCOL_VERSION,
+    ProtocolError,
+    CODEC_JSON,
+    SUPPORTED_CODECS,
+    COMPRESS_NONE,
+    SUPPORTED_COMPRESSION,
+    DEFAULT_COMPRESS_THRESHOLD,
+)
+
+# Protocol versions this implementation can speak
+SUPPORTED_VERSIONS = [PROTOCOL_VERSION]
+
+# Optional behaviours that are simply on or off for a session
+FEATURES = ["batching", "streaming", "plans", "request_ids"]
+
+# How often a busy player reports in, and how many reports may be missed
+# before the conductor gives up on it
+DEFAULT_HEARTBEAT_INTERVAL = 1.0
+DEFAULT_HEARTBEAT_MISSES = 3
+
+
+def _preferred_first(preferred: str, supported: list) -> list:
+    return [preferred] + [item for item in supported if item != preferred]
+
+
+def make_offer(
+    codec: str = CODEC_JSON,
+    compression: str = COMPRESS_NONE,
+    max_frame_size: Optional[int] = None,
+    heartbeat_interval: Optional[float] = None,
+    stream_output: bool = False,
+) -> Dict[str, Any]:
+    """Build the conductor's MSG_HELLO data.
+
+    The preferred codec and compression are listed first.  Compression
+    is only offered when it is enabled, so a conductor that wants
+    uncompressed traffic never receives compressed replies.  With
+    heartbeat_interval set the player is asked to send MSG_HEARTBEAT
+    that often (in seconds) while a phase runs, and with stream_output
+    to send step output line by line in MSG_OUTPUT as it is produced.
+    """
+    hello = {
+        "versions": list(SUPPORTED_VERSIONS),
+        "codecs": _preferred_first(codec, SUPPORTED_CODECS),
+        "compression": [],
+    }
+    if compression != COMPRESS_NONE:
+        hello["compression"] = _preferred_first(compression, SUPPORTED_COMPRESSION)
+    for feature in FEATURES:
+        hello[feature] = True
+    if max_frame_size:
+        hello["max_frame_size"] = max_frame_size
+    if heartbeat_interval:
+        hello["heartbeat_interval"] = heartbeat_interval
+    if stream_output:
+        hello["stream_output"] = True
+    return hello
+
+
+def agree(
+    offer: Dict[str, Any],
+    compression: str = COMPRESS_NONE,
+    max_frame_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Choose the player's answer to an offer.
+
+    The newest common protocol version is used, with the first offered
+    codec we support.  Our own compression setting wins if the
+    conductor accepts it, otherwise the conductor's first choice that
+    we support is used.  A requested heartbeat interval is accepted as
+    is, and so is a request for streamed output.  Raises ProtocolError
+    when there is no common protocol version.
+    """
+    offered = offer.get("versions", [PROTOCOL_VERSION])
+    versions = [v for v in offered if v in SUPPORTED_VERSIONS]
+    if not versions:
+        raise ProtocolError(
+            f"No common protocol version: offered {offered}, "
+            f"supported {SUPPORTED_VERSIONS}"
+        )
+
+    codec = next(
+        (c for c in offer.get("codecs", []) if c in SUPPORTED_CODECS), CODEC_JSON
+    )
+
+    accepted = [c for c in offer.get("compression", []) if c in SUPPORTED_COMPRESSION]
+    if compression == COMPRESS_NONE or not accepted:
+        chosen = COMPRESS_NONE
+    elif compression in accepted:
+        chosen = compression
+    else:
+        chosen = accepted[0]
+
+    answer = {"version": max(versions), "codec": codec, "compression": chosen}
+    for feature in FEATURES:
+        answer[feature] = offer.get(feature) is True
+    if max_frame_size:
+        answer["max_frame_size"] = max_frame_size
+    interval = offer.get("heartbeat_interval")
+    if type(interval) in (int, float) and interval > 0:
+        answer["heartbeat_interval"] = interval
+    if offer.get("stream_output") is True:
+        answer["stream_output"] = True
+    return answer
+
+
+def wire_settings(
+    agreed: Dict[str, Any],
+    peer_max_frame_size: Optional[int] = None,
+    max_frame_size: Optional[int] = None,
+    compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+) -> Dict[str, Any]:
+    """Turn an agreed feature set into send_message keyword arguments.
+
+    Messages larger than the peer's frame limit (or our own, if lower)
+    are sent as fragments.
+    """
+    wire = {}
+    if agreed.get("codec") in SUPPORTED_CODECS:
+        wire["codec"] = agreed["codec"]
+    if agreed.get("compression") in SUPPORTED_COMPRESSION:
+        wire["compression"] = agreed["compression"]
+        wire["compress_threshold"] = compress_threshold
+    if peer_max_frame_size:
+        wire["fragment_size"] = min(
+            peer_max_frame_size, max_frame_size or peer_max_frame_size
+        )
+    return wire
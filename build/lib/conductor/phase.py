@@ -0,0 +1,190 @@
+# Copyright (c) 2014, Neville-Neil Consulting
+# Copyright (c) 2025, Ben Roeder
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Author: George V. Neville-Neil
+# Current Maintainer: Ben Roeder
+#
+# Description: A Phase object encapsulates a set of Steps to be taken
+# by the Client when asked by the Conductor.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from conductor import retval
+from conductor.json_protocol import send_message, MSG_RESULTS
+
+# Ways a player can execute a phase's steps
+ENGINE_THREAD = "thread"
+ENGINE_ASYNCIO = "asyncio"
+ENGINES = [ENGINE_THREAD, ENGINE_ASYNCIO]
+
+# Per-result allowance for the JSON envelope when sizing result batches
+_RESULT_OVERHEAD = 32
+
+
+class Phase:
+    """Each Phase contains one, or more, steps."""
+
+    def __init__(self, resulthost, resultport, max_parallel=None, name=None):
+        self.resulthost = resulthost
+        self.resultport = resultport
+        # startup, run, collect or reset, when the conductor says which
+        self.name = name
+        # Most steps of a parallel group that may run at once (None: all)
+        self.max_parallel = max_parallel
+        self.steps = []
+        self.results = []
+
+    def append(self, step):
+        self.steps.append(step)
+
+    def groups(self):
+        """Split the steps into runs of steps that execute together
+
+        Consecutive steps with the same group run concurrently; steps
+        without a group run alone, in order.
+        """
+        runs = []
+        for step in self.steps:
+            if runs and step.group is not None and runs[-1][0].group == step.group:
+                runs[-1].append(step)
+            else:
+                runs.append([step])
+        return runs
+
+    def run(self, output=None, spool=None, spawned=None, cancel=None):
+        """Execute all the steps, keeping results in declaration order
+
+        With an output callback, every line of step output is passed to
+        output(index, stream, line) as it is produced, index being the
+        step's position in the phase.  With an OutputSpool, each step's
+        stdout is written to a spool file of its own, and spawned steps
+        are tracked in the SpawnRegistry given as spawned.
+
+        Once the Cancellation given as cancel is cancelled, no further
+        steps start, and only the steps that ran have results.
+        """
+        for steps in self.groups():
+            if cancel is not None and cancel.cancelled:
+                return
+            first = len(self.results)
+
+            def run_step(i):
+                if cancel is not None and cancel.cancelled:
+                    return None
+                return steps[i].run(
+                    **self._step_args(first + i, output, spool, spawned, cancel)
+                )
+
+            if len(steps) == 1:
+                results = [run_step(0)]
+            else:
+                workers = min(self.max_parallel or len(steps), len(steps))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(run_step, range(len(steps))))
+            self.results.extend(result for result in results if result is not None)
+
+    async def async_run(self, output=None, spool=None, spawned=None, cancel=None):
+        """Execute all the steps as coroutines, like run()
+
+        A parallel group's steps share the event loop instead of a
+        thread pool, with a semaphore enforcing max_parallel.
+        """
+        for steps in self.groups():
+            if cancel is not None and cancel.cancelled:
+                return
+            first = len(self.results)
+            limit = asyncio.Semaphore(self.max_parallel or len(steps))
+
+            async def run_step(i):
+                async with limit:
+                    if cancel is not None and cancel.cancelled:
+                        return None
+                    return await steps[i].async_run(
+                        **self._step_args(first + i, output, spool, spawned, cancel)
+                    )
+
+            if len(steps) == 1:
+                results = [await run_step(0)]
+            else:
+                results = await asyncio.gather(*map(run_step, range(len(steps))))
+            self.results.extend(result for result in results if result is not None)
+
+    @staticmethod
+    def _step_args(index, output, spool, spawned, cancel=None):
+        """Return the arguments passing a step's output on, if wanted"""
+        args = {}
+        if output is not None:
+            args["output"] = lambda stream, line: output(index, stream, line)
+        if spool is not None:
+            args["spool"] = spool
+        if spawned is not None:
+            args["spawned"] = spawned
+        if cancel is not None:
+            args["cancel"] = cancel
+        return args
+
+    def execute(
+        self, engine=ENGINE_THREAD, output=None, spool=None, spawned=None, cancel=None
+    ):
+        """Run the phase with the given execution engine"""
+        if engine == ENGINE_ASYNCIO:
+            asyncio.run(self.async_run(output, spool, spawned, cancel))
+        else:
+            self.run(output, spool, spawned, cancel)
+
+    def return_results(self, sock, max_batch_bytes=None, **wire):
+        """Return the results of the steps over the conductor's session
+
+        With max_batch_bytes set, results are packed into MSG_RESULTS
+        frames of roughly that many bytes each, with the DONE marker as
+        the final entry of the last batch.  Otherwise every result is
+        sent as its own frame, followed by a separate DONE frame.  Any
+        other keyword arguments (e.g. codec) are passed to send_message.
+        """
+        done = retval.RetVal(retval.RETVAL_DONE, "phases complete")
+        if max_batch_bytes is None:
+            for result in self.results:
+                result.send(sock, **wire)
+            done.send(sock, **wire)
+            return
+
+        batch = []
+        batch_bytes = 0
+        for result in self.results + [done]:
+            size = len(result.message) + _RESULT_OVERHEAD
+            if batch and batch_bytes + size > max_batch_bytes:
+                send_message(sock, MSG_RESULTS, {"results": batch}, **wire)
+                batch = []
+                batch_bytes = 0
+            batch.append(result.to_dict())
+            batch_bytes += size
+        send_message(sock, MSG_RESULTS, {"results": batch}, **wire)
@@ -0,0 +1,196 @@
+"""Object-level interface to the conductor wire protocol.
+
+Messages are framed and encoded by conductor.json_protocol; this module
+adds the Message class and converters between conductor objects and
+message data.
+WARNING: No encryption - use only on private networks.
+"""
+
+import json
+import socket
+from enum import Enum
+from typing import Dict, Any
+
+from conductor.json_protocol import (
+    ProtocolError,
+    encode_json_message,
+    send_message,
+    receive_message,
+    MSG_PHASE,
+    MSG_RUN,
+    MSG_CONFIG,
+    MSG_RESULT,
+    MSG_ERROR,
+)
+
+
+class MessageType(Enum):
+    """Types of messages in the conductor protocol."""
+
+    PHASE = MSG_PHASE
+    RUN = MSG_RUN
+    CONFIG = MSG_CONFIG
+    RESULT = MSG_RESULT
+    ERROR = MSG_ERROR
+
+
+class Message:
+    """Base message class for conductor protocol."""
+
+    def __init__(
+        self, msg_type: MessageType, payload: Dict[str, Any], version: int = 1
+    ):
+        self.type = msg_type
+        self.payload = payload
+        self.version = version
+
+    def to_json(self) -> str:
+        """Serialize message to JSON string."""
+        return encode_json_message(self.type.value, self.payload, self.version).decode(
+            "utf-8"
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "Message":
+        """Deserialize message from JSON string.
+
+        Messages written by older releases carry their data under
+        "payload" rather than "data" and are still accepted.
+        """
+        try:
+            obj = json.loads(data)
+            payload = obj.get("data", obj.get("payload"))
+            if "version" not in obj or "type" not in obj or payload is None:
+                raise ProtocolError("Invalid message format")
+            return cls(MessageType(obj["type"]), payload, obj["version"])
+        except (json.JSONDecodeError, AttributeError, ValueError) as e:
+            raise ProtocolError(f"Failed to parse message: {e}")
+
+
+def send_json_message(sock: socket.socket, message: Message) -> None:
+    """Send a JSON message with length prefix."""
+    send_message(sock, message.type.value, message.payload)
+
+
+def receive_json_message(sock: socket.socket) -> Message:
+    """Receive a message with length prefix."""
+    msg_type, data = receive_message(sock)
+    try:
+        return Message(MessageType(msg_type), data)
+    except ValueError:
+        raise ProtocolError(f"Unexpected message type: {msg_type}")
+
+
+# Converter functions for existing objects
+
+
+def phase_to_dict(phase) -> Dict[str, Any]:
+    """Convert a Phase object to a dictionary."""
+    data = {
+        "steps": [step_to_dict(step) for step in phase.steps],
+        "resulthost": phase.resulthost,
+        "resultport": phase.resultport,
+        "results": [result_to_dict(r) for r in phase.results],
+    }
+    if getattr(phase, "max_parallel", None) is not None:
+        data["max_parallel"] = phase.max_parallel
+    return data
+
+
+def step_to_dict(step) -> Dict[str, Any]:
+    """Convert a Step object to a dictionary."""
+    data = {"args": step.args, "spawn": step.spawn, "timeout": step.timeout}
+    if getattr(step, "group", None) is not None:
+        data["group"] = step.group
+    return data
+
+
+def result_to_dict(result) -> Dict[str, Any]:
+    """Convert a result (RetVal) to a dictionary."""
+    return {"code": result.code, "message": result.message}
+
+
+def retval_from_dict(data: Dict[str, Any]):
+    """Create a RetVal object from a dictionary."""
+    from conductor.retval import RetVal
+
+    return RetVal(data.get("code", 0), data.get("message", ""))
+
+
+def step_from_dict(data: Dict[str, Any]):
+    """Create a Step object from a dictionary."""
+    from conductor.step import Step
+
+    # Reconstruct command string from args list
+    import shlex
+
+    command = (
+        shlex.join(data["args"]) if isinstance(data["args"], list) else data["args"]
+    )
+    return Step(
+        command,
+        spawn=data.get("spawn", False),
+        timeout=data.get("timeout", None),
+        group=data.get("group"),
+    )
+
+
+def phase_from_dict(data: Dict[str, Any]):
+    """Create a Phase object from a dictionary."""
+    from conductor.phase import Phase
+
+    phase = Phase(data["resulthost"], data["resultport"], data.get("max_parallel"))
+    for step_data in data.get("steps", []):
+        phase.append(step_from_dict(step_data))
+    # Note: results are not deserialized as they're typically only sent back
+    return phase
+
+
+# JSON-only protocol handler
+
+
+class ProtocolHandler:
+    """Handles JSON protocol for conductor communication."""
+
+    def __init__(self, protocol: str = "json"):
+        self.protocol = protocol
+        if protocol != "json":
+            raise ValueError(f"Only JSON protocol is supported, got: {protocol}")
+
+    def send(self, sock: socket.socket, obj: Any) -> None:
+        """Send an object using JSON protocol."""
+        # Convert object to JSON message
+        if hasattr(obj, "__class__"):
+            class_name = obj.__class__.__name__
+            if class_name == "Phase":
+                msg = Message(MessageType.PHASE, phase_to_dict(obj))
+            elif class_name == "Run":
+                msg = Message(MessageType.RUN, {})
+            elif class_name == "Config":
+                msg = Message(MessageType.CONFIG, {"data": str(obj)})
+            elif class_name == "RetVal":
+                msg = Message(MessageType.RESULT, result_to_dict(obj))
+            else:
+                raise ProtocolError(f"Unknown object type: {class_name}")
+            send_json_message(sock, msg)
+        else:
+            raise ProtocolError("Cannot serialize object")
+
+    def receive(self, sock: socket.socket) -> Any:
+        """Receive an object using JSON protocol."""
+        msg = receive_json_message(sock)
+        # Convert JSON message to object
+        if msg.type == MessageType.PHASE:
+            return phase_from_dict(msg.payload)
+        elif msg.type == MessageType.RUN:
+            from conductor.run import Run
+
+            return Run()
+        elif msg.type == MessageType.CONFIG:
+            from conductor.config import Config
+
+            return Config()  # Would need proper deserialization
+        elif msg.type == MessageType.RESULT:
+            return retval_from_dict(msg.payload)
+        else:
+            raise ProtocolError(f"Unknown message type: {msg.type}")
@@ -0,0 +1,280 @@
+"""Results reporter for conductor - handles JSON and text output formats."""
+
+import json
+import datetime
+from typing import Any, Dict, List, Optional
+
+# Optional fields of a result that are recorded along with it
+RESULT_DETAILS = ("output", "spawned", "usage", "killed")
+
+
+class Reporter:
+    """Base reporter class."""
+
+    def __init__(self, output_file: Optional[str] = None):
+        self.output_file = output_file
+        self.results = {
+            "metadata": {
+                "start_time": datetime.datetime.now().isoformat(),
+                "end_time": None,
+                "total_trials": 0,
+                "total_workers": 0,
+            },
+            "trials": [],
+        }
+        self.current_trial = None
+        self.current_phase = None
+        self.current_worker = None
+
+    def start_trials(self, num_trials: int, num_workers: int):
+        """Record the start of test trials."""
+        self.results["metadata"]["total_trials"] = num_trials
+        self.results["metadata"]["total_workers"] = num_workers
+
+    def start_trial(self, trial_num: int):
+        """Start recording a new trial."""
+        self.current_trial = {
+            "trial_number": trial_num,
+            "start_time": datetime.datetime.now().isoformat(),
+            "end_time": None,
+            "phases": {},
+        }
+
+    def end_trial(self):
+        """End the current trial."""
+        if self.current_trial:
+            self.current_trial["end_time"] = datetime.datetime.now().isoformat()
+            self.results["trials"].append(self.current_trial)
+            self.current_trial = None
+
+    def start_phase(self, phase_name: str):
+        """Start recording a phase."""
+        if self.current_trial:
+            self.current_phase = phase_name
+            self.current_trial["phases"][phase_name] = {
+                "start_time": datetime.datetime.now().isoformat(),
+                "end_time": None,
+                "workers": {},
+            }
+
+    def end_phase(self):
+        """End the current phase."""
+        if self.current_trial and self.current_phase:
+            phase_data = self.current_trial["phases"][self.current_phase]
+            phase_data["end_time"] = datetime.datetime.now().isoformat()
+            self.current_phase = None
+
+    def start_worker(self, worker_name: str):
+        """Start recording results for a worker."""
+        self.current_worker = worker_name
+        if self.current_trial and self.current_phase:
+            phase_data = self.current_trial["phases"][self.current_phase]
+            phase_data["workers"][worker_name] = {
+                "start_time": datetime.datetime.now().isoformat(),
+                "end_time": None,
+                "results": [],
+            }
+
+    def end_worker(self):
+        """End recording for the current worker."""
+        if self.current_trial and self.current_phase and self.current_worker:
+            worker_data = self.current_trial["phases"][self.current_phase]["workers"][
+                self.current_worker
+            ]
+            worker_data["end_time"] = datetime.datetime.now().isoformat()
+            self.current_worker = None
+
+    def add_result(
+        self,
+        code: int,
+        message: str,
+        output: Optional[Dict[str, Any]] = None,
+        spawned: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, Any]] = None,
+        killed: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """Add a result from the current worker.
+
+        output is the summary of the step's spooled output, if the
+        player spooled it, spawned describes a background command that
+        has ended, usage is what the command used on the player and
+        killed lists the processes stopped when it timed out; any of
+        them is recorded with the result.
+        """
+        if self.current_trial and self.current_phase and self.current_worker:
+            worker_data = self.current_trial["phases"][self.current_phase]["workers"][
+                self.current_worker
+            ]
+            result = {
+                "timestamp": datetime.datetime.now().isoformat(),
+                "code": code,
+                "message": message,
+            }
+            if output is not None:
+                result["output"] = output
+            if spawned is not None:
+                result["spawned"] = spawned
+            if usage is not None:
+                result["usage"] = usage
+            if killed is not None:
+                result["killed"] = killed
+            worker_data["results"].append(result)
+
+    def add_results(self, results: List[Dict[str, Any]]):
+        """Add a batch of results from the current worker.
+
+        Each entry is a result as sent on the wire, a dict with "code"
+        and "message" keys and any of the RESULT_DETAILS fields.
+        """
+        if self.current_trial and self.current_phase and self.current_worker:
+            worker_data = self.current_trial["phases"][self.current_phase]["workers"][
+                self.current_worker
+            ]
+            timestamp = datetime.datetime.now().isoformat()
+            for result in results:
+                entry = {
+                    "timestamp": timestamp,
+                    "code": result.get("code", 0),
+                    "message": result.get("message", ""),
+                }
+                for detail in RESULT_DETAILS:
+                    if detail in result:
+                        entry[detail] = result[detail]
+                worker_data["results"].append(entry)
+
+    def add_output(self, step: int, stream: str, timestamp: float, line: str):
+        """Add a line of output streamed from a step of the current worker.
+
+        step is the step's index in the phase and timestamp the player's
+        time (in seconds since the epoch) at which the line was read.
+        Lines are kept under the worker's "output" key as they arrive.
+        """
+        if self.current_trial and self.current_phase and self.current_worker:
+            worker_data = self.current_trial["phases"][self.current_phase]["workers"][
+                self.current_worker
+            ]
+            worker_data.setdefault("output", []).append(
+                {
+                    "timestamp": datetime.datetime.fromtimestamp(timestamp).isoformat(),
+                    "step": step,
+                    "stream": stream,
+                    "line": line,
+                }
+            )
+
+    def finalize(self):
+        """Finalize the report."""
+        self.results["metadata"]["end_time"] = datetime.datetime.now().isoformat()
+        self.write_output()
+
+    def write_output(self):
+        """Write the output - to be implemented by subclasses."""
+        raise NotImplementedError
+
+
+class JSONReporter(Reporter):
+    """JSON format reporter."""
+
+    def write_output(self):
+        """Write results as JSON."""
+        output = json.dumps(self.results, indent=2)
+
+        if self.output_file:
+            with open(self.output_file, "w") as f:
+                f.write(output)
+        else:
+            print(output)
+
+
+class TextReporter(Reporter):
+    """Traditional text format reporter."""
+
+    def add_result(
+        self,
+        code: int,
+        message: str,
+        output: Optional[Dict[str, Any]] = None,
+        spawned: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, Any]] = None,
+        killed: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """Add a result and print it immediately."""
+        super().add_result(code, message, output, spawned, usage, killed)
+        # Print in traditional format
+        if code == 0 and message.lower() == "done":
+            print("done")
+        else:
+            print(code, message)
+
+    def add_results(self, results: List[Dict[str, Any]]):
+        """Add a batch of results and print them immediately."""
+        super().add_results(results)
+        for result in results:
+            code = result.get("code", 0)
+            message = result.get("message", "")
+            if code == 0 and message.lower() == "done":
+                print("done")
+            else:
+                print(code, message)
+
+    def add_output(self, step: int, stream: str, timestamp: float, line: str):
+        """Print a line of streamed output immediately, without keeping it."""
+        print(line, end="")
+
+    def write_output(self):
+        """Text reporter writes output incrementally, so nothing to do here."""
+        if self.output_file:
+            # Write a summary to file
+            with open(self.output_file, "w") as f:
+                f.write("Conductor Test Results\n")
+                f.write("=====================\n\n")
+                f.write(f"Start Time: {self.results['metadata']['start_time']}\n")
+                f.write(f"End Time: {self.results['metadata']['end_time']}\n")
+                f.write(f"Total Trials: {self.results['metadata']['total_trials']}\n")
+                f.write(
+                    f"Total Workers: {self.results['metadata']['total_workers']}\n\n"
+                )
+
+                for trial in self.results["trials"]:
+                    f.write(f"Trial {trial['trial_number']}:\n")
+                    for phase_name, phase_data in trial["phases"].items():
+                        f.write(f"  Phase: {phase_name}\n")
+                        for worker_name, worker_data in phase_data["workers"].items():
+                            f.write(f"    Worker: {worker_name}\n")
+                            f.write(f"      Results: {len(worker_data['results'])}\n")
+                            for result in worker_data["results"]:
+                                f.write(
+                                    f"        Code: {result['code']}, Message: {result['message']}\n"
+                                )
+                                if "usage" in result:
+                                    f.write(f"          {format_usage(result['usage'])}\n")
+                                if "killed" in result:
+                                    f.write(f"          {format_killed(result['killed'])}\n")
+
+
+def format_usage(usage: Dict[str, Any]) -> str:
+    """Format a result's resource usage as one line of text."""
+    text = (
+        f"Wall: {usage['wall']:.3f}s, User: {usage['user']:.3f}s, "
+        f"Sys: {usage['sys']:.3f}s, Max RSS: {usage['maxrss']} KB, "
+        f"Switches: {usage['nvcsw']}/{usage['nivcsw']}"
+    )
+    if "stdout_bytes" in usage:
+        text += f", Out: {usage['stdout_bytes']}/{usage['stderr_bytes']} bytes"
+    return text
+
+
+def format_killed(killed: List[Dict[str, Any]]) -> str:
+    """Format the processes stopped with a timed-out step as one line of text."""
+    return "Killed: " + ", ".join(
+        f"{process['pid']} {process['command']} ({process['signal']})"
+        for process in killed
+    )
+
+
+def create_reporter(format: str, output_file: Optional[str] = None) -> Reporter:
+    """Factory function to create appropriate reporter."""
+    if format.lower() == "json":
+        return JSONReporter(output_file)
+    else:
+        return TextReporter(output_file)
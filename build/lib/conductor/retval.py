@@ -0,0 +1,88 @@
+# Copyright (c) 2014, Neville-Neil Consulting
+# Copyright (c) 2025, Ben Roeder
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Author: George V. Neville-Neil
+# Current Maintainer: Ben Roeder
+#
+# Description: A return code object that can be serialized and sent back
+# to the conductor.
+
+from conductor.json_protocol import send_message, MSG_RESULT
+
+RETVAL_OK = 0
+RETVAL_ERROR = 1
+RETVAL_BAD_CMD = 2
+RETVAL_DONE = 65535
+
+
+class RetVal:
+    def __init__(
+        self, code=0, message="", output=None, spawned=None, usage=None, killed=None
+    ):
+        # Ensure code is an integer and message is a string
+        # This matches actual usage throughout the codebase
+        if not isinstance(code, int):
+            raise TypeError(f"RetVal code must be an integer, got {type(code).__name__}")
+        if not isinstance(message, str):
+            raise TypeError(f"RetVal message must be a string, got {type(message).__name__}")
+        
+        self.code = code
+        self.message = message
+        # Summary of the step's spooled output, if it was spooled
+        self.output = output
+        # Details of a spawned command that has ended, if that is what
+        # this result reports
+        self.spawned = spawned
+        # What the command used on the player, see conductor.accounting
+        self.usage = usage
+        # Processes stopped when the command timed out, each as
+        # {"pid", "command", "signal"}; see background.terminate_group()
+        self.killed = killed
+
+    def to_dict(self):
+        """Return the wire representation of this RetVal."""
+        data = {"code": self.code, "message": self.message}
+        if self.output is not None:
+            data["output"] = self.output
+        if self.spawned is not None:
+            data["spawned"] = self.spawned
+        if self.usage is not None:
+            data["usage"] = self.usage
+        if self.killed is not None:
+            data["killed"] = self.killed
+        return data
+
+    def send(self, sock, **wire):
+        """Send this RetVal as a result message.
+
+        Any keyword arguments (e.g. codec) are passed to send_message.
+        """
+        send_message(sock, MSG_RESULT, self.to_dict(), **wire)
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+# Copyright (c) 2014, Neville-Neil Consulting
+# Copyright (c) 2025, Ben Roeder
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Author: George V. Neville-Neil
+# Current Maintainer: Ben Roeder
+#
+# Description: Main program for conductor.  Reads the config, starts
+# the players, parcels out the work, collects the results.
+
+# "system" imports
+import configparser
+import functools
+import itertools
+import operator
+import sys
+import argparse
+import os
+import logging
+
+# local imports
+from conductor import client
+from conductor import retval
+from conductor.handshake import DEFAULT_HEARTBEAT_INTERVAL, DEFAULT_HEARTBEAT_MISSES
+from conductor.json_protocol import (
+    ProtocolError,
+    CODEC_JSON,
+    SUPPORTED_CODECS,
+    COMPRESS_NONE,
+    COMPRESS_ZLIB,
+    SUPPORTED_COMPRESSION,
+    DEFAULT_COMPRESS_THRESHOLD,
+)
+from conductor.reporter import create_reporter
+
+
+def setup_logging(verbose, quiet):
+    """Configure logging based on verbosity settings."""
+    if quiet:
+        level = logging.ERROR
+    elif verbose:
+        level = logging.DEBUG
+    else:
+        level = logging.INFO
+
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    return logging.getLogger(__name__)
+
+
+def run_phase(
+    clients, phase_name, phase_methods, reporter=None, failed=None, fail_fast=False
+):
+    """Run a single phase across all clients.
+
+    Clients whose results cannot be collected are added to failed, and
+    clients already in it are skipped, so one dead player does not hold
+    up the others for the rest of the trial.  An optional "queue" method
+    sends the next phase ahead while this one's results are collected.
+
+    With fail_fast, the first player with a failed step has the phase
+    cancelled on every other player, which then only returns partial
+    results, and any phase queued ahead is dropped.  Returns whether
+    that happened.
+    """
+    logger = logging.getLogger(__name__)
+    if failed is None:
+        failed = set()
+    active = [client for client in clients if client not in failed]
+
+    if reporter:
+        reporter.start_phase(phase_name)
+
+    # Download phase
+    logger.info(f"Downloading {phase_name} phase to all clients")
+    for client in active:
+        phase_methods["download"](client)
+
+    # Execute phase
+    logger.info(f"Executing {phase_name} phase on all clients")
+    for client in active:
+        client.doit()
+    if "queue" in phase_methods:
+        for client in active:
+            phase_methods["queue"](client)
+
+    # Collect results
+    logger.info(f"Collecting {phase_name} results from all clients")
+    cancelled = False
+    for idx, client in enumerate(clients):
+        worker_name = f"worker_{idx}"  # TODO: Get actual worker name from config
+        if reporter:
+            reporter.start_worker(worker_name)
+        if client not in active:
+            if reporter:
+                reporter.add_result(retval.RETVAL_ERROR, "player failed earlier")
+        else:
+            try:
+                failures = client.results(reporter)
+            except (OSError, ProtocolError) as e:
+                # Record the player as failed and carry on with the others
+                logger.error(f"{worker_name} failed during {phase_name}: {e}")
+                failed.add(client)
+                failures = 1
+                if reporter:
+                    reporter.add_result(retval.RETVAL_ERROR, f"player failed: {e}")
+            if fail_fast and failures and not cancelled:
+                logger.warning(
+                    f"{worker_name} failed during {phase_name}; "
+                    "cancelling it on the other players"
+                )
+                cancel_phase(active, failed)
+                cancelled = True
+        if reporter:
+            reporter.end_worker()
+
+    if reporter:
+        reporter.end_phase()
+    return cancelled
+
+
+def cancel_phase(clients, failed):
+    """Cancel the running phase, and any queued after it, on every client
+
+    Clients that cannot be reached are added to failed.
+    """
+    logger = logging.getLogger(__name__)
+    for client in clients:
+        if client in failed:
+            continue
+        try:
+            logger.debug(f"{client.endpoint}: {client.cancel()}")
+        except (OSError, ProtocolError) as e:
+            logger.error(f"Failed to cancel the phase on {client.endpoint}: {e}")
+            failed.add(client)
+
+
+def validate_positive_int(value):
+    """Validate that value is a positive integer."""
+    ivalue = int(value)
+    if ivalue <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return ivalue
+
+
+def validate_non_negative_float(value):
+    """Validate that value is a number of seconds, zero included."""
+    fvalue = float(value)
+    if fvalue < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, got {value}")
+    return fvalue
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Conductor - Orchestrate distributed system tests",
+        epilog="Example: conduct -t 3 -v test_config.cfg",
+    )
+
+    parser.add_argument("config", help="Coordinator configuration file path")
+
+    parser.add_argument(
+        "-t",
+        "--trials",
+        type=int,
+        default=None,
+        help="Number of trials to run (overrides config file)",
+    )
+
+    parser.add_argument(
+        "-p",
+        "--phases",
+        nargs="+",
+        choices=["startup", "run", "collect", "reset", "all"],
+        default=["all"],
+        help="Phases to execute (default: all)",
+    )
+
+    parser.add_argument(
+        "-c",
+        "--workers",
+        nargs="+",
+        default=None,
+        help="Specific workers to use (overrides config file)",
+    )
+
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Enable verbose output"
+    )
+
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="Suppress all output except errors"
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show what would be executed without running",
+    )
+
+    parser.add_argument("--version", action="version", version="Conductor 1.0")
+
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["text", "json"],
+        default="text",
+        help="Output format for results (default: text)",
+    )
+
+    parser.add_argument(
+        "-o", "--output", help="Output file for results (default: stdout)"
+    )
+
+    parser.add_argument(
+        "--max-message-size",
+        type=validate_positive_int,
+        default=10,
+        metavar="MB",
+        help="Maximum message size in megabytes (default: 10)"
+    )
+
+    parser.add_argument(
+        "--codec",
+        choices=SUPPORTED_CODECS,
+        default=None,
+        help="Preferred wire encoding, negotiated with each player; "
+        "binary is more compact, json is faster (default: json)",
+    )
+
+    parser.add_argument(
+        "--compression",
+        choices=[COMPRESS_NONE] + SUPPORTED_COMPRESSION,
+        default=None,
+        help="Preferred compression for large messages, negotiated with each "
+        "player (default: zlib)",
+    )
+
+    parser.add_argument(
+        "--compress-threshold",
+        type=validate_positive_int,
+        default=None,
+        metavar="BYTES",
+        help="Only compress messages of at least this size "
+        f"(default: {DEFAULT_COMPRESS_THRESHOLD})",
+    )
+
+    parser.add_argument(
+        "--heartbeat-interval",
+        type=validate_non_negative_float,
+        default=None,
+        metavar="SECONDS",
+        help="Ask players for a heartbeat this often while a phase runs; "
+        f"0 disables (default: {DEFAULT_HEARTBEAT_INTERVAL:g})",
+    )
+
+    parser.add_argument(
+        "--heartbeat-misses",
+        type=validate_positive_int,
+        default=None,
+        metavar="N",
+        help="Mark a player failed after this many missed heartbeats "
+        f"(default: {DEFAULT_HEARTBEAT_MISSES})",
+    )
+
+    parser.add_argument(
+        "--stream-output",
+        action="store_true",
+        default=None,
+        help="Have players send step output line by line as it is produced "
+        "instead of with the step's result",
+    )
+
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        default=None,
+        help="Once a step fails on one player, cancel its phase on the others "
+        "and skip the rest of the trial up to its reset phase",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+
+    # Setup logging
+    logger = setup_logging(args.verbose, args.quiet)
+
+    # Check if config file exists
+    if not os.path.exists(args.config):
+        logger.error(f"Configuration file not found: {args.config}")
+        sys.exit(1)
+
+    # Read configuration
+    logger.info(f"Reading configuration from: {args.config}")
+    test_config = configparser.ConfigParser()
+
+    try:
+        with open(args.config) as master:
+            test_config.read_file(master)
+    except Exception as e:
+        logger.error(f"Failed to read configuration: {e}")
+        sys.exit(1)
+
+    # Get test defaults
+    try:
+        defaults = test_config["Test"]
+        trials = (
+            args.trials if args.trials is not None else int(defaults.get("trials", 1))
+        )
+
+        # Get output format from config if not specified on command line
+        if args.format == "text" and "format" in defaults:
+            args.format = defaults.get("format", "text")
+
+        # Get output file from config if not specified on command line
+        if args.output is None and "output" in defaults:
+            args.output = defaults.get("output")
+
+        # Get max_message_size from config if not overridden by CLI
+        # CLI takes precedence over config file
+        if args.max_message_size == 10:  # Default value, not CLI-specified
+            config_max_size = defaults.get("max_message_size")
+            if config_max_size:
+                try:
+                    args.max_message_size = validate_positive_int(config_max_size)
+                except argparse.ArgumentTypeError as e:
+                    logger.error(f"Invalid max_message_size in config: {e}")
+                    sys.exit(1)
+
+        # Get codec from config if not specified on command line
+        if args.codec is None:
+            args.codec = defaults.get("codec", CODEC_JSON)
+            if args.codec not in SUPPORTED_CODECS:
+                logger.error(
+                    f"Invalid codec in config: {args.codec} "
+                    f"(choose from {', '.join(SUPPORTED_CODECS)})"
+                )
+                sys.exit(1)
+
+        # Get compression settings from config if not specified on command line
+        if args.compression is None:
+            args.compression = defaults.get("compression", COMPRESS_ZLIB)
+            if args.compression not in [COMPRESS_NONE] + SUPPORTED_COMPRESSION:
+                logger.error(f"Invalid compression in config: {args.compression}")
+                sys.exit(1)
+        if args.compress_threshold is None:
+            try:
+                args.compress_threshold = validate_positive_int(
+                    defaults.get("compress_threshold", DEFAULT_COMPRESS_THRESHOLD)
+                )
+            except (ValueError, argparse.ArgumentTypeError) as e:
+                logger.error(f"Invalid compress_threshold in config: {e}")
+                sys.exit(1)
+
+        # Get heartbeat settings from config if not specified on command line
+        try:
+            if args.heartbeat_interval is None:
+                args.heartbeat_interval = validate_non_negative_float(
+                    defaults.get("heartbeat_interval", DEFAULT_HEARTBEAT_INTERVAL)
+                )
+            if args.heartbeat_misses is None:
+                args.heartbeat_misses = validate_positive_int(
+                    defaults.get("heartbeat_misses", DEFAULT_HEARTBEAT_MISSES)
+                )
+        except (ValueError, argparse.ArgumentTypeError) as e:
+            logger.error(f"Invalid heartbeat setting in config: {e}")
+            sys.exit(1)
+
+        # Get output streaming from config if not specified on command line
+        if args.stream_output is None:
+            try:
+                args.stream_output = defaults.getboolean("stream_output", False)
+            except ValueError as e:
+                logger.error(f"Invalid stream_output in config: {e}")
+                sys.exit(1)
+
+        # Get fail-fast mode from config if not specified on command line
+        if args.fail_fast is None:
+            try:
+                args.fail_fast = defaults.getboolean("fail_fast", False)
+            except ValueError as e:
+                logger.error(f"Invalid fail_fast in config: {e}")
+                sys.exit(1)
+
+    except KeyError:
+        logger.error("Configuration missing [Test] section")
+        sys.exit(1)
+
+    # Load workers
+    clients = []
+    worker_section = test_config["Workers"]
+
+    # Filter workers if specified
+    if args.workers:
+        worker_keys = [k for k in worker_section if k in args.workers]
+        if not worker_keys:
+            logger.error(f"No matching workers found: {args.workers}")
+            sys.exit(1)
+    else:
+        worker_keys = worker_section
+
+    logger.info(f"Loading {len(worker_keys)} worker(s)")
+
+    for worker_name in worker_keys:
+        worker_config_path = worker_section[worker_name]
+
+        if not os.path.exists(worker_config_path):
+            logger.error(f"Worker config not found: {worker_config_path}")
+            sys.exit(1)
+
+        logger.debug(f"Loading worker {worker_name} from {worker_config_path}")
+
+        worker_config = configparser.ConfigParser()
+        try:
+            with open(worker_config_path) as file:
+                worker_config.read_file(file)
+            clients.append(
+                client.Client(
+                    worker_config,
+                    max_message_size=args.max_message_size,
+                    codec=args.codec,
+                    compression=args.compression,
+                    compress_threshold=args.compress_threshold,
+                    heartbeat_interval=args.heartbeat_interval or None,
+                    heartbeat_misses=args.heartbeat_misses,
+                    stream_output=args.stream_output,
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to load worker {worker_name}: {e}")
+            sys.exit(1)
+
+    if args.dry_run:
+        logger.info("DRY RUN MODE - No commands will be executed")
+        logger.info(f"Would run {trials} trial(s) with {len(clients)} worker(s)")
+        logger.info(f"Phases: {args.phases}")
+        sys.exit(0)
+
+    # Determine which phases to run
+    all_phases = ["startup", "run", "collect", "reset"]
+    if "all" in args.phases:
+        phases_to_run = all_phases
+    else:
+        phases_to_run = [p for p in all_phases if p in args.phases]
+
+    logger.info(f"Running {trials} trial(s) with phases: {', '.join(phases_to_run)}")
+
+    # Create reporter
+    reporter = create_reporter(args.format, args.output)
+    reporter.start_trials(trials, len(clients))
+
+    # Phase method mapping
+    # Players that accept a plan get every phase once per session, and
+    # each trial then only names the phase to run.
+    phase_methods = {
+        "startup": lambda c, trial: c.startup(trial),
+        "run": lambda c, trial: c.run(trial),
+        "collect": lambda c, trial: c.collect(trial),
+        "reset": lambda c, trial: c.reset(trial),
+    }
+
+    # Run trials
+    for trial in range(trials):
+        logger.info(f"Starting trial {trial + 1} of {trials}")
+        reporter.start_trial(trial + 1)
+
+        # Players that fail are skipped until the next trial
+        failed = set()
+        cancelled = False
+        planned = [phase for phase in phases_to_run if phase in phase_methods]
+        for phase, after in itertools.zip_longest(planned, planned[1:]):
+            if cancelled and phase != "reset":
+                # Players are still reset for the next trial
+                logger.warning(f"Skipping {phase} phase after a failure")
+                continue
+            methods = {
+                "download": functools.partial(phase_methods[phase], trial=trial + 1)
+            }
+            # Players with request IDs receive the next phase while they
+            # still run this one
+            if after is not None:
+                methods["queue"] = operator.methodcaller("queue", after, trial + 1)
+            if run_phase(clients, phase, methods, reporter, failed, args.fail_fast):
+                cancelled = True
+
+        reporter.end_trial()
+        logger.info(f"Completed trial {trial + 1} of {trials}")
+
+    # Release the control sessions to the players
+    for c in clients:
+        c.close()
+
+    # Finalize report
+    reporter.finalize()
+    logger.info("All trials completed successfully")
+
+
+if __name__ == "__main__":
+    main()
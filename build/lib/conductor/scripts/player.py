@@ -0,0 +1,968 @@
+#!/usr/bin/env python3
+# Copyright (c) 2014, Neville-Neil Consulting
+# Copyright (c) 2025, Ben Roeder
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Author: George V. Neville-Neil
+# Current Maintainer: Ben Roeder
+#
+# Description: The Player listens on a well known port and executes
+# commands as they are passed in, returning the reults up the pipe.
+
+import select
+import socket
+import configparser
+import sys
+import argparse
+import os
+import logging
+import queue
+import signal
+import threading
+import time
+
+from conductor import background
+from conductor import cancellation
+from conductor import config
+from conductor import handshake
+from conductor import phase
+from conductor import step
+from conductor import retval
+from conductor import spool
+from conductor.json_protocol import (
+    send_message,
+    send_stream,
+    receive_tagged_message,
+    ConnectionClosed,
+    ProtocolError,
+    COMPRESS_NONE,
+    COMPRESS_ZLIB,
+    SUPPORTED_COMPRESSION,
+    DEFAULT_COMPRESS_THRESHOLD,
+    MSG_PHASE,
+    MSG_RUN,
+    MSG_CONFIG,
+    MSG_HELLO,
+    MSG_PLAN,
+    MSG_TRIGGER,
+    MSG_HEARTBEAT,
+    MSG_OUTPUT,
+    MSG_FETCH,
+    MSG_PING,
+    MSG_STATUS,
+    MSG_SHUTDOWN,
+    MSG_CANCEL,
+    unix_socket_path,
+)
+
+# Lines of step output waiting to be sent before steps have to wait
+OUTPUT_QUEUE_SIZE = 1024
+
+# Control sessions served at once unless configured otherwise
+DEFAULT_MAX_SESSIONS = 8
+
+# Seconds a refused conductor has to send its first message
+REFUSE_TIMEOUT = 5.0
+
+
+class Player:
+    """Listen for conductors and serve each control session in a thread
+
+    Settings such as the engine and the spool are shared by every
+    session; phases, plans, agreed features and spawned commands belong
+    to the Session that set them up.
+    """
+
+    done = False
+
+    def __init__(
+        self,
+        bind_addr,
+        bind_port,
+        key=None,
+        max_message_size=10,
+        compression=COMPRESS_ZLIB,
+        compress_threshold=DEFAULT_COMPRESS_THRESHOLD,
+        engine=phase.ENGINE_THREAD,
+        spool_dir=None,
+        excerpt_bytes=spool.DEFAULT_EXCERPT_BYTES,
+        max_sessions=DEFAULT_MAX_SESSIONS,
+        kill_grace=background.DEFAULT_KILL_GRACE,
+    ):
+        self.bind_addr = bind_addr
+        self.bind_port = bind_port
+        self.max_message_size = max_message_size * 1024 * 1024  # Convert MB to bytes
+        # Compression used for replies when the conductor accepts it
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        # How phases run their steps: blocking calls or an event loop
+        self.engine = engine
+        # Seconds spawned, cancelled and timed-out commands get between
+        # SIGTERM and SIGKILL
+        self.kill_grace = kill_grace
+        # Step output goes to spool files here, if set, and only an
+        # excerpt is returned with each result
+        self.spool = None
+        if spool_dir is not None:
+            self.spool = spool.OutputSpool(spool_dir, excerpt_bytes)
+        # Conductors connecting while this many sessions are open are refused
+        self.max_sessions = max_sessions
+        self.sessions = set()
+        self._sessions_lock = threading.Lock()
+        # Closing the write end makes the read end readable for good, which
+        # wakes run() and every idle session at once on shutdown
+        self._stop, self._stopper = socket.socketpair()
+        self.logger = logging.getLogger(__name__)
+
+        # "unix:/path" listens on a Unix domain socket instead of a port
+        self.socket_path = unix_socket_path(bind_addr)
+        if self.socket_path is not None:
+            self.cmdsock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM, 0)
+            # A socket file left behind by a previous player would block bind
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.cmdsock.bind(self.socket_path)
+            self.endpoint = bind_addr
+        else:
+            self.cmdsock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, 0)
+            self.cmdsock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                self.cmdsock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except AttributeError:
+                # SO_REUSEPORT not available on all platforms
+                pass
+
+            self.cmdsock.bind((bind_addr, bind_port))
+            self.endpoint = f"{bind_addr}:{bind_port}"
+        self.cmdsock.listen(max(5, max_sessions))
+        self.logger.info(f"Player listening on {self.endpoint}")
+
+    def shutdown(self):
+        """Gracefully shutdown the player."""
+        self.logger.info("Shutting down player...")
+        self.done = True
+        self._stopper.close()
+        if self.cmdsock:
+            self.cmdsock.close()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        with self._sessions_lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            session.cancel(wait=True)
+            session.spawned.terminate()
+        if self.spool is not None:
+            self.spool.clear()
+
+    def run(self):
+        """Accept conductors and serve each session in a thread of its own"""
+        while not self.done:
+            sock = None
+            try:
+                readable, _, _ = select.select([self.cmdsock, self._stop], [], [])
+                if self._stop in readable:
+                    break
+                sock, addr = self.cmdsock.accept()
+                self.logger.debug(f"Connection from {addr}")
+
+                with self._sessions_lock:
+                    session = None
+                    if len(self.sessions) < self.max_sessions:
+                        session = Session(self, sock, addr)
+                        self.sessions.add(session)
+                if session is None:
+                    target, args = self.refuse, (sock,)
+                else:
+                    target, args = self._serve_connection, (session,)
+                threading.Thread(target=target, args=args, daemon=True).start()
+            except KeyboardInterrupt:
+                self.logger.info("Received interrupt signal")
+                self.shutdown()
+                break
+            except Exception as e:
+                self.logger.error(f"Error handling connection: {e}")
+                if sock:
+                    sock.close()
+
+    def serve(self, sock, peer=None):
+        """Handle every message of a control session until the conductor hangs up"""
+        session = Session(self, sock, peer)
+        with self._sessions_lock:
+            self.sessions.add(session)
+        self._serve(session)
+
+    def status(self, asking=None):
+        """Describe what every session is doing, for MSG_STATUS
+
+        asking is the session the status is for, which is marked as the
+        current one.
+        """
+        with self._sessions_lock:
+            sessions = list(self.sessions)
+        described = []
+        for session in sessions:
+            described.append(dict(session.status(), current=session is asking))
+        return {"sessions": described, "max_sessions": self.max_sessions}
+
+    def _serve(self, session):
+        try:
+            session.serve()
+        finally:
+            with self._sessions_lock:
+                self.sessions.discard(session)
+
+    def _serve_connection(self, session):
+        """Serve an accepted session, then close its socket"""
+        try:
+            self._serve(session)
+        except Exception as e:
+            self.logger.error(f"Error handling connection: {e}")
+        finally:
+            session.sock.close()
+
+    def refuse(self, sock):
+        """Answer a conductor's first message with an error and hang up
+
+        Used once max_sessions are open.  Reading the request first
+        keeps the reply from being lost to a reset of the connection.
+        """
+        try:
+            sock.settimeout(REFUSE_TIMEOUT)
+            _, _, request_id = receive_tagged_message(
+                sock, max_message_size=self.max_message_size
+            )
+            ret = retval.RetVal(
+                retval.RETVAL_ERROR,
+                f"player busy: {self.max_sessions} sessions open",
+            )
+            ret.send(sock, **Session._reply_wire({}, request_id))
+        except (OSError, ProtocolError) as e:
+            self.logger.debug(f"Refusing a session failed: {e}")
+        finally:
+            sock.close()
+
+    def build_phase(self, data, name=None):
+        """Reconstruct a phase from its JSON data"""
+        new_phase = phase.Phase(
+            data["resulthost"],
+            data["resultport"],
+            data.get("max_parallel"),
+            name or data.get("name"),
+        )
+        for step_data in data.get("steps", []):
+            new_phase.append(
+                step.Step(
+                    step_data["command"],
+                    spawn=step_data.get("spawn", False),
+                    timeout=step_data.get("timeout", 30),
+                    group=step_data.get("group"),
+                    kill_grace=self.kill_grace,
+                )
+            )
+        return new_phase
+
+
+class Session:
+    """One conductor's control session with a Player
+
+    Holds everything the conductor sets up over the session: the agreed
+    wire settings and features, queued and planned phases, and the
+    commands its steps spawned.
+    """
+
+    def __init__(self, player, sock, peer=None):
+        self.player = player
+        self.sock = sock
+        self.peer = peer
+        self.logger = player.logger
+        # Wire settings for replies on this session, agreed through MSG_HELLO
+        self.wire = {}
+        self.config = None
+        self.phases = []  # Phases queued for the next RUN
+        self.plan = {}
+        self.heartbeat_interval = None
+        self.request_ids = False
+        self.stream_output = False
+        self.running = False
+        self.current = None  # The phase being run, if any
+        # Cancels the phases of the RUN in progress, if there is one
+        self.cancellation = None
+        # Commands spawned by steps of this session
+        self.spawned = background.SpawnRegistry(player.kill_grace)
+
+    def serve(self):
+        """Handle every message until the conductor hangs up"""
+        self.sock.settimeout(None)
+        stop = self.player._stop
+        try:
+            while True:
+                readable, _, _ = select.select([self.sock, stop], [], [])
+                if stop in readable:
+                    # The player is shutting down
+                    return
+                if not self.serve_one():
+                    return
+        finally:
+            # Nothing a session spawned outlives it
+            self.spawned.terminate()
+
+    def serve_one(self):
+        """Receive and handle one message; return False once the session is over"""
+        try:
+            msg_type, data, request_id = receive_tagged_message(
+                self.sock, max_message_size=self.player.max_message_size
+            )
+        except ConnectionClosed:
+            self.logger.debug("Conductor closed the session")
+            return False
+        except ProtocolError as e:
+            # The framing can no longer be trusted, so end the session.
+            self.logger.error(f"Error processing message: {e}")
+            ret = retval.RetVal(retval.RETVAL_ERROR, str(e))
+            ret.send(self.sock)
+            return False
+        try:
+            self.handle(msg_type, data, request_id)
+        except Exception as e:
+            self.logger.error(f"Error processing message: {e}")
+            ret = retval.RetVal(retval.RETVAL_ERROR, str(e))
+            ret.send(self.sock, **self._reply_wire(self.wire, request_id))
+        return True
+
+    @staticmethod
+    def _reply_wire(wire, request_id):
+        """Return the send settings for a reply to the given request"""
+        if request_id is None:
+            return wire
+        return dict(wire, request_id=request_id)
+
+    def status(self):
+        """Describe what this session is doing"""
+        current = self.current
+        return {
+            "peer": str(self.peer) if self.peer else None,
+            "running": current is not None,
+            "phase": current.name if current is not None else None,
+            "steps": len(current.steps) if current is not None else 0,
+            "completed": len(current.results) if current is not None else 0,
+            "queued": [queued.name for queued in self.phases],
+            "spawned": len(self.spawned.running()),
+        }
+
+    def cancel(self, wait=False):
+        """Cancel the RUN in progress and drop the phases queued after it
+
+        The running step's process group is stopped and the RUN's
+        remaining steps and phases are skipped; their partial results
+        are still returned.  With wait, this returns only once the
+        stopped groups are gone.  Returns (phases cancelled, steps
+        stopped, queued phases dropped).
+        """
+        dropped, self.phases = self.phases, []
+        running = self.cancellation
+        if running is None or running.cancelled:
+            return 0, 0, len(dropped)
+        stopped = running.cancel()
+        if wait:
+            running.wait()
+        return 1, stopped, len(dropped)
+
+    def run_phase(self, current, wire):
+        """Run a phase while staying responsive to the conductor
+
+        With heartbeats agreed, one is sent every interval using the RUN
+        request's wire settings, and so is each line of output when the
+        conductor asked for it to be streamed.  With request IDs agreed,
+        requests that arrive while the phase runs, such as the next
+        phase, are handled straight away with the session's settings.
+        """
+        player = self.player
+        sock = self.sock
+        listening = self.request_ids
+        if not self.heartbeat_interval and not listening and not self.stream_output:
+            current.execute(
+                player.engine,
+                spool=player.spool,
+                spawned=self.spawned,
+                cancel=self.cancellation,
+            )
+            return
+        errors = []
+        # The worker wakes us through a socket pair when it is done or
+        # has output, so waiting on the conductor never delays either
+        wake, waker = socket.socketpair()
+        finished = threading.Event()
+        # Steps only queue their output; this thread alone writes to the
+        # session.  A full queue stalls the steps until it is drained.
+        lines = queue.Queue(OUTPUT_QUEUE_SIZE)
+        output = None
+        if self.stream_output:
+
+            def output(index, stream, line):
+                lines.put((index, stream, time.time(), line))
+                waker.send(b"\1")
+
+        def work():
+            try:
+                current.execute(
+                    player.engine, output, player.spool, self.spawned, self.cancellation
+                )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                finished.set()
+                waker.send(b"\0")
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        interval = self.heartbeat_interval
+        next_beat = time.monotonic() + interval if interval else None
+        try:
+            while True:
+                watch = [wake, sock] if listening else [wake]
+                timeout = None
+                if next_beat is not None:
+                    timeout = max(0, next_beat - time.monotonic())
+                readable, _, _ = select.select(watch, [], [], timeout)
+                if wake in readable:
+                    wake.recv(4096)
+                    # Output queued before the steps finished is sent first
+                    done = finished.is_set()
+                    self.send_output(lines, wire)
+                    if done:
+                        break
+                if sock in readable:
+                    listening = self.serve_one()
+                if next_beat is not None and time.monotonic() >= next_beat:
+                    try:
+                        send_message(
+                            sock,
+                            MSG_HEARTBEAT,
+                            {"completed": len(current.results)},
+                            **wire,
+                        )
+                        next_beat += interval
+                    except OSError as e:
+                        # Finish the phase anyway; returning results will fail too
+                        self.logger.error(f"Heartbeat failed: {e}")
+                        next_beat = None
+        finally:
+            worker.join()
+            wake.close()
+            waker.close()
+        if errors:
+            raise errors[0]
+
+    def send_output(self, lines, wire):
+        """Send every line of output queued so far as MSG_OUTPUT"""
+        while True:
+            try:
+                index, stream, stamp, line = lines.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                send_message(
+                    self.sock,
+                    MSG_OUTPUT,
+                    {"step": index, "stream": stream, "time": stamp, "line": line},
+                    **wire,
+                )
+            except OSError as e:
+                # Keep draining so the steps can finish; results will fail too
+                self.logger.error(f"Sending output failed: {e}")
+
+    def fetch(self, data, wire):
+        """Send a byte range of a spool file
+
+        The reply says how many bytes follow, and they are then sent as
+        a stream with the session's settings.
+        """
+        player = self.player
+        try:
+            if player.spool is None:
+                raise KeyError("output is not spooled")
+            length, chunks = player.spool.read(
+                data.get("spool"), data.get("offset", 0), data.get("length")
+            )
+        except (KeyError, ValueError, TypeError, OSError) as e:
+            reason = e.args[0] if isinstance(e, KeyError) else str(e)
+            ret = retval.RetVal(retval.RETVAL_ERROR, f"cannot fetch output: {reason}")
+            ret.send(self.sock, **wire)
+            return
+        ret = retval.RetVal(retval.RETVAL_OK, str(length))
+        ret.send(self.sock, **wire)
+        send_stream(
+            self.sock,
+            chunks,
+            max_message_size=player.max_message_size,
+            **self.wire,
+        )
+
+    def handle(self, msg_type, data, request_id=None):
+        """Act on a single message received over the session
+
+        The session's wire settings are updated when the conductor
+        negotiates new ones.  Replies carry the request's ID, if it had
+        one.
+        """
+        player = self.player
+        sock = self.sock
+        session = self.wire
+        wire = self._reply_wire(session, request_id)
+        if msg_type == MSG_HELLO:
+            agreed = handshake.agree(
+                data, player.compression, max_frame_size=player.max_message_size
+            )
+            # The reply itself is plain JSON so that any conductor can read it
+            send_message(sock, MSG_HELLO, agreed)
+            session.clear()
+            session.update(
+                handshake.wire_settings(
+                    agreed,
+                    # Split replies the conductor could not take in one frame
+                    peer_max_frame_size=data.get("max_frame_size"),
+                    max_frame_size=player.max_message_size,
+                    compress_threshold=player.compress_threshold,
+                )
+            )
+            self.heartbeat_interval = agreed.get("heartbeat_interval")
+            self.request_ids = agreed.get("request_ids", False)
+            self.stream_output = agreed.get("stream_output", False)
+            self.logger.debug(f"Session features: {agreed}")
+        elif msg_type == MSG_CONFIG:
+            self.config = config.Config()  # Would need proper deserialization
+            self.logger.info("Configuration received")
+            ret = retval.RetVal(retval.RETVAL_OK, "config received")
+            ret.send(sock, **wire)
+        elif msg_type == MSG_PHASE:
+            new_phase = player.build_phase(data)
+            self.phases.append(new_phase)
+            self.logger.info(f"Phase received with {len(new_phase.steps)} steps")
+            ret = retval.RetVal(retval.RETVAL_OK, "phase received")
+            ret.send(sock, **wire)
+        elif msg_type == MSG_PLAN:
+            # Build every phase once; triggers then queue them by name
+            self.plan = {
+                name: player.build_phase(phase_data, name)
+                for name, phase_data in data.get("phases", {}).items()
+            }
+            self.logger.info(f"Plan received with phases: {', '.join(self.plan)}")
+            ret = retval.RetVal(retval.RETVAL_OK, "plan received")
+            ret.send(sock, **wire)
+        elif msg_type == MSG_TRIGGER:
+            name = data.get("phase")
+            if name not in self.plan:
+                ret = retval.RetVal(retval.RETVAL_ERROR, f"no planned phase: {name}")
+            else:
+                self.phases.append(self.plan[name])
+                self.logger.info(f"Phase {name} of trial {data.get('trial')} triggered")
+                ret = retval.RetVal(retval.RETVAL_OK, "phase received")
+            ret.send(sock, **wire)
+        elif msg_type == MSG_FETCH:
+            self.fetch(data, wire)
+        elif msg_type == MSG_PING:
+            ret = retval.RetVal(retval.RETVAL_OK, "pong")
+            ret.send(sock, **wire)
+        elif msg_type == MSG_STATUS:
+            send_message(sock, MSG_STATUS, player.status(self), **wire)
+        elif msg_type == MSG_SHUTDOWN:
+            self.logger.info("Shutdown requested by the conductor")
+            ret = retval.RetVal(retval.RETVAL_OK, "shutting down")
+            ret.send(sock, **wire)
+            player.shutdown()
+        elif msg_type == MSG_CANCEL:
+            if data.get("all"):
+                with player._sessions_lock:
+                    sessions = list(player.sessions)
+            else:
+                sessions = [self]
+            phases = stopped = dropped = 0
+            for session in sessions:
+                cancelled, killed, discarded = session.cancel()
+                phases += cancelled
+                stopped += killed
+                dropped += discarded
+            self.logger.info(f"Cancelled {phases} phases, stopping {stopped} steps")
+            ret = retval.RetVal(
+                retval.RETVAL_OK,
+                f"cancelled {phases} phases, stopped {stopped} steps, "
+                f"dropped {dropped} queued phases",
+            )
+            ret.send(sock, **wire)
+        elif msg_type == MSG_RUN:
+            if self.running:
+                ret = retval.RetVal(retval.RETVAL_ERROR, "a phase is already running")
+                ret.send(sock, **wire)
+                return
+            self.logger.info("RUN command received")
+            # Phases queued while these run are kept for the next RUN
+            self.cancellation = cancellation.Cancellation(player.kill_grace)
+            queued, self.phases = self.phases, []
+            self.running = True
+            try:
+                for next_phase in queued:
+                    self.logger.info(
+                        f"Running phase with {len(next_phase.steps)} steps"
+                    )
+                    self.spawned.phase = next_phase.name
+                    self.current = next_phase
+                    try:
+                        self.run_phase(next_phase, wire)
+                    finally:
+                        self.current = None
+                    if self.cancellation.cancelled:
+                        skipped = len(next_phase.steps) - len(next_phase.results)
+                        next_phase.results.append(
+                            retval.RetVal(
+                                retval.RETVAL_ERROR,
+                                f"phase cancelled: {skipped} of "
+                                f"{len(next_phase.steps)} steps skipped",
+                            )
+                        )
+                    if next_phase.name == "reset":
+                        # Leftover load generators would skew the next trial
+                        self.spawned.terminate()
+                    # Report spawned commands that have ended since last time
+                    next_phase.results.extend(
+                        ended.to_retval() for ended in self.spawned.finished()
+                    )
+                    next_phase.return_results(
+                        sock, max_batch_bytes=data.get("max_batch_bytes"), **wire
+                    )
+                    # Planned phases are run again in later trials
+                    next_phase.results = []
+            finally:
+                self.running = False
+                self.cancellation = None
+        else:
+            self.logger.warning(f"Unknown message type: {msg_type}")
+            ret = retval.RetVal(retval.RETVAL_BAD_CMD, "no such command")
+            ret.send(sock, **wire)
+
+
+def setup_logging(verbose, quiet, log_file):
+    """Configure logging based on settings."""
+    if quiet:
+        level = logging.ERROR
+    elif verbose:
+        level = logging.DEBUG
+    else:
+        level = logging.INFO
+
+    # Console handler
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(level)
+
+    # Format
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    console_handler.setFormatter(formatter)
+
+    # Root logger
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(console_handler)
+
+    # File handler if specified
+    if log_file:
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(formatter)
+        root_logger.addHandler(file_handler)
+
+    return logging.getLogger(__name__)
+
+
+def validate_positive_int(value):
+    """Validate that value is a positive integer."""
+    ivalue = int(value)
+    if ivalue <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return ivalue
+
+
+def validate_non_negative_float(value):
+    """Validate that value is a number of seconds, zero included."""
+    fvalue = float(value)
+    if fvalue < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, got {value}")
+    return fvalue
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Player - Execute commands from conductor",
+        epilog="Example: player -v config.cfg",
+    )
+
+    parser.add_argument("config", help="Player configuration file path")
+
+    parser.add_argument(
+        "-b",
+        "--bind",
+        default=None,
+        help="Address to bind to, or unix:/path for a Unix domain socket "
+        "(default: the config's unix: player endpoint, else 0.0.0.0)",
+    )
+
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=None,
+        help="Port to listen on (overrides config file)",
+    )
+
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Enable verbose output"
+    )
+
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="Suppress all output except errors"
+    )
+
+    parser.add_argument("-l", "--log-file", help="Log output to file")
+
+    parser.add_argument("--version", action="version", version="Player 1.0")
+
+    parser.add_argument(
+        "--max-message-size",
+        type=validate_positive_int,
+        default=10,
+        metavar="MB",
+        help="Maximum message size in megabytes (default: 10)"
+    )
+
+    parser.add_argument(
+        "--compression",
+        choices=[COMPRESS_NONE] + SUPPORTED_COMPRESSION,
+        default=None,
+        help="Compression for large replies when the conductor accepts it "
+        "(default: zlib)",
+    )
+
+    parser.add_argument(
+        "--compress-threshold",
+        type=validate_positive_int,
+        default=None,
+        metavar="BYTES",
+        help="Only compress messages of at least this size "
+        f"(default: {DEFAULT_COMPRESS_THRESHOLD})",
+    )
+
+    parser.add_argument(
+        "--engine",
+        choices=phase.ENGINES,
+        default=None,
+        help="How to run steps: blocking subprocess calls (thread) or "
+        "subprocesses driven by an event loop (asyncio) (default: thread)",
+    )
+
+    parser.add_argument(
+        "--spool-dir",
+        default=None,
+        metavar="DIR",
+        help="Write step output to spool files in DIR and return only an "
+        "excerpt with each result (default: return all output)",
+    )
+
+    parser.add_argument(
+        "--excerpt-bytes",
+        type=validate_positive_int,
+        default=None,
+        metavar="BYTES",
+        help="Bytes of spooled output returned from each end "
+        f"(default: {spool.DEFAULT_EXCERPT_BYTES})",
+    )
+
+    parser.add_argument(
+        "--max-sessions",
+        type=validate_positive_int,
+        default=None,
+        metavar="N",
+        help="Conductors served at once; more are refused "
+        f"(default: {DEFAULT_MAX_SESSIONS})",
+    )
+
+    parser.add_argument(
+        "--kill-grace",
+        type=validate_non_negative_float,
+        default=None,
+        metavar="SECONDS",
+        help="Time timed-out, cancelled and spawned commands get to exit after "
+        f"SIGTERM before SIGKILL (default: {background.DEFAULT_KILL_GRACE:g})",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+
+    # Setup logging
+    logger = setup_logging(args.verbose, args.quiet, args.log_file)
+
+    # Check if config file exists
+    if not os.path.exists(args.config):
+        logger.error(f"Configuration file not found: {args.config}")
+        sys.exit(1)
+
+    # Read configuration
+    logger.info(f"Reading configuration from: {args.config}")
+    local_config = configparser.ConfigParser()
+
+    try:
+        local_config.read(args.config)
+    except Exception as e:
+        logger.error(f"Failed to read configuration: {e}")
+        sys.exit(1)
+
+    # Get configuration values
+    try:
+        defaults = local_config["Coordinator"]
+        if args.bind is None:
+            if unix_socket_path(defaults.get("player", "")) is not None:
+                args.bind = defaults["player"]
+            else:
+                args.bind = "0.0.0.0"
+        if unix_socket_path(args.bind) is not None:
+            cmdport = None  # Unix domain sockets need no port
+        else:
+            cmdport = args.port if args.port is not None else int(defaults["cmdport"])
+        
+        # Get max_message_size from config if not overridden by CLI
+        if args.max_message_size == 10:  # Default value, not CLI-specified
+            config_max_size = defaults.get("max_message_size")
+            if config_max_size:
+                try:
+                    args.max_message_size = validate_positive_int(config_max_size)
+                except argparse.ArgumentTypeError as e:
+                    logger.error(f"Invalid max_message_size in config: {e}")
+                    sys.exit(1)
+
+        # Get compression settings from config if not specified on command line
+        if args.compression is None:
+            args.compression = defaults.get("compression", COMPRESS_ZLIB)
+            if args.compression not in [COMPRESS_NONE] + SUPPORTED_COMPRESSION:
+                logger.error(f"Invalid compression in config: {args.compression}")
+                sys.exit(1)
+        if args.compress_threshold is None:
+            try:
+                args.compress_threshold = validate_positive_int(
+                    defaults.get("compress_threshold", DEFAULT_COMPRESS_THRESHOLD)
+                )
+            except (ValueError, argparse.ArgumentTypeError) as e:
+                logger.error(f"Invalid compress_threshold in config: {e}")
+                sys.exit(1)
+
+        if args.engine is None:
+            args.engine = defaults.get("engine", phase.ENGINE_THREAD)
+            if args.engine not in phase.ENGINES:
+                logger.error(f"Invalid engine in config: {args.engine}")
+                sys.exit(1)
+
+        # Get spool settings from config if not specified on command line
+        if args.spool_dir is None:
+            args.spool_dir = defaults.get("spool_dir")
+        if args.excerpt_bytes is None:
+            try:
+                args.excerpt_bytes = validate_positive_int(
+                    defaults.get("excerpt_bytes", spool.DEFAULT_EXCERPT_BYTES)
+                )
+            except (ValueError, argparse.ArgumentTypeError) as e:
+                logger.error(f"Invalid excerpt_bytes in config: {e}")
+                sys.exit(1)
+
+        if args.max_sessions is None:
+            try:
+                args.max_sessions = validate_positive_int(
+                    defaults.get("max_sessions", DEFAULT_MAX_SESSIONS)
+                )
+            except (ValueError, argparse.ArgumentTypeError) as e:
+                logger.error(f"Invalid max_sessions in config: {e}")
+                sys.exit(1)
+
+        if args.kill_grace is None:
+            try:
+                args.kill_grace = validate_non_negative_float(
+                    defaults.get("kill_grace", background.DEFAULT_KILL_GRACE)
+                )
+            except (ValueError, argparse.ArgumentTypeError) as e:
+                logger.error(f"Invalid kill_grace in config: {e}")
+                sys.exit(1)
+
+    except KeyError:
+        logger.error("Configuration missing [Coordinator] section or cmdport setting")
+        sys.exit(1)
+
+    # Create and run player
+    try:
+        play = Player(
+            args.bind,
+            cmdport,
+            max_message_size=args.max_message_size,
+            compression=args.compression,
+            compress_threshold=args.compress_threshold,
+            engine=args.engine,
+            spool_dir=args.spool_dir,
+            excerpt_bytes=args.excerpt_bytes,
+            max_sessions=args.max_sessions,
+            kill_grace=args.kill_grace,
+        )
+
+        # Handle signals gracefully
+        def signal_handler(signum, frame):
+            logger.info(f"Received signal {signum}")
+            play.shutdown()
+            sys.exit(0)
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+
+        logger.info(f"Player started on {play.endpoint}")
+        print(f"Player listening on {play.endpoint}")
+
+        play.run()
+
+    except OSError as e:
+        endpoint = args.bind if cmdport is None else f"{args.bind}:{cmdport}"
+        logger.error(f"Failed to bind to {endpoint}: {e}")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Player-side spool files for step output.
+
+A player started with a spool directory writes each step's stdout to
+its own file there instead of holding it in memory.  Only a head and
+tail excerpt of the output is returned with the step's result, along
+with a summary the conductor can use to fetch the rest later:
+
+    {"spool": "4711-3", "size": bytes, "sha256": hex digest,
+     "truncated": true if the excerpt leaves anything out}
+
+Spool files are kept until the player shuts down, so output can still
+be fetched after the conductor has reconnected.
+"""
+
+import hashlib
+import itertools
+import os
+import re
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from conductor.json_protocol import DEFAULT_CHUNK_SIZE
+
+# Bytes of output kept from each end of a spooled step for its result
+DEFAULT_EXCERPT_BYTES = 4096
+
+# Spool IDs are "<player pid>-<n>", which also keeps them to plain file names
+_SPOOL_ID = re.compile(r"^\d+-\d+$")
+
+
+class OutputSpool:
+    """A directory of spool files, one per step run"""
+
+    def __init__(self, directory: str, excerpt_bytes: int = DEFAULT_EXCERPT_BYTES):
+        if excerpt_bytes < 1:
+            raise ValueError(f"excerpt_bytes must be positive, got {excerpt_bytes}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.excerpt_bytes = excerpt_bytes
+        self._ids = itertools.count(1)
+        self._created = []
+
+    def open(self) -> "SpoolWriter":
+        """Start a spool file for the output of one step"""
+        spool_id = f"{os.getpid()}-{next(self._ids)}"
+        path = os.path.join(self.directory, f"{spool_id}.out")
+        self._created.append(path)
+        return SpoolWriter(spool_id, path, self.excerpt_bytes)
+
+    def path(self, spool_id: str) -> str:
+        """Return the file of a spool ID, raising KeyError if there is none"""
+        if not isinstance(spool_id, str) or not _SPOOL_ID.match(spool_id):
+            raise KeyError(f"no such spool: {spool_id}")
+        path = os.path.join(self.directory, f"{spool_id}.out")
+        if not os.path.exists(path):
+            raise KeyError(f"no such spool: {spool_id}")
+        return path
+
+    def read(
+        self,
+        spool_id: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Tuple[int, Iterator[bytes]]:
+        """Return the size of a byte range of a spool file and its chunks
+
+        The range is clipped to the file.  The chunks are read lazily,
+        so only one of them is in memory at a time.
+        """
+        path = self.path(spool_id)
+        size = os.path.getsize(path)
+        if offset < 0 or (length is not None and length < 0):
+            raise ValueError("offset and length must not be negative")
+        start = min(offset, size)
+        end = size if length is None else min(start + length, size)
+
+        def chunks():
+            with open(path, "rb") as spooled:
+                spooled.seek(start)
+                remaining = end - start
+                while remaining:
+                    chunk = spooled.read(min(chunk_size, remaining))
+                    if not chunk:
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+
+        return end - start, chunks()
+
+    def clear(self) -> None:
+        """Remove every spool file this spool created"""
+        for path in self._created:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self._created = []
+
+
+class SpoolWriter:
+    """Write one step's output to its spool file, keeping an excerpt"""
+
+    def __init__(self, spool_id: str, path: str, excerpt_bytes: int):
+        self.spool_id = spool_id
+        self.excerpt_bytes = excerpt_bytes
+        self.size = 0
+        self.head = bytearray()
+        self.tail = bytearray()
+        self._hash = hashlib.sha256()
+        self._file = open(path, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+        room = self.excerpt_bytes - len(self.head)
+        if room > 0:
+            self.head.extend(data[:room])
+            data = data[room:]
+        if data:
+            self.tail.extend(data)
+            del self.tail[: -self.excerpt_bytes]
+
+    def close(self) -> Tuple[str, Dict[str, Any]]:
+        """Close the file and return the output excerpt and its summary"""
+        self._file.close()
+        excerpt = self.head.decode(errors="replace")
+        omitted = self.size - len(self.head) - len(self.tail)
+        if omitted:
+            excerpt += f"\n[... {omitted} bytes omitted ...]\n"
+        excerpt += self.tail.decode(errors="replace")
+        summary = {
+            "spool": self.spool_id,
+            "size": self.size,
+            "sha256": self._hash.hexdigest(),
+            "truncated": omitted > 0,
+        }
+        return excerpt, summary
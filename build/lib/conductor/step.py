@@ -0,0 +1,447 @@
+# Copyright (c) 2014, Neville-Neil Consulting
+# Copyright (c) 2025, Ben Roeder
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Author: George V. Neville-Neil
+# Current Maintainer: Ben Roeder
+#
+# Description: A step allows us to encapsulate a command and work with
+# it, including recording the errors and the like that we might get
+# back from it.
+
+import asyncio
+import functools
+import subprocess
+import shlex
+import sys
+import threading
+
+from conductor import accounting, background, retval
+
+# Names of the child's output pipes, as reported to output callbacks
+STDOUT = "stdout"
+STDERR = "stderr"
+
+# A line longer than this is passed on in pieces of this many bytes
+MAX_OUTPUT_CHUNK = 64 * 1024
+
+# Characters that make a command need /bin/sh.  Quotes are left out:
+# without any of these, shlex.split() gives the same words as the shell.
+SHELL_METACHARACTERS = frozenset("|&;<>()$`\\*?[]{}~#!\n")
+
+# First words the shell handles itself, which have no binary to exec
+SHELL_BUILTINS = frozenset(
+    [
+        ".",
+        "alias",
+        "bg",
+        "break",
+        "case",
+        "cd",
+        "command",
+        "continue",
+        "eval",
+        "exec",
+        "exit",
+        "export",
+        "fg",
+        "for",
+        "getopts",
+        "hash",
+        "if",
+        "jobs",
+        "local",
+        "read",
+        "readonly",
+        "return",
+        "set",
+        "shift",
+        "source",
+        "time",
+        "trap",
+        "type",
+        "ulimit",
+        "umask",
+        "unalias",
+        "unset",
+        "until",
+        "wait",
+        "while",
+    ]
+)
+
+
+def needs_shell(command):
+    """Return whether a command has to be run by /bin/sh
+
+    A command without shell syntax, variable assignments or builtins
+    can be exec'd directly, which saves starting a shell for it.
+    """
+    if SHELL_METACHARACTERS.intersection(command):
+        return True
+    try:
+        args = shlex.split(command)
+    except ValueError:
+        return True
+    return not args or "=" in args[0] or args[0] in SHELL_BUILTINS
+
+
+class Step:
+    def __init__(
+        self,
+        command,
+        spawn=False,
+        timeout=30,
+        group=None,
+        kill_grace=background.DEFAULT_KILL_GRACE,
+    ):
+        # Store the original command for shell execution
+        self.command = command
+        try:
+            self.args = shlex.split(command)
+        except ValueError:
+            # Handle invalid shell syntax like unclosed quotes
+            # Fall back to simple split
+            self.args = command.split()
+        self.spawn = spawn
+        self.timeout = timeout
+        # Seconds a timed-out command's group gets between SIGTERM and SIGKILL
+        self.kill_grace = kill_grace
+        # Plain commands are exec'd directly instead of through /bin/sh
+        self.shell = needs_shell(command)
+        # Steps sharing a group with their neighbours run concurrently
+        self.group = group
+
+    def run(self, output=None, spool=None, spawned=None, cancel=None):
+        """Run the step, returning a RetVal
+
+        With an output callback, each line the command writes is passed
+        to output(stream, line) as soon as it is read instead of being
+        returned in the RetVal, and with an OutputSpool stdout goes to a
+        spool file; see async_run().  A spawned command is tracked in
+        the SpawnRegistry given as spawned, if there is one.
+
+        The command runs in a process group of its own, which is
+        registered with the Cancellation given as cancel while it runs
+        so that the group can be stopped mid-step.
+        """
+        if (output is not None or spool is not None) and not self.spawn:
+            return asyncio.run(self.async_run(output, spool, cancel=cancel))
+        if self.spawn:
+            if spawned is not None:
+                spawned.spawn(self.command)
+                return retval.RetVal(0, "Spawned")
+            # For spawn mode, use the original command with shell=True
+            output = subprocess.Popen(self.command, shell=True)
+            return retval.RetVal(0, "Spawned")
+        else:
+            try:
+                # Only commands using shell features go through the
+                # shell, given the original string to preserve quoting
+                proc = accounting.AccountedPopen(
+                    self.command if self.shell else self.args,
+                    shell=self.shell,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    start_new_session=True,
+                )
+            except FileNotFoundError:
+                print("Command not found: ", self.args[0])
+                return retval.RetVal(
+                    retval.RETVAL_ERROR,
+                    f"Command not found: {self.args[0]}",
+                )
+            if cancel is not None:
+                cancel.started(proc)
+            try:
+                stdout, stderr = proc.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                # The command's whole process group is stopped.  Its pipes
+                # are closed rather than drained, as anything that left
+                # the group may still hold them.
+                killed = background.terminate_group(proc, self.kill_grace)
+                proc.stdout.close()
+                proc.stderr.close()
+                return self._timed_out(proc, killed)
+            finally:
+                if cancel is not None:
+                    cancel.finished(proc)
+            if self._cancelled(proc, cancel):
+                ret = retval.RetVal(retval.RETVAL_ERROR, "Command cancelled")
+                ret.usage = proc.usage(len(stdout), len(stderr))
+                return ret
+            output = (
+                stdout.decode(errors="replace")
+                .replace("\r\n", "\n")
+                .replace("\r", "\n")
+            )
+            if stderr:
+                # stderr is left on the player's own stderr
+                print(stderr.decode(errors="replace"), end="", file=sys.stderr)
+            if proc.returncode != 0:
+                print(
+                    "Code: ",
+                    proc.returncode,
+                    "Command: ",
+                    self.command,
+                    "Output: ",
+                    output,
+                )
+                ret = retval.RetVal(proc.returncode, self.command)
+            else:
+                print("Success: ", output)
+                ret = retval.RetVal(0, output)
+            ret.usage = proc.usage(len(stdout), len(stderr))
+            return ret
+
+    def _timed_out(self, proc, killed):
+        """Return the result of a command stopped by its timeout"""
+        print("Timeout on: ", self.command)
+        for process in killed:
+            print("Killed: ", process["pid"], process["signal"], process["command"])
+        ret = retval.RetVal(
+            retval.RETVAL_ERROR,
+            f"Command timed out after {self.timeout} seconds",
+            killed=killed,
+        )
+        ret.usage = proc.usage()
+        return ret
+
+    def _cancelled(self, proc, cancel):
+        """Return whether a reaped command was stopped by a cancellation
+
+        A command that had already finished successfully keeps its
+        result.
+        """
+        if cancel is None or not cancel.cancelled or proc.returncode == 0:
+            return False
+        print("Cancelled: ", self.command)
+        return True
+
+    async def async_run(self, output=None, spool=None, spawned=None, cancel=None):
+        """Run the step as a coroutine on the running event loop
+
+        Gives the same results as run(), but waits for the command
+        without blocking, enforces the timeout with the event loop and
+        drains stdout and stderr as they arrive so neither pipe can
+        fill up.
+
+        With an output callback, output(stream, line) is called with
+        STDOUT or STDERR and each line (or MAX_OUTPUT_CHUNK piece of a
+        longer one) as it is read, and nothing is kept: a successful
+        step then returns an empty message.  A callback that blocks
+        holds up the command once its pipe fills, which is how a slow
+        reader pushes back.
+
+        With an OutputSpool, stdout is written to a new spool file as it
+        arrives.  The RetVal's output is then the file's summary, and a
+        successful step's message is the spool's head and tail excerpt.
+
+        The command is registered with the Cancellation given as cancel
+        while it runs, as in run().
+        """
+        if self.spawn:
+            # An asyncio child would be killed along with its event loop
+            return self.run(spawned=spawned)
+        writer = spool.open() if spool is not None else None
+        try:
+            ret = await self._run_piped(output, writer, cancel)
+        finally:
+            if writer is not None:
+                excerpt, summary = writer.close()
+        if writer is not None:
+            ret.output = summary
+            if ret.code == retval.RETVAL_OK:
+                ret.message = excerpt
+        return ret
+
+    async def _run_piped(self, output, writer, cancel=None):
+        """Run the command with its output read through _OutputProtocol"""
+        loop = asyncio.get_running_loop()
+        try:
+            proc = accounting.AccountedPopen(
+                self.command if self.shell else self.args,
+                shell=self.shell,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=True,
+            )
+        except FileNotFoundError:
+            print("Command not found: ", self.args[0])
+            return retval.RetVal(
+                retval.RETVAL_ERROR,
+                f"Command not found: {self.args[0]}",
+            )
+        if cancel is not None:
+            cancel.started(proc)
+        pipes = _OutputProtocol(loop, output, writer)
+        exited = loop.create_future()
+        exited.add_done_callback(lambda _: pipes.process_exited())
+        # The child is reaped by a thread of its own, as asyncio's child
+        # watcher would, so that wait4() can collect its rusage.
+        threading.Thread(target=_reap, args=(loop, proc, exited), daemon=True).start()
+        readers = []
+        try:
+            for fd, pipe in ((1, proc.stdout), (2, proc.stderr)):
+                reader, _ = await loop.connect_read_pipe(
+                    functools.partial(_PipeReader, pipes, fd), pipe
+                )
+                readers.append(reader)
+            await asyncio.wait_for(pipes.finished, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # Like run(), the whole process group is stopped, waiting
+            # for the grace period in a thread, and the pipes are closed
+            # rather than drained.
+            killed = await loop.run_in_executor(
+                None, background.terminate_group, proc, self.kill_grace
+            )
+            await exited
+            return self._timed_out(proc, killed)
+        finally:
+            if not exited.done():
+                # Cancelled, or the pipes could not be read
+                proc.kill()
+            for reader in readers:
+                reader.close()
+            if cancel is not None:
+                cancel.finished(proc)
+        if self._cancelled(proc, cancel):
+            ret = retval.RetVal(retval.RETVAL_ERROR, "Command cancelled")
+            ret.usage = proc.usage(pipes.byte_counts[1], pipes.byte_counts[2])
+            return ret
+        returncode = proc.returncode
+        stdout = pipes.stdout.decode(errors="replace")
+        if pipes.stderr:
+            # run() leaves stderr on the player's own stderr
+            print(pipes.stderr.decode(errors="replace"), end="", file=sys.stderr)
+        if returncode != 0:
+            print(
+                "Code: ",
+                returncode,
+                "Command: ",
+                self.command,
+                "Output: ",
+                stdout,
+            )
+            ret = retval.RetVal(returncode, self.command)
+        else:
+            print("Success: ", stdout)
+            ret = retval.RetVal(0, stdout)
+        ret.usage = proc.usage(pipes.byte_counts[1], pipes.byte_counts[2])
+        return ret
+
+
+def _reap(loop, proc, exited):
+    """Wait for a child in a thread and resolve exited on its loop"""
+    proc.wait()
+    try:
+        loop.call_soon_threadsafe(_resolve, exited)
+    except RuntimeError:
+        # The loop has closed; nothing is waiting any more
+        pass
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _PipeReader(asyncio.Protocol):
+    """Pass one of a child's pipes on to its _OutputProtocol"""
+
+    def __init__(self, pipes, fd):
+        self.pipes = pipes
+        self.fd = fd
+
+    def data_received(self, data):
+        self.pipes.pipe_data_received(self.fd, data)
+
+    def connection_lost(self, exc):
+        self.pipes.pipe_connection_lost(self.fd, exc)
+
+
+class _OutputProtocol(asyncio.SubprocessProtocol):
+    """Collect a child's stdout and stderr until it exits
+
+    With an output callback the pipes are split into lines and passed
+    on instead of being collected, and with a spool writer stdout is
+    written to it instead.
+    """
+
+    def __init__(self, loop, output=None, spool=None):
+        self.stdout = bytearray()
+        self.stderr = bytearray()
+        self.output = output
+        self.spool = spool
+        # Bytes read from each pipe, by file descriptor
+        self.byte_counts = {1: 0, 2: 0}
+        # Set once the child has exited and both pipes are closed
+        self.finished = loop.create_future()
+        self.open_pipes = 2
+        self.exited = False
+
+    def pipe_data_received(self, fd, data):
+        self.byte_counts[fd] += len(data)
+        if fd == 1 and self.spool is not None:
+            self.spool.write(data)
+            if self.output is None:
+                return
+        buffer = self.stdout if fd == 1 else self.stderr
+        buffer.extend(data)
+        if self.output is None:
+            return
+        stream = STDOUT if fd == 1 else STDERR
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start) + 1
+            if not end:
+                end = start + MAX_OUTPUT_CHUNK
+                if end > len(buffer):
+                    break
+            self.output(stream, buffer[start:end].decode(errors="replace"))
+            start = end
+        del buffer[:start]
+
+    def pipe_connection_lost(self, fd, exc):
+        buffer = self.stdout if fd == 1 else self.stderr
+        if self.output is not None and buffer:
+            # The last line had no newline
+            self.output(STDOUT if fd == 1 else STDERR, buffer.decode(errors="replace"))
+            buffer.clear()
+        self.open_pipes -= 1
+        self._check_finished()
+
+    def process_exited(self):
+        self.exited = True
+        self._check_finished()
+
+    def _check_finished(self):
+        if self.exited and not self.open_pipes and not self.finished.done():
+            self.finished.set_result(None)
@@ -0,0 +1,70 @@
+"""Resource accounting for the commands a player runs.
+
+Steps are started as AccountedPopen processes, which are reaped with
+os.wait4() so that the child's own resource usage comes back with its
+exit status.  usage() turns that into the "usage" field of the step's
+result:
+
+    {"started": s, "ended": s, "wall": s, "user": s, "sys": s,
+     "maxrss": KB, "nvcsw": n, "nivcsw": n,
+     "stdout_bytes": n, "stderr_bytes": n}
+
+started and ended are the player's monotonic clock, so they only
+compare with each other; the byte counts are there when the player read
+the command's output itself.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+
+# ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+_MAXRSS_DIVISOR = 1024 if sys.platform == "darwin" else 1
+
+
+class AccountedPopen(subprocess.Popen):
+    """A Popen that keeps the child's rusage when it is reaped"""
+
+    def __init__(self, *args, **kwargs):
+        self.started = time.monotonic()
+        self.ended = None
+        self.rusage = None
+        super().__init__(*args, **kwargs)
+
+    def _try_wait(self, wait_flags):
+        # Popen.wait() reaps through here with os.waitpid(); wait4() is
+        # the same call returning the child's rusage as well.
+        try:
+            pid, status, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            # Reaped elsewhere, e.g. with SIGCHLD ignored; Popen does
+            # the same in that case.
+            return self.pid, 0
+        if pid == self.pid:
+            self.ended = time.monotonic()
+            self.rusage = rusage
+        return pid, status
+
+    def usage(
+        self, stdout_bytes: Optional[int] = None, stderr_bytes: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Return what the reaped child used, or None before it is reaped"""
+        if self.rusage is None:
+            return None
+        usage = {
+            "started": self.started,
+            "ended": self.ended,
+            "wall": self.ended - self.started,
+            "user": self.rusage.ru_utime,
+            "sys": self.rusage.ru_stime,
+            "maxrss": self.rusage.ru_maxrss // _MAXRSS_DIVISOR,
+            "nvcsw": self.rusage.ru_nvcsw,
+            "nivcsw": self.rusage.ru_nivcsw,
+        }
+        if stdout_bytes is not None:
+            usage["stdout_bytes"] = stdout_bytes
+        if stderr_bytes is not None:
+            usage["stderr_bytes"] = stderr_bytes
+        return usage
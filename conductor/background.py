@@ -0,0 +1,224 @@
+"""Tracking of steps a player spawns into the background.
+
+A spawned step's command keeps running after its step has returned.
+The player records each one in a SpawnRegistry for the session, which
+reaps it in a waiter thread as soon as it exits and remembers its exit
+code and runtime until they are reported.  Every spawned command is
+started in a session (and so a process group) of its own, so that
+terminate() can stop it together with anything it started in turn.
+terminate_group() stops a step's command the same way when it times
+out, and says which processes it stopped.
+"""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from conductor import accounting, retval
+
+# Seconds spawned commands get to exit after SIGTERM before SIGKILL
+DEFAULT_KILL_GRACE = 2.0
+
+
+def signal_group(pid: int, signum: int) -> bool:
+    """Signal the process group a command leads; False if it is already gone"""
+    try:
+        os.killpg(pid, signum)
+    except ProcessLookupError:
+        # Exited (and the whole group with it) in the meantime
+        return False
+    return True
+
+
+def group_alive(pgid: int) -> bool:
+    """Return whether anything is left of a process group"""
+    try:
+        os.killpg(pgid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def group_members(pgid: int) -> List[Dict[str, Any]]:
+    """Return the live processes of a group as {"pid", "command"} dicts
+
+    Read from /proc where there is one and from ps(1) elsewhere.
+    """
+    if os.path.isdir("/proc/self"):
+        members = _proc_group_members(pgid)
+    else:
+        members = _ps_group_members(pgid)
+    return sorted(members, key=lambda member: member["pid"])
+
+
+def _proc_group_members(pgid):
+    members = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat_file:
+                stat = stat_file.read()
+            with open(f"/proc/{entry}/cmdline", "rb") as cmdline_file:
+                cmdline = cmdline_file.read()
+        except OSError:
+            # Exited while we looked
+            continue
+        # The name in parentheses may itself contain spaces or ")"
+        name = stat[stat.index("(") + 1 : stat.rindex(")")]
+        state, _, pgrp = stat[stat.rindex(")") + 2 :].split()[:3]
+        if int(pgrp) != pgid or state == "Z":
+            continue
+        command = cmdline.rstrip(b"\0").replace(b"\0", b" ").decode(errors="replace")
+        members.append({"pid": int(entry), "command": command or name})
+    return members
+
+
+def _ps_group_members(pgid):
+    try:
+        listing = subprocess.run(
+            ["ps", "-A", "-o", "pid=", "-o", "pgid=", "-o", "stat=", "-o", "command="],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        ).stdout.decode(errors="replace")
+    except (OSError, subprocess.CalledProcessError):
+        return []
+    members = []
+    for line in listing.splitlines():
+        fields = line.split(None, 3)
+        if len(fields) < 3 or not fields[0].isdigit() or not fields[1].isdigit():
+            continue
+        if int(fields[1]) != pgid or fields[2].startswith("Z"):
+            continue
+        command = fields[3] if len(fields) > 3 else ""
+        members.append({"pid": int(fields[0]), "command": command})
+    return members
+
+
+def terminate_group(
+    proc: accounting.AccountedPopen, grace: float = DEFAULT_KILL_GRACE
+) -> List[Dict[str, Any]]:
+    """Stop the process group a command leads, and reap the command
+
+    The group gets SIGTERM, and whatever is left of it after grace
+    seconds gets SIGKILL.  Returns the processes that were in the group
+    as {"pid", "command", "signal"} dicts, signal being the name of the
+    last signal each was sent.
+    """
+    members = group_members(proc.pid)
+    signal_group(proc.pid, signal.SIGTERM)
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline:
+        # Reaping the command lets its group empty out
+        proc.poll()
+        if not group_alive(proc.pid):
+            break
+        time.sleep(0.01)
+    stubborn = group_members(proc.pid)
+    if stubborn:
+        signal_group(proc.pid, signal.SIGKILL)
+    proc.wait()
+    killed = {member["pid"]: dict(member, signal="SIGTERM") for member in members}
+    for member in stubborn:
+        # Including anything started after the first look
+        killed[member["pid"]] = dict(member, signal="SIGKILL")
+    return [killed[pid] for pid in sorted(killed)]
+
+
+class Spawned:
+    """A spawned command and, once it has exited, how it ended"""
+
+    def __init__(
+        self, proc: accounting.AccountedPopen, command: str, phase: Optional[str]
+    ):
+        self.proc = proc
+        self.command = command
+        self.phase = phase
+        self.started = time.monotonic()
+        self.ended = None
+        self.returncode = None
+        self.terminated = False  # Stopped by terminate() rather than exiting
+        self.waiter = None
+
+    @property
+    def runtime(self) -> float:
+        """Seconds the command has run, or ran for if it has exited"""
+        return (self.ended or time.monotonic()) - self.started
+
+    def to_retval(self) -> retval.RetVal:
+        """Describe how the command ended as a result"""
+        how = "was terminated" if self.terminated else f"exited with {self.returncode}"
+        return retval.RetVal(
+            self.returncode,
+            f"spawned {self.command} {how} after {self.runtime:.3f} seconds",
+            spawned={
+                "pid": self.proc.pid,
+                "command": self.command,
+                "phase": self.phase,
+                "runtime": self.runtime,
+                "terminated": self.terminated,
+            },
+            usage=self.proc.usage(),
+        )
+
+
+class SpawnRegistry:
+    """The spawned commands of one session"""
+
+    def __init__(self, kill_grace: float = DEFAULT_KILL_GRACE):
+        self.kill_grace = kill_grace
+        self.phase = None  # Name of the phase now running, if known
+        self._lock = threading.Lock()
+        self._running: List[Spawned] = []
+        self._finished: List[Spawned] = []
+
+    def spawn(self, command: str) -> Spawned:
+        """Start a command in the background and track it"""
+        proc = accounting.AccountedPopen(command, shell=True, start_new_session=True)
+        entry = Spawned(proc, command, self.phase)
+        with self._lock:
+            self._running.append(entry)
+        entry.waiter = threading.Thread(target=self._reap, args=(entry,), daemon=True)
+        entry.waiter.start()
+        return entry
+
+    def _reap(self, entry: Spawned) -> None:
+        returncode = entry.proc.wait()
+        with self._lock:
+            entry.ended = time.monotonic()
+            entry.returncode = returncode
+            self._running.remove(entry)
+            self._finished.append(entry)
+
+    def running(self) -> List[Spawned]:
+        """Return the spawned commands that have not exited yet"""
+        with self._lock:
+            return list(self._running)
+
+    def finished(self) -> List[Spawned]:
+        """Return the commands that exited since the last call, oldest first"""
+        with self._lock:
+            finished, self._finished = self._finished, []
+        return finished
+
+    def terminate(self) -> None:
+        """Stop every running command's process group and reap it
+
+        Each group gets SIGTERM, and whatever is left of it after
+        kill_grace seconds, including children that outlived the
+        command itself, gets SIGKILL.
+        """
+        running = self.running()
+        for entry in running:
+            entry.terminated = signal_group(entry.proc.pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.kill_grace
+        for entry in running:
+            entry.waiter.join(max(0, deadline - time.monotonic()))
+            signal_group(entry.proc.pid, signal.SIGKILL)
+            entry.waiter.join()
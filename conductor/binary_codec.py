@@ -0,0 +1,228 @@
+"""Compact binary encoding for conductor messages.
+
+A stdlib-only alternative to the JSON encoding used by json_protocol.
+Values are written as a one-byte type tag followed by their contents:
+integers as zigzag varints, strings and byte strings as a varint length
+followed by the raw bytes, and lists and dicts as a varint count
+followed by their members.  Dict keys are always strings and carry no
+tag.  Messages start with the protocol version and an integer tag for
+the message type instead of spelled-out "version"/"type"/"data" keys,
+and may end with an integer request ID.
+
+The codec only covers what JSON can carry, plus bytes.  Malformed input
+raises ValueError and values that cannot be encoded raise TypeError,
+as the json module does.
+"""
+
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+# Value type tags
+T_NONE = 0
+T_FALSE = 1
+T_TRUE = 2
+T_INT = 3
+T_FLOAT = 4
+T_STR = 5
+T_BYTES = 6
+T_LIST = 7
+T_DICT = 8
+
+# Message type tags; tag 0 means the type name follows as a string
+MESSAGE_TAGS = {
+    "phase": 1,
+    "run": 2,
+    "config": 3,
+    "result": 4,
+    "results": 5,
+    "done": 6,
+    "error": 7,
+    "hello": 8,
+    "plan": 9,
+    "trigger": 10,
+    "heartbeat": 11,
+    "output": 12,
+    "fetch": 13,
+    "ping": 14,
+    "status": 15,
+    "shutdown": 16,
+    "cancel": 17,
+}
+_MESSAGE_NAMES = {tag: name for name, tag in MESSAGE_TAGS.items()}
+
+_DOUBLE = struct.Struct("!d")
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """Append a non-negative integer as a little-endian base-128 varint."""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_str(out: bytearray, value: str) -> None:
+    data = value.encode("utf-8", "surrogatepass")
+    _write_varint(out, len(data))
+    out += data
+
+
+def _encode_value(out: bytearray, value: Any) -> None:
+    kind = type(value)
+    if kind is str:
+        out.append(T_STR)
+        _write_str(out, value)
+    elif kind is int:
+        out.append(T_INT)
+        # Zigzag so small negative numbers stay short
+        _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    elif kind is dict:
+        out.append(T_DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            if type(key) is not str:
+                raise TypeError(f"dict keys must be str, not {type(key).__name__}")
+            _write_str(out, key)
+            _encode_value(out, item)
+    elif kind is list or kind is tuple:
+        out.append(T_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _encode_value(out, item)
+    elif value is None:
+        out.append(T_NONE)
+    elif value is True:
+        out.append(T_TRUE)
+    elif value is False:
+        out.append(T_FALSE)
+    elif kind is float:
+        out.append(T_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif kind is bytes or kind is bytearray or kind is memoryview:
+        out.append(T_BYTES)
+        _write_varint(out, len(value))
+        out += value
+    else:
+        # Subclasses of the supported types (e.g. IntEnum) encode as their base
+        for base in (str, int, float, dict, list, tuple, bytes):
+            if isinstance(value, base):
+                _encode_value(out, base(value))
+                return
+        raise TypeError(f"Object of type {kind.__name__} is not encodable")
+
+
+def _read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_str(buf: bytes, pos: int) -> Tuple[str, int]:
+    length = buf[pos]
+    if length < 0x80:
+        pos += 1
+    else:
+        length, pos = _read_varint(buf, pos)
+    end = pos + length
+    if end > len(buf):
+        raise ValueError("string runs past the end of the message")
+    return buf[pos:end].decode("utf-8", "surrogatepass"), end
+
+
+def _decode_value(buf: bytes, pos: int) -> Tuple[Any, int]:
+    # Most strings and integers are short, so single-byte varints are
+    # read inline rather than through _read_varint.
+    tag = buf[pos]
+    pos += 1
+    if tag == T_STR:
+        return _read_str(buf, pos)
+    if tag == T_INT:
+        value = buf[pos]
+        if value < 0x80:
+            pos += 1
+        else:
+            value, pos = _read_varint(buf, pos)
+        return (value >> 1) ^ -(value & 1), pos
+    if tag == T_DICT:
+        count, pos = _read_varint(buf, pos)
+        result = {}
+        for _ in range(count):
+            key, pos = _read_str(buf, pos)
+            result[key], pos = _decode_value(buf, pos)
+        return result, pos
+    if tag == T_LIST:
+        count, pos = _read_varint(buf, pos)
+        items = []
+        append = items.append
+        for _ in range(count):
+            item, pos = _decode_value(buf, pos)
+            append(item)
+        return items, pos
+    if tag == T_NONE:
+        return None, pos
+    if tag == T_TRUE:
+        return True, pos
+    if tag == T_FALSE:
+        return False, pos
+    if tag == T_FLOAT:
+        return _DOUBLE.unpack_from(buf, pos)[0], pos + _DOUBLE.size
+    if tag == T_BYTES:
+        length, pos = _read_varint(buf, pos)
+        end = pos + length
+        if end > len(buf):
+            raise ValueError("bytes run past the end of the message")
+        return buf[pos:end], end
+    raise ValueError(f"unknown value tag {tag}")
+
+
+def encode_message(
+    version: int, msg_type: str, data: Dict[str, Any], request_id: Optional[int] = None
+) -> bytearray:
+    """Encode a message envelope and its data, plus an optional request ID."""
+    out = bytearray()
+    _write_varint(out, version)
+    tag = MESSAGE_TAGS.get(msg_type)
+    if tag is None:
+        out.append(0)
+        _write_str(out, msg_type)
+    else:
+        _write_varint(out, tag)
+    _encode_value(out, data)
+    if request_id is not None:
+        out.append(T_INT)
+        _write_varint(out, request_id * 2)
+    return out
+
+
+def decode_message(payload) -> Tuple[int, str, Any]:
+    """Decode a message into (version, type, data)."""
+    return decode_envelope(payload)[:3]
+
+
+def decode_envelope(payload) -> Tuple[int, str, Any, Optional[int]]:
+    """Decode a message into (version, type, data, request ID or None)."""
+    buf = payload if type(payload) is bytes else bytes(payload)
+    request_id = None
+    try:
+        version, pos = _read_varint(buf, 0)
+        tag, pos = _read_varint(buf, pos)
+        if tag == 0:
+            msg_type, pos = _read_str(buf, pos)
+        elif tag in _MESSAGE_NAMES:
+            msg_type = _MESSAGE_NAMES[tag]
+        else:
+            raise ValueError(f"unknown message type tag {tag}")
+        data, pos = _decode_value(buf, pos)
+        if pos < len(buf) and buf[pos] == T_INT:
+            request_id, pos = _decode_value(buf, pos)
+    except (IndexError, struct.error):
+        raise ValueError("truncated message")
+    if pos != len(buf):
+        raise ValueError(f"{len(buf) - pos} trailing bytes after message")
+    return version, msg_type, data, request_id
@@ -0,0 +1,85 @@
+"""Cancellation of the phases a player is running.
+
+A session makes a Cancellation for each RUN and passes it down to the
+phases and steps it runs.  Each step's command is started in a session
+(and so a process group) of its own and registered with started() for
+as long as it runs.  cancel() then stops every registered group the way
+SpawnRegistry.terminate() stops spawned commands: SIGTERM, and SIGKILL
+for whatever is left of the group after the grace period.  Phases stop
+starting steps once they are cancelled.
+"""
+
+import signal
+import subprocess
+import threading
+import time
+
+from conductor import accounting, background
+
+
+class Cancellation:
+    """Cancel the steps of one RUN, whichever thread runs them"""
+
+    def __init__(self, kill_grace: float = background.DEFAULT_KILL_GRACE):
+        self.kill_grace = kill_grace
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._running = set()
+        self._escalation = None  # Thread sending SIGKILL after the grace
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() has been called"""
+        return self._cancelled.is_set()
+
+    def started(self, proc: accounting.AccountedPopen) -> None:
+        """Track a step's command until finished() is called for it
+
+        A command that starts after cancel() is killed straight away.
+        """
+        with self._lock:
+            if not self.cancelled:
+                self._running.add(proc)
+                return
+        background.signal_group(proc.pid, signal.SIGKILL)
+
+    def finished(self, proc: accounting.AccountedPopen) -> None:
+        """Stop tracking a command once its step has reaped it"""
+        with self._lock:
+            self._running.discard(proc)
+
+    def cancel(self) -> int:
+        """Stop every running command's process group
+
+        Each group gets SIGTERM now, and whatever is left of it after
+        kill_grace seconds gets SIGKILL from a thread of its own, so the
+        caller can answer straight away.  Returns how many commands were
+        running.  Their steps reap them and return as usual, and no
+        further steps start.
+        """
+        with self._lock:
+            self._cancelled.set()
+            running = list(self._running)
+        for proc in running:
+            background.signal_group(proc.pid, signal.SIGTERM)
+        if running:
+            self._escalation = threading.Thread(
+                target=self._escalate, args=(running,), daemon=True
+            )
+            self._escalation.start()
+        return len(running)
+
+    def _escalate(self, running) -> None:
+        deadline = time.monotonic() + self.kill_grace
+        for proc in running:
+            try:
+                proc.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                pass
+            # Children that outlived the command itself go too
+            background.signal_group(proc.pid, signal.SIGKILL)
+
+    def wait(self) -> None:
+        """Return once every group cancel() stopped is gone"""
+        if self._escalation is not None:
+            self._escalation.join()
@@ -35,54 +35,136 @@
 # Description: All the information for the clients controlled by the
 # conductor.
 
+import collections
+import itertools
+import select
 import socket
 import struct
+import time
 
+from conductor import handshake
 from conductor import phase
 from conductor import step
 from conductor import retval
+from conductor.reporter import RESULT_DETAILS
 from conductor.json_protocol import (
     send_message,
     receive_message,
+    receive_stream,
+    receive_tagged_message,
+    ProtocolError,
+    HeartbeatTimeout,
+    unix_socket_path,
+    CODEC_JSON,
+    SUPPORTED_CODECS,
+    COMPRESS_NONE,
+    SUPPORTED_COMPRESSION,
+    DEFAULT_COMPRESS_THRESHOLD,
+    MSG_HELLO,
     MSG_PHASE,
+    MSG_PLAN,
+    MSG_TRIGGER,
     MSG_RUN,
     MSG_RESULT,
+    MSG_RESULTS,
+    MSG_OUTPUT,
+    MSG_FETCH,
+    MSG_PING,
+    MSG_STATUS,
+    MSG_SHUTDOWN,
+    MSG_CANCEL,
 )
 
 
 class Client:
-    def __init__(self, config, max_message_size=10):
+    def __init__(
+        self,
+        config,
+        max_message_size=10,
+        codec=CODEC_JSON,
+        compression=COMPRESS_NONE,
+        compress_threshold=DEFAULT_COMPRESS_THRESHOLD,
+        heartbeat_interval=None,
+        heartbeat_misses=handshake.DEFAULT_HEARTBEAT_MISSES,
+        stream_output=False,
+    ):
         """Load up all the config data, including all phases"""
         # Store the config for reference
         self.config = config
         self.max_message_size = max_message_size * 1024 * 1024  # Convert MB to bytes
+        if codec not in SUPPORTED_CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.codec = codec  # Preferred codec, offered when a session opens
+        if compression != COMPRESS_NONE and compression not in SUPPORTED_COMPRESSION:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.compression = compression  # Preferred compression, likewise
+        self.compress_threshold = compress_threshold
+        # Seconds between heartbeats asked of the player while a phase
+        # runs, and how many may be missed before it is given up on
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_misses = heartbeat_misses
+        # Ask the player to send step output line by line as it appears
+        self.stream_output = stream_output
+        self.cmd = None  # Control session to the player, opened on demand
+        self.wire = {}  # send_message settings agreed for the session
+        self.features = {}  # Feature set the player agreed to, if it was asked
+        self._reset_requests()
 
         coordinator = config["Coordinator"]
         self.conductor = coordinator["conductor"]
         self.player = coordinator["player"]
 
-        # Validate and convert ports
-        try:
-            self.cmdport = int(coordinator["cmdport"])
-            if self.cmdport < 1 or self.cmdport > 65535:
+        # A "unix:/path" player is reached through a Unix domain socket,
+        # which needs no ports at all
+        self.socket_path = unix_socket_path(self.player)
+        if self.socket_path is not None:
+            self.cmdport = None
+            self.resultport = None
+            self.endpoint = self.player
+        else:
+            # Validate and convert ports
+            try:
+                self.cmdport = int(coordinator["cmdport"])
+                if self.cmdport < 1 or self.cmdport > 65535:
+                    raise ValueError(
+                        "Command port must be between 1 and 65535, "
+                        f"got {self.cmdport}"
+                    )
+            except ValueError as e:
                 raise ValueError(
-                    f"Command port must be between 1 and 65535, got {self.cmdport}"
-                )
-        except ValueError as e:
-            raise ValueError(f"Invalid command port: {coordinator['cmdport']}") from e
+                    f"Invalid command port: {coordinator['cmdport']}"
+                ) from e
 
-        try:
-            self.resultport = int(coordinator["resultsport"])
-            if self.resultport < 1 or self.resultport > 65535:
+            try:
+                self.resultport = int(coordinator["resultsport"])
+                if self.resultport < 1 or self.resultport > 65535:
+                    raise ValueError(
+                        "Results port must be between 1 and 65535, "
+                        f"got {self.resultport}"
+                    )
+            except ValueError as e:
                 raise ValueError(
-                    f"Results port must be between 1 and 65535, got {self.resultport}"
-                )
-        except ValueError as e:
-            raise ValueError(
-                f"Invalid results port: {coordinator['resultsport']}"
-            ) from e
+                    f"Invalid results port: {coordinator['resultsport']}"
+                ) from e
+            self.endpoint = f"{self.player}:{self.cmdport}"
 
-        self.startup_phase = phase.Phase(self.conductor, self.resultport)
+        # Limit on the steps of one parallel group running at once
+        self.max_parallel = None
+        if "max_parallel" in coordinator:
+            try:
+                self.max_parallel = int(coordinator["max_parallel"])
+                if self.max_parallel < 1:
+                    raise ValueError(
+                        f"max_parallel must be at least 1, got {self.max_parallel}"
+                    )
+            except ValueError as e:
+                raise ValueError(
+                    f"Invalid max_parallel: {coordinator['max_parallel']}"
+                ) from e
+
+        self.startup_phase = phase.Phase(
+            self.conductor, self.resultport, self.max_parallel, "startup"
+        )
         for i in config["Startup"]:
             cmd = config["Startup"][i]
             # Check if the key name indicates spawn behavior
@@ -91,7 +173,11 @@ class Client:
             else:
                 self.startup_phase.append(step.Step(cmd))
 
-        self.run_phase = phase.Phase(self.conductor, self.resultport)
+        self._group_parallel(self.startup_phase, config["Startup"])
+
+        self.run_phase = phase.Phase(
+            self.conductor, self.resultport, self.max_parallel, "run"
+        )
         for i in config["Run"]:
             cmd = config["Run"][i]
             # Check if the key name indicates special behavior
@@ -127,110 +213,495 @@ class Client:
             else:
                 self.run_phase.append(step.Step(cmd))
 
-        self.collect_phase = phase.Phase(self.conductor, self.resultport)
+        self._group_parallel(self.run_phase, config["Run"])
+
+        self.collect_phase = phase.Phase(
+            self.conductor, self.resultport, self.max_parallel, "collect"
+        )
         for i in config["Collect"]:
             self.collect_phase.append(step.Step(config["Collect"][i]))
+        self._group_parallel(self.collect_phase, config["Collect"])
 
-        self.reset_phase = phase.Phase(self.conductor, self.resultport)
+        self.reset_phase = phase.Phase(
+            self.conductor, self.resultport, self.max_parallel, "reset"
+        )
         for i in config["Reset"]:
             self.reset_phase.append(step.Step(config["Reset"][i]))
+        self._group_parallel(self.reset_phase, config["Reset"])
+
+    @staticmethod
+    def _group_parallel(current, keys):
+        """Group the steps of consecutive "parallel" keys to run together
+
+        Every key of a phase section adds exactly one step, so keys and
+        steps line up.  A group is numbered by its first step.
+        """
+        group = None
+        for index, (key, added) in enumerate(zip(keys, current.steps)):
+            if not key.startswith("parallel"):
+                group = None
+                continue
+            if group is None:
+                group = index
+            added.group = group
+
 
+    def connect(self):
+        """Open the control session to the player unless it is still usable"""
+        if self.cmd is not None and self._session_alive():
+            return self.cmd
+        self.close()
+        if self.socket_path is not None:
+            self.cmd = self._connect_unix()
+        elif self.heartbeat_interval:
+            # A player that cannot even accept a session in time is dead
+            self.cmd = socket.create_connection(
+                (self.player, self.cmdport),
+                timeout=self.heartbeat_interval * self.heartbeat_misses,
+            )
+        else:
+            self.cmd = socket.create_connection((self.player, self.cmdport))
+        self.cmd.settimeout(1.0)
+        self.wire = {}
+        self.features = {}
+        self._reset_requests()
+        # Plain uncompressed JSON without heartbeats or streamed output is
+        # what every player speaks, so a client configured for it has
+        # nothing to negotiate.
+        if (
+            self.codec != CODEC_JSON
+            or self.compression != COMPRESS_NONE
+            or self.heartbeat_interval
+            or self.stream_output
+        ):
+            try:
+                self._hello()
+                if self.features.get("plans"):
+                    self._upload_plan()
+            except (OSError, ProtocolError):
+                self.close()
+                raise
+        return self.cmd
+
+    def _connect_unix(self):
+        """Open a control session over the player's Unix domain socket"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            if self.heartbeat_interval:
+                sock.settimeout(self.heartbeat_interval * self.heartbeat_misses)
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _hello(self):
+        """Agree on a feature set with the player for the new session"""
+        # Frames larger than our limit can still arrive as fragments
+        offer = handshake.make_offer(
+            self.codec,
+            self.compression,
+            max_frame_size=self.max_message_size,
+            heartbeat_interval=self.heartbeat_interval,
+            stream_output=self.stream_output,
+        )
+        send_message(
+            self.cmd,
+            MSG_HELLO,
+            offer,
+            max_message_size=self.max_message_size,
+        )
+        msg_type, data = receive_message(
+            self.cmd, max_message_size=self.max_message_size
+        )
+        if msg_type == MSG_RESULT and data.get("code") != retval.RETVAL_BAD_CMD:
+            raise ProtocolError(f"Handshake refused: {data.get('message', '')}")
+        # Players that predate MSG_HELLO answer "no such command"; keep JSON
+        if msg_type != MSG_HELLO:
+            return
+        self.features = data
+        self.wire = handshake.wire_settings(
+            data,
+            peer_max_frame_size=data.get("max_frame_size"),
+            max_frame_size=self.max_message_size,
+            compress_threshold=self.compress_threshold,
+        )
+
+    def _reset_requests(self):
+        """Forget the requests outstanding on the previous session"""
+        self._request_ids = itertools.count(1)
+        self._stashed = collections.defaultdict(collections.deque)
+        self.run_id = None  # ID of the RUN whose results are awaited
+        self.queued = None  # (name, trial, request ID) of a phase sent ahead
+
+    def _send(self, sock, msg_type, data):
+        """Send one message, tagged with a new request ID if agreed
+
+        Returns the request ID, or None on sessions without them.
+        """
+        if not self.features.get("request_ids"):
+            send_message(
+                sock,
+                msg_type,
+                data,
+                max_message_size=self.max_message_size,
+                **self.wire,
+            )
+            return None
+        request_id = next(self._request_ids)
+        send_message(
+            sock,
+            msg_type,
+            data,
+            max_message_size=self.max_message_size,
+            request_id=request_id,
+            **self.wire,
+        )
+        return request_id
+
+    def _receive(self, request_id=None):
+        """Receive the next message for a request
 
-    def download(self, current):
-        """Send a phase down to the player"""
-        cmd = None
+        Messages for other outstanding requests are kept until those are
+        read.  Untagged messages always belong to the current reader.
+        """
+        if not self.features.get("request_ids"):
+            return receive_message(self.cmd, max_message_size=self.max_message_size)
+        stashed = self._stashed.get(request_id)
+        if stashed:
+            return stashed.popleft()
+        while True:
+            msg_type, data, tag = receive_tagged_message(
+                self.cmd, max_message_size=self.max_message_size
+            )
+            if tag is None or tag == request_id:
+                return msg_type, data
+            self._stashed[tag].append((msg_type, data))
+
+    def close(self):
+        """Close the control session to the player"""
+        if self.cmd is not None:
+            try:
+                self.cmd.close()
+            finally:
+                self.cmd = None
+
+    def _session_alive(self):
+        """Check that the player has not hung up on an idle session"""
         try:
-            cmd = socket.create_connection((self.player, self.cmdport))
-            cmd.settimeout(1.0)
-
-            # Convert phase to JSON-serializable format
-            phase_data = {
-                "resulthost": current.resulthost,
-                "resultport": current.resultport,
-                "steps": [
-                    {"command": s.command, "spawn": s.spawn, "timeout": s.timeout}
-                    for s in current.steps
-                ],
+            readable, _, _ = select.select([self.cmd], [], [], 0)
+            if readable:
+                # Nothing is expected between requests, so a readable
+                # socket means the peer closed it (or reset it).
+                return self.cmd.recv(1, socket.MSG_PEEK) != b""
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def _request(self, message, reply=True):
+        """Send one message over the control session.
+
+        message is a (msg_type, data) pair, or a callable returning one
+        that is called once the session is open, so the message can
+        depend on the features the player agreed to.  A session that
+        fails mid-request is reopened and the request is retried once,
+        so a restarted player is picked up transparently.
+        """
+        for attempt in range(2):
+            try:
+                sock = self.connect()
+                msg_type, data = message() if callable(message) else message
+                request_id = self._send(sock, msg_type, data)
+                if reply:
+                    return self._receive(request_id)
+                return request_id
+            except (OSError, ProtocolError):
+                self.close()
+                if attempt:
+                    raise
+
+    @staticmethod
+    def _phase_data(current):
+        """Convert a phase to its JSON-serializable form"""
+        data = {
+            "resulthost": current.resulthost,
+            "resultport": current.resultport,
+            "steps": [
+                {"command": s.command, "spawn": s.spawn, "timeout": s.timeout}
+                for s in current.steps
+            ],
+        }
+        # Only phases with parallel groups carry the extra fields, so
+        # sequential phases look the same to older players
+        for step_data, s in zip(data["steps"], current.steps):
+            if s.group is not None:
+                step_data["group"] = s.group
+        if current.max_parallel is not None:
+            data["max_parallel"] = current.max_parallel
+        # The player stops spawned commands once the reset phase has run
+        if current.name is not None:
+            data["name"] = current.name
+        return data
+
+    def _upload_plan(self):
+        """Send every phase to the player once for the new session"""
+        plan = {
+            "phases": {
+                name: self._phase_data(current)
+                for name, current in self.phases().items()
             }
+        }
+        send_message(
+            self.cmd,
+            MSG_PLAN,
+            plan,
+            max_message_size=self.max_message_size,
+            **self.wire,
+        )
+        msg_type, data = receive_message(
+            self.cmd, max_message_size=self.max_message_size
+        )
+        if msg_type != MSG_RESULT or data.get("code") != retval.RETVAL_OK:
+            raise ProtocolError(f"Plan refused: {data.get('message', '')}")
+
+    def phases(self):
+        """Return the phases of a trial by name, in the order they run"""
+        return {
+            "startup": self.startup_phase,
+            "run": self.run_phase,
+            "collect": self.collect_phase,
+            "reset": self.reset_phase,
+        }
 
-            send_message(cmd, MSG_PHASE, phase_data, max_message_size=self.max_message_size)
+    def download(self, current, name=None, trial=None):
+        """Send a phase down to the player
 
-            # Receive response
-            msg_type, data = receive_message(cmd, max_message_size=self.max_message_size)
+        When the player holds this session's plan, a named phase is only
+        triggered by name instead of being sent again.
+        """
+
+        def message():
+            if name is not None and self.features.get("plans"):
+                return MSG_TRIGGER, {"phase": name, "trial": trial}
+            return MSG_PHASE, self._phase_data(current)
+
+        try:
+            msg_type, data = self._queued_reply(name, trial) or self._request(message)
             if msg_type == MSG_RESULT:
                 print(data.get("code", 0), data.get("message", ""))
-                
+
         except Exception as e:
-            print(f"Failed to connect to {self.player}:{self.cmdport} - {e}")
+            print(f"Failed to connect to {self.endpoint} - {e}")
             # Don't exit! Let the caller handle the error
-        finally:
-            if cmd:
-                cmd.close()
+
+    def queue(self, name, trial=None):
+        """Send a phase ahead while the player still runs the current one
+
+        Only sessions with request IDs can carry it alongside the running
+        phase's results.  The player holds the phase until the next RUN,
+        and download() then collects its acknowledgement instead of
+        sending it again.
+        """
+        if self.cmd is None or not self.features.get("request_ids"):
+            return
+        current = self.phases()[name]
+        if self.features.get("plans"):
+            msg_type, data = MSG_TRIGGER, {"phase": name, "trial": trial}
+        else:
+            msg_type, data = MSG_PHASE, self._phase_data(current)
+        try:
+            self.queued = (name, trial, self._send(self.cmd, msg_type, data))
+        except OSError as e:
+            # Results cannot arrive either; results() reports the failure
+            print(f"Failed to queue {name} on {self.endpoint} - {e}")
+
+    def _queued_reply(self, name, trial):
+        """Return the acknowledgement of a phase queued ahead, if it was"""
+        queued, self.queued = self.queued, None
+        if queued is None or queued[:2] != (name, trial) or self.cmd is None:
+            return None
+        try:
+            return self._receive(queued[2])
+        except (OSError, ProtocolError):
+            # Send it again on a fresh session
+            self.close()
+            return None
 
     def doit(self):
         """Tell the remote player to execute the current phase"""
-        cmd = None
         try:
-            cmd = socket.create_connection((self.player, self.cmdport))
-            cmd.settimeout(1.0)
-            send_message(cmd, MSG_RUN, {}, max_message_size=self.max_message_size)
-            
-            # Setup the callback socket for the player now
-            self.ressock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, 0)
-            self.ressock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            # SO_REUSEPORT is not available on all platforms, use try/except
-            try:
-                self.ressock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
-            except AttributeError:
-                pass  # SO_REUSEPORT not available on this platform
-            self.ressock.bind(("0.0.0.0", self.resultport))
-            self.ressock.listen(5)
-            
+            # Ask for batched results, leaving half of the frame limit as
+            # headroom for JSON escaping of the step output.  Players that
+            # never saw a handshake ignore the field they do not know.
+            def run():
+                if not self.features.get("batching", True):
+                    return MSG_RUN, {}
+                return MSG_RUN, {"max_batch_bytes": self.max_message_size // 2}
+
+            self.run_id = self._request(run, reply=False)
         except Exception as e:
-            print(f"Failed to connect to {self.player}:{self.cmdport} - {e}")
+            print(f"Failed to connect to {self.endpoint} - {e}")
             # Don't exit! Let the caller handle the error
-        finally:
-            if cmd:
-                cmd.close()
 
     def results(self, reporter=None):
-        """Retrieve all the results from the player for the current phase"""
-        done = False
-        while not done:
-            sock, addr = self.ressock.accept()
-            msg_type, data = receive_message(sock, max_message_size=self.max_message_size)
-            if msg_type == MSG_RESULT:
-                code = data.get("code", 0)
-                message = data.get("message", "")
+        """Retrieve all the results from the player for the current phase
+
+        Returns how many of them report a failure.
+        """
+        if self.cmd is None:
+            raise ProtocolError(f"No session to {self.endpoint}")
+        # Steps may run for a long time, so wait on the session without
+        # the short timeout used for request acknowledgements.  A player
+        # that agreed to heartbeats must still be heard from regularly.
+        interval = self.features.get("heartbeat_interval")
+        deadline = interval * self.heartbeat_misses if interval else None
+        self.cmd.settimeout(deadline)
+        failures = 0
+        try:
+            done = False
+            while not done:
+                msg_type, data = self._receive(self.run_id)
+                if msg_type == MSG_RESULT:
+                    results = [data]
+                elif msg_type == MSG_RESULTS:
+                    results = data.get("results", [])
+                elif msg_type == MSG_OUTPUT:
+                    if reporter:
+                        reporter.add_output(
+                            data.get("step", 0),
+                            data.get("stream", ""),
+                            data.get("time", 0),
+                            data.get("line", ""),
+                        )
+                    else:
+                        print(data.get("line", ""), end="")
+                    continue
+                else:
+                    # Heartbeats only show that the player is still alive
+                    continue
 
-                # Report the result
+                # Report the results
                 if reporter:
-                    reporter.add_result(code, message)
+                    if msg_type == MSG_RESULTS:
+                        reporter.add_results(results)
+                    else:
+                        details = {k: data[k] for k in RESULT_DETAILS if k in data}
+                        reporter.add_result(
+                            data.get("code", 0), data.get("message", ""), **details
+                        )
                 else:
                     # Fallback to traditional printing
+                    for result in results:
+                        if result.get("code", 0) == retval.RETVAL_DONE:
+                            print("done")
+                        else:
+                            print(result.get("code", 0), result.get("message", ""))
+
+                for result in results:
+                    code = result.get("code", 0)
                     if code == retval.RETVAL_DONE:
-                        print("done")
-                    else:
-                        print(code, message)
+                        done = True
+                    elif code != retval.RETVAL_OK:
+                        failures += 1
+        except socket.timeout as e:
+            self.close()
+            raise HeartbeatTimeout(
+                f"No heartbeat from {self.endpoint} "
+                f"for {deadline:g} seconds"
+            ) from e
+        except (OSError, ProtocolError):
+            # A half-read session cannot be reused
+            self.close()
+            raise
+        self.cmd.settimeout(1.0)
+        return failures
 
-                if code == retval.RETVAL_DONE:
-                    done = True
-            sock.close()
-        self.ressock.close()
+    def fetch_output(self, spool, out, offset=0, length=None):
+        """Copy spooled step output from the player into a file object
+
+        spool is the ID from a result's output summary.  Up to length
+        bytes from offset (all of the rest by default) are written to
+        out chunk by chunk, and the number of bytes copied is returned.
+        Raises ProtocolError if the player has no such output.
+        """
+        request = {"spool": spool, "offset": offset, "length": length}
+        msg_type, data = self._request((MSG_FETCH, request))
+        if msg_type != MSG_RESULT or data.get("code") != retval.RETVAL_OK:
+            raise ProtocolError(data.get("message", f"unexpected {msg_type} reply"))
+        copied = 0
+        try:
+            for chunk in receive_stream(
+                self.cmd, max_message_size=self.max_message_size
+            ):
+                out.write(chunk)
+                copied += len(chunk)
+        except (OSError, ProtocolError):
+            # A half-read stream cannot be resumed
+            self.close()
+            raise
+        return copied
 
-    def startup(self):
+    def ping(self):
+        """Check that the player answers, returning the round trip in seconds"""
+        start = time.monotonic()
+        msg_type, data = self._request((MSG_PING, {}))
+        if msg_type != MSG_RESULT or data.get("code") != retval.RETVAL_OK:
+            raise ProtocolError(data.get("message", f"unexpected {msg_type} reply"))
+        return time.monotonic() - start
+
+    def status(self):
+        """Ask the player what each of its sessions is doing
+
+        Returns the player's status: {"sessions": [...], "max_sessions":
+        n}, where each session says whether it is running a phase, which
+        one and how many of its steps have completed.  The entry marked
+        "current" is this client's own session.
+        """
+        msg_type, data = self._request((MSG_STATUS, {}))
+        if msg_type != MSG_STATUS:
+            raise ProtocolError(data.get("message", f"unexpected {msg_type} reply"))
+        return data
+
+    def shutdown_player(self):
+        """Tell the player to shut down, and close the session"""
+        try:
+            msg_type, data = self._request((MSG_SHUTDOWN, {}))
+        finally:
+            self.close()
+        if msg_type != MSG_RESULT or data.get("code") != retval.RETVAL_OK:
+            raise ProtocolError(data.get("message", f"unexpected {msg_type} reply"))
+
+    def cancel(self, all_sessions=False):
+        """Cancel the phase the player is running and those queued after it
+
+        The running step's process group is stopped and the remaining
+        steps are skipped; the phase's partial results are then read
+        with results() as usual.  While a phase runs the player only
+        hears this on sessions with request IDs; with all_sessions,
+        every session's phase is cancelled instead, so it can be sent
+        from a session of its own.  Returns the player's summary.
+        """
+        queued, self.queued = self.queued, None
+        msg_type, data = self._request((MSG_CANCEL, {"all": all_sessions}))
+        if queued is not None:
+            # The phase sent ahead was dropped; so is its acknowledgement
+            self._stashed.pop(queued[2], None)
+        if msg_type != MSG_RESULT or data.get("code") != retval.RETVAL_OK:
+            raise ProtocolError(data.get("message", f"unexpected {msg_type} reply"))
+        return data.get("message", "")
+
+    def startup(self, trial=None):
         """Push the startup phase to the player"""
-        self.download(self.startup_phase)
+        self.download(self.startup_phase, name="startup", trial=trial)
 
-    def run(self):
+    def run(self, trial=None):
         """Push the run phase to the player"""
-        self.download(self.run_phase)
+        self.download(self.run_phase, name="run", trial=trial)
 
-    def collect(self):
+    def collect(self, trial=None):
         """Push the collection phase to the player"""
-        self.download(self.collect_phase)
+        self.download(self.collect_phase, name="collect", trial=trial)
 
-    def reset(self):
+    def reset(self, trial=None):
         """Push the rset phase to the player"""
-        self.download(self.reset_phase)
-
+        self.download(self.reset_phase, name="reset", trial=trial)
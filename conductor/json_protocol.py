@@ -5,18 +5,93 @@ No backward compatibility with pickle is maintained.
 WARNING: No encryption - use only on private networks.
 """
 
+import asyncio
 import json
 import struct
 import socket
-from typing import Dict, Any, Tuple
+import zlib
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+try:
+    import lzma
+except ImportError:  # Python may be built without liblzma
+    lzma = None
+
+from conductor import binary_codec
 
 
 # Protocol version
 PROTOCOL_VERSION = 1
 
+# Codecs a message body can be encoded with.  JSON is always understood
+# and remains the default; others are used once a connection agrees on
+# them through a MSG_HELLO exchange.
+CODEC_JSON = "json"
+CODEC_BINARY = "binary"
+SUPPORTED_CODECS = [CODEC_BINARY, CODEC_JSON]
+
+# A frame body that starts with "{" is a plain JSON message.  Anything
+# else starts with a flags byte: FRAME_MARKER, which can never begin
+# JSON text, combined with the FLAG_* bits describing the body.
+FRAME_MARKER = 0x80
+FLAG_BINARY = 0x01
+FLAG_ZLIB = 0x02
+FLAG_LZMA = 0x04
+FLAG_FRAGMENT = 0x08  # More frames of the same body follow
+FLAG_RAW = 0x10  # The body is stream data rather than a message
+_KNOWN_FLAGS = FLAG_BINARY | FLAG_ZLIB | FLAG_LZMA | FLAG_FRAGMENT | FLAG_RAW
+
+# Optional per-frame compression of the encoded body.  Like the codec it
+# is agreed through MSG_HELLO, and frames are only compressed when the
+# body is at least the threshold in size and actually gets smaller.
+COMPRESS_NONE = "none"
+COMPRESS_ZLIB = "zlib"
+COMPRESS_LZMA = "lzma"
+SUPPORTED_COMPRESSION = [COMPRESS_ZLIB] + ([COMPRESS_LZMA] if lzma else [])
+DEFAULT_COMPRESS_THRESHOLD = 4096
+_COMPRESSION_FLAGS = {COMPRESS_ZLIB: FLAG_ZLIB, COMPRESS_LZMA: FLAG_LZMA}
+
+# A message split into fragments or compressed may reach at most this
+# many times the maximum message size once reassembled or inflated, so
+# a peer cannot exhaust memory with small frames.
+MAX_MESSAGE_RATIO = 10
+
+# Bodies longer than the frame size agreed for a session are split into
+# fragments of at most that size, and streams are sent in chunks of at
+# most DEFAULT_CHUNK_SIZE bytes.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_DECOMPRESS_ERRORS = (zlib.error, lzma.LZMAError) if lzma else (zlib.error,)
+
 # Maximum message size (default 10MB)
 _max_message_size = 10 * 1024 * 1024
 
+# Messages up to this size are first tried with a single plain recv
+_SMALL_READ = 64 * 1024
+
+# Scatter/gather sends are not available on every platform (e.g. Windows)
+_HAVE_SENDMSG = hasattr(socket.socket, "sendmsg")
+
+_HEADER = struct.Struct("!I")
+_FLAGGED_HEADER = struct.Struct("!IB")
+
+# JSON messages are written with compact separators, and the envelope up
+# to the data is encoded once per message type and reused.
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"))
+_json_prefixes: Dict[Tuple[int, str], str] = {}
+_MAX_JSON_PREFIXES = 64
+
 
 class ProtocolError(Exception):
     """Raised when protocol errors occur."""
@@ -24,6 +99,30 @@ class ProtocolError(Exception):
     pass
 
 
+class ConnectionClosed(ProtocolError):
+    """Raised when the peer closes the connection between messages."""
+
+    pass
+
+
+class HeartbeatTimeout(ProtocolError):
+    """Raised when a peer stays silent for longer than its heartbeats allow."""
+
+    pass
+
+
+# Endpoints of the form "unix:/path" name a Unix domain socket, which
+# co-located conductors and players can use instead of TCP loopback
+UNIX_PREFIX = "unix:"
+
+
+def unix_socket_path(address: str) -> Optional[str]:
+    """Return the socket path of a "unix:" endpoint, or None for a host."""
+    if address.startswith(UNIX_PREFIX):
+        return address[len(UNIX_PREFIX) :]
+    return None
+
+
 def get_max_message_size() -> int:
     """Get the current maximum message size limit."""
     return _max_message_size
@@ -37,52 +136,370 @@ def set_max_message_size(size: int) -> None:
     _max_message_size = size
 
 
-def send_message(sock: socket.socket, msg_type: str, data: Dict[str, Any], max_message_size: int = None) -> None:
-    """Send a JSON message with type and data."""
+def send_message(
+    sock: socket.socket,
+    msg_type: str,
+    data: Dict[str, Any],
+    max_message_size: int = None,
+    codec: str = CODEC_JSON,
+    compression: str = None,
+    compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+    fragment_size: int = None,
+    request_id: int = None,
+) -> None:
+    """Send a message with type and data, encoded with the given codec.
+
+    With compression set to one of SUPPORTED_COMPRESSION, bodies of at
+    least compress_threshold bytes are compressed before sending.  With
+    fragment_size set, bodies that do not fit in one frame of that size
+    are sent as a run of fragments.  The size limit applies to each
+    frame as sent.  A request_id is carried in the message envelope so
+    the peer can match replies to requests.
+    """
+    frames = _encode_frames(
+        msg_type,
+        data,
+        max_message_size,
+        codec,
+        compression,
+        compress_threshold,
+        fragment_size,
+        request_id,
+    )
+    for header, body in frames:
+        _send_frame(sock, header, body)
+
+
+def _encode_frames(
+    msg_type: str,
+    data: Dict[str, Any],
+    max_message_size: int = None,
+    codec: str = CODEC_JSON,
+    compression: str = None,
+    compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+    fragment_size: int = None,
+    request_id: int = None,
+) -> List[Tuple[bytes, Any]]:
+    """Encode a message into the (header, body) pairs of its frames."""
     if max_message_size is None:
         max_message_size = _max_message_size
-        
-    message = {"version": PROTOCOL_VERSION, "type": msg_type, "data": data}
-    json_bytes = json.dumps(message).encode("utf-8")
-    
+
+    if codec == CODEC_JSON:
+        body = encode_json_message(msg_type, data, request_id=request_id)
+        flags = 0
+    elif codec == CODEC_BINARY:
+        try:
+            body = binary_codec.encode_message(
+                PROTOCOL_VERSION, msg_type, data, request_id
+            )
+        except TypeError as e:
+            raise ProtocolError(f"Cannot encode message: {e}")
+        flags = FLAG_BINARY
+    else:
+        raise ValueError(f"Unknown codec: {codec}")
+
+    limit = max_message_size * MAX_MESSAGE_RATIO
+    if compression and compression != COMPRESS_NONE and len(body) >= compress_threshold:
+        if compression not in SUPPORTED_COMPRESSION:
+            raise ValueError(f"Unknown compression: {compression}")
+        if len(body) > limit:
+            raise ProtocolError(
+                f"Message size ({len(body)} bytes) exceeds maximum "
+                f"uncompressed size ({limit} bytes)"
+            )
+        packed = _compress(body, compression)
+        # Incompressible output is cheaper to send as it is
+        if len(packed) < len(body):
+            body = packed
+            flags |= _COMPRESSION_FLAGS[compression]
+
+    if fragment_size and len(body) >= min(fragment_size, max_message_size):
+        if len(body) > limit:
+            raise ProtocolError(
+                f"Message size ({len(body)} bytes) exceeds maximum "
+                f"fragmented size ({limit} bytes)"
+            )
+        step = min(fragment_size, max_message_size) - 1  # Room for the flags byte
+        if step < 1:
+            raise ValueError("Fragment size must be at least 2 bytes")
+        view = memoryview(body)
+        frames = []
+        for start in range(0, len(view), step):
+            more = FLAG_FRAGMENT if start + step < len(view) else 0
+            piece = view[start : start + step]
+            header = _FLAGGED_HEADER.pack(len(piece) + 1, FRAME_MARKER | flags | more)
+            frames.append((header, piece))
+        return frames
+
+    length = len(body) + 1 if flags else len(body)
+
     # Check message size
-    if len(json_bytes) > max_message_size:
-        raise ProtocolError(f"Message size ({len(json_bytes)} bytes) exceeds maximum ({max_message_size} bytes)")
+    if length > max_message_size:
+        raise ProtocolError(f"Message size ({length} bytes) exceeds maximum ({max_message_size} bytes)")
+
+    # 4-byte length header (plus any flags byte) followed by the body
+    if flags:
+        return [(_FLAGGED_HEADER.pack(length, FRAME_MARKER | flags), body)]
+    return [(_HEADER.pack(length), body)]
+
 
-    # Send 4-byte length header followed by JSON data
-    length = struct.pack("!I", len(json_bytes))
-    sock.sendall(length + json_bytes)
+def encode_json_message(
+    msg_type: str,
+    data: Dict[str, Any],
+    version: int = PROTOCOL_VERSION,
+    request_id: int = None,
+) -> bytes:
+    """Encode a message as compact JSON: {"version", "type", ["id",] "data"}."""
+    prefix = _json_prefixes.get((version, msg_type))
+    if prefix is None:
+        prefix = '{"version":%d,"type":%s,"data":' % (
+            version,
+            _JSON_ENCODER.encode(msg_type),
+        )
+        # Message types are a small fixed set; don't cache arbitrary ones
+        if len(_json_prefixes) < _MAX_JSON_PREFIXES:
+            _json_prefixes[(version, msg_type)] = prefix
+    if request_id is not None:
+        # The ID goes between the cached prefix and its trailing "data":
+        prefix = '%s"id":%d,"data":' % (prefix[: -len('"data":')], request_id)
+    return (prefix + _JSON_ENCODER.encode(data) + "}").encode("utf-8")
 
 
 def receive_message(sock: socket.socket, max_message_size: int = None) -> Tuple[str, Dict[str, Any]]:
-    """Receive a JSON message and return (type, data)."""
+    """Receive a message in any supported encoding and return (type, data).
+
+    A message sent as fragments is reassembled before it is decoded.
+    """
+    msg_type, data, _ = receive_tagged_message(sock, max_message_size)
+    return msg_type, data
+
+
+def receive_tagged_message(
+    sock: socket.socket, max_message_size: int = None
+) -> Tuple[str, Dict[str, Any], Optional[int]]:
+    """Receive a message and return (type, data, request ID or None)."""
     if max_message_size is None:
         max_message_size = _max_message_size
-        
+    assembler = _MessageAssembler(max_message_size)
+    while True:
+        try:
+            frame = _receive_frame(sock, max_message_size)
+        except ConnectionClosed:
+            if assembler.pending:
+                raise ProtocolError("Connection closed in the middle of a message")
+            raise
+        payload = assembler.feed(frame)
+        if payload is not None:
+            return _decode_envelope(payload, assembler.limit)
+
+
+def _receive_frame(sock: socket.socket, max_message_size: int):
+    """Receive one frame and return its body, flags byte included."""
     # Read 4-byte length header
     length_bytes = _recv_exactly(sock, 4)
     if not length_bytes:
-        raise ProtocolError("Connection closed")
+        raise ConnectionClosed("Connection closed")
+
+    length = _frame_length(length_bytes, max_message_size)
+
+    # Read message body
+    payload = _recv_exactly(sock, length)
+    if len(payload) != length:
+        raise ProtocolError("Incomplete message received")
+    return payload
+
 
+def _frame_length(length_bytes, max_message_size: int) -> int:
+    """Parse and check a 4-byte frame length header."""
     if len(length_bytes) != 4:
         raise ProtocolError("Incomplete length header")
 
-    length = struct.unpack("!I", length_bytes)[0]
+    length = _HEADER.unpack(length_bytes)[0]
 
     # Check against configured size limit
     if length > max_message_size:
         raise ProtocolError(
             f"Message too large: {length} bytes (max: {max_message_size})"
         )
+    return length
 
-    # Read JSON data
-    json_bytes = _recv_exactly(sock, length)
-    if len(json_bytes) != length:
-        raise ProtocolError("Incomplete message received")
+
+class _MessageAssembler:
+    """Turn received frames into complete message bodies.
+
+    Frames are passed to feed() as they arrive; it returns a body ready
+    for _decode_payload once a message is complete and None while the
+    fragments of a longer one are still being collected.
+    """
+
+    def __init__(self, max_message_size: int):
+        self.limit = max_message_size * MAX_MESSAGE_RATIO
+        self.flags = None
+        self.body = None
+
+    @property
+    def pending(self) -> bool:
+        """True while part of a fragmented message has been received."""
+        return self.body is not None
+
+    def feed(self, frame):
+        if self.body is None:
+            if frame and frame[0] & FRAME_MARKER:
+                if frame[0] & FLAG_RAW:
+                    raise ProtocolError("Invalid message format: unexpected stream data")
+                if frame[0] & FLAG_FRAGMENT:
+                    self.flags = frame[0] & ~FLAG_FRAGMENT
+                    self.body = bytearray(frame)
+                    self.body[0] = self.flags
+                    return None
+            return frame
+
+        if not frame or frame[0] & ~FLAG_FRAGMENT != self.flags:
+            raise ProtocolError("Invalid message format: inconsistent fragment flags")
+        if len(self.body) + len(frame) - 2 > self.limit:
+            raise ProtocolError(
+                f"Message too large: more than {self.limit} bytes in fragments"
+            )
+        self.body += memoryview(frame)[1:]
+        if frame[0] & FLAG_FRAGMENT:
+            return None
+        body, self.body = self.body, None
+        return body
+
+
+def send_stream(
+    sock: socket.socket,
+    chunks: Iterable[bytes],
+    max_message_size: int = None,
+    codec: str = None,
+    compression: str = None,
+    compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+    fragment_size: int = DEFAULT_CHUNK_SIZE,
+) -> None:
+    """Send an iterable of byte strings as a stream of raw frames.
+
+    Only one chunk is held at a time, so files and command output of
+    any size can follow a message announcing them.  Chunks are split
+    to fit fragment_size and compressed as send_message would; codec is
+    accepted so that a session's wire settings can be passed unchanged.
+    """
+    encoder = _StreamEncoder(
+        max_message_size, compression, compress_threshold, fragment_size
+    )
+    for chunk in chunks:
+        for header, body in encoder.frames(chunk):
+            _send_frame(sock, header, body)
+    _send_frame(sock, *encoder.end())
+
+
+class _StreamEncoder:
+    """Split and compress stream chunks into raw frames."""
+
+    def __init__(
+        self,
+        max_message_size: int = None,
+        compression: str = None,
+        compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+        fragment_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        if max_message_size is None:
+            max_message_size = _max_message_size
+        self.step = min(fragment_size or DEFAULT_CHUNK_SIZE, max_message_size) - 1
+        if self.step < 1:
+            raise ValueError("Fragment size must be at least 2 bytes")
+        if compression == COMPRESS_NONE:
+            compression = None
+        if compression and compression not in SUPPORTED_COMPRESSION:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+
+    def frames(self, chunk) -> List[Tuple[bytes, Any]]:
+        view = memoryview(chunk)
+        frames = []
+        for start in range(0, len(view), self.step):
+            piece = view[start : start + self.step]
+            flags = FLAG_RAW | FLAG_FRAGMENT
+            if self.compression and len(piece) >= self.compress_threshold:
+                packed = _compress(piece, self.compression)
+                if len(packed) < len(piece):
+                    piece = packed
+                    flags |= _COMPRESSION_FLAGS[self.compression]
+            header = _FLAGGED_HEADER.pack(len(piece) + 1, FRAME_MARKER | flags)
+            frames.append((header, piece))
+        return frames
+
+    def end(self) -> Tuple[bytes, bytes]:
+        """Return the empty final frame that ends the stream."""
+        return _FLAGGED_HEADER.pack(1, FRAME_MARKER | FLAG_RAW), b""
+
+
+def receive_stream(sock: socket.socket, max_message_size: int = None) -> Iterator[bytes]:
+    """Yield the chunks of a stream sent with send_stream as they arrive.
+
+    Only the chunk being yielded is held in memory.  The generator ends
+    after the final frame of the stream; it must be run to completion
+    before the next message can be received.
+    """
+    if max_message_size is None:
+        max_message_size = _max_message_size
+    while True:
+        try:
+            frame = _receive_frame(sock, max_message_size)
+        except ConnectionClosed:
+            raise ProtocolError("Connection closed in the middle of a stream")
+        data, more = _decode_stream_frame(frame, max_message_size * MAX_MESSAGE_RATIO)
+        if data:
+            yield data
+        if not more:
+            return
+
+
+def _decode_stream_frame(frame, limit: int) -> Tuple[bytes, bool]:
+    """Return the data of a raw stream frame and whether more follow."""
+    if not frame or frame[0] & (FRAME_MARKER | FLAG_RAW) != FRAME_MARKER | FLAG_RAW:
+        raise ProtocolError("Invalid message format: expected stream data")
+    flags = frame[0] & ~FRAME_MARKER
+    if flags & ~_KNOWN_FLAGS:
+        raise ProtocolError(f"Invalid message format: unknown frame flags {flags:#x}")
+    data = memoryview(frame)[1:]
+    if flags & (FLAG_ZLIB | FLAG_LZMA):
+        data = _decompress(data, flags, limit)
+    return bytes(data), bool(flags & FLAG_FRAGMENT)
+
+
+def _decode_payload(payload, max_decompressed_size=None) -> Tuple[str, Dict[str, Any]]:
+    """Decode a received frame body into (type, data)."""
+    msg_type, data, _ = _decode_envelope(payload, max_decompressed_size)
+    return msg_type, data
+
+
+def _decode_envelope(
+    payload, max_decompressed_size=None
+) -> Tuple[str, Dict[str, Any], Optional[int]]:
+    """Decode a received frame body into (type, data, request ID or None)."""
+    if payload and payload[0] & FRAME_MARKER:
+        flags = payload[0] & ~FRAME_MARKER
+        if flags & ~_KNOWN_FLAGS:
+            raise ProtocolError(f"Invalid message format: unknown frame flags {flags:#x}")
+        body = memoryview(payload)[1:]
+        if flags & (FLAG_ZLIB | FLAG_LZMA):
+            if max_decompressed_size is None:
+                max_decompressed_size = _max_message_size * MAX_MESSAGE_RATIO
+            body = _decompress(body, flags, max_decompressed_size)
+        if flags & FLAG_BINARY:
+            try:
+                version, msg_type, data, request_id = binary_codec.decode_envelope(body)
+            except ValueError as e:
+                raise ProtocolError(f"Invalid message format: {e}")
+            if version != PROTOCOL_VERSION:
+                raise ProtocolError(f"Unsupported protocol version: {version}")
+            return msg_type, data, request_id
+        payload = body
 
     # Parse JSON
     try:
-        message = json.loads(json_bytes.decode("utf-8"))
+        message = json.loads(str(payload, "utf-8"))
 
         # Ensure message is a dictionary
         if not isinstance(message, dict):
@@ -97,26 +514,335 @@ def receive_message(sock: socket.socket, max_message_size: int = None) -> Tuple[
         if message["version"] != PROTOCOL_VERSION:
             raise ProtocolError(f"Unsupported protocol version: {message['version']}")
 
-        return message["type"], message["data"]
+        return message["type"], message["data"], message.get("id")
     except (json.JSONDecodeError, KeyError) as e:
         raise ProtocolError(f"Invalid message format: {e}")
 
 
+def _compress(body, compression: str) -> bytes:
+    """Compress an encoded message body."""
+    if compression == COMPRESS_ZLIB:
+        return zlib.compress(body)
+    return lzma.compress(body)
+
+
+def _decompress(body, flags: int, limit: int) -> bytes:
+    """Decompress a frame body, refusing to produce more than limit bytes."""
+    if flags & FLAG_ZLIB and flags & FLAG_LZMA:
+        raise ProtocolError("Invalid message format: conflicting compression flags")
+    try:
+        if flags & FLAG_ZLIB:
+            decompressor = zlib.decompressobj()
+        elif lzma is not None:
+            decompressor = lzma.LZMADecompressor()
+        else:
+            raise ProtocolError("Invalid message format: lzma is not available")
+        # Ask for one byte more than allowed to detect oversized bodies
+        data = decompressor.decompress(body, limit + 1)
+    except _DECOMPRESS_ERRORS as e:
+        raise ProtocolError(f"Invalid message format: {e}")
+    if len(data) > limit:
+        raise ProtocolError(
+            f"Message too large: more than {limit} bytes when decompressed"
+        )
+    if not decompressor.eof:
+        raise ProtocolError("Invalid message format: truncated compressed data")
+    if decompressor.unused_data:
+        raise ProtocolError("Invalid message format: trailing bytes after compressed data")
+    return data
+
+
+def _send_frame(sock: socket.socket, header: bytes, payload: bytes) -> None:
+    """Send a frame header and payload without joining them first.
+
+    Plain sockets use scatter/gather I/O so the payload is never copied
+    into a new buffer just to prepend four bytes.  Other socket-like
+    objects (SSL sockets do not support sendmsg) fall back to sendall.
+    """
+    if not _HAVE_SENDMSG or type(sock) is not socket.socket:
+        sock.sendall(header + payload)
+        return
+    buffers = [memoryview(header)]
+    if len(payload):
+        buffers.append(memoryview(payload))
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        # Drop whatever was fully sent and trim a partially sent buffer
+        while sent:
+            if sent >= len(buffers[0]):
+                sent -= len(buffers[0])
+                buffers.pop(0)
+            else:
+                buffers[0] = buffers[0][sent:]
+                sent = 0
+
+
 def _recv_exactly(sock: socket.socket, length: int) -> bytes:
-    """Receive exactly length bytes from socket."""
-    data = b""
-    while len(data) < length:
-        chunk = sock.recv(min(4096, length - len(data)))
-        if not chunk:
+    """Receive exactly length bytes from socket.
+
+    Fewer bytes are returned only if the peer closes the connection.
+    Plain sockets read larger messages straight into a buffer allocated
+    once for the whole message, asking the kernel for everything still
+    outstanding on each call, so the data is copied exactly once.
+    """
+    if type(sock) is not socket.socket:
+        # Socket-like objects: a bytearray grows in amortized linear time
+        data = bytearray()
+        while len(data) < length:
+            chunk = sock.recv(min(4096, length - len(data)))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    received = 0
+    if length <= _SMALL_READ:
+        # Headers and small messages usually arrive in one piece, and a
+        # plain recv is cheaper than setting up a buffer for them.
+        chunk = sock.recv(length)
+        if len(chunk) == length or not chunk:
+            return chunk
+        received = len(chunk)
+
+    data = bytearray(length)
+    view = memoryview(data)
+    if received:
+        view[:received] = chunk
+    while received < length:
+        count = sock.recv_into(view[received:], length - received)
+        if not count:
             break
-        data += chunk
+        received += count
+    view.release()
+    if received < length:
+        del data[received:]
     return data
 
 
+async def async_send_message(
+    writer: asyncio.StreamWriter,
+    msg_type: str,
+    data: Dict[str, Any],
+    max_message_size: int = None,
+    codec: str = CODEC_JSON,
+    compression: str = None,
+    compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+    fragment_size: int = None,
+) -> None:
+    """Send a message over an asyncio stream, framed as send_message does."""
+    frames = _encode_frames(
+        msg_type,
+        data,
+        max_message_size,
+        codec,
+        compression,
+        compress_threshold,
+        fragment_size,
+    )
+    for header, body in frames:
+        writer.write(header)
+        if len(body):
+            writer.write(body)
+    await writer.drain()
+
+
+async def async_receive_message(
+    reader: asyncio.StreamReader, max_message_size: int = None
+) -> Tuple[str, Dict[str, Any]]:
+    """Receive a message from an asyncio stream, as receive_message does."""
+    if max_message_size is None:
+        max_message_size = _max_message_size
+    assembler = _MessageAssembler(max_message_size)
+    while True:
+        try:
+            frame = await _async_receive_frame(reader, max_message_size)
+        except ConnectionClosed:
+            if assembler.pending:
+                raise ProtocolError("Connection closed in the middle of a message")
+            raise
+        payload = assembler.feed(frame)
+        if payload is not None:
+            return _decode_payload(payload, assembler.limit)
+
+
+async def _async_receive_frame(reader: asyncio.StreamReader, max_message_size: int):
+    """Receive one frame from an asyncio stream, flags byte included."""
+    try:
+        length_bytes = await reader.readexactly(4)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            raise ConnectionClosed("Connection closed")
+        raise ProtocolError("Incomplete length header")
+    length = _frame_length(length_bytes, max_message_size)
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("Incomplete message received")
+
+
+async def async_send_stream(
+    writer: asyncio.StreamWriter,
+    chunks: Union[Iterable[bytes], AsyncIterable[bytes]],
+    max_message_size: int = None,
+    codec: str = None,
+    compression: str = None,
+    compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+    fragment_size: int = DEFAULT_CHUNK_SIZE,
+) -> None:
+    """Send byte strings as a stream over an asyncio stream, as send_stream does.
+
+    chunks may be an ordinary or an asynchronous iterable.  The writer
+    is drained after every chunk so only one is buffered at a time.
+    """
+    encoder = _StreamEncoder(
+        max_message_size, compression, compress_threshold, fragment_size
+    )
+
+    async def write(chunk):
+        for header, body in encoder.frames(chunk):
+            writer.write(header)
+            writer.write(body)
+        await writer.drain()
+
+    if hasattr(chunks, "__aiter__"):
+        async for chunk in chunks:
+            await write(chunk)
+    else:
+        for chunk in chunks:
+            await write(chunk)
+    writer.write(encoder.end()[0])
+    await writer.drain()
+
+
+async def async_receive_stream(
+    reader: asyncio.StreamReader, max_message_size: int = None
+) -> AsyncIterator[bytes]:
+    """Yield the chunks of a stream from an asyncio stream as they arrive."""
+    if max_message_size is None:
+        max_message_size = _max_message_size
+    while True:
+        try:
+            frame = await _async_receive_frame(reader, max_message_size)
+        except ConnectionClosed:
+            raise ProtocolError("Connection closed in the middle of a stream")
+        data, more = _decode_stream_frame(frame, max_message_size * MAX_MESSAGE_RATIO)
+        if data:
+            yield data
+        if not more:
+            return
+
+
+class MessageProtocol(asyncio.Protocol):
+    """Message framing for callback-based asyncio transports.
+
+    Complete messages are passed to message_received(), which queues
+    them for receive() unless a subclass overrides it, and stream frames
+    are passed to stream_received().  A protocol error closes the
+    transport and is raised from receive() once earlier messages have
+    been consumed.  Keyword arguments (e.g. codec) are used by send().
+    """
+
+    def __init__(self, max_message_size: int = None, **wire):
+        self.max_message_size = max_message_size or _max_message_size
+        self.wire = wire
+        self.transport = None
+        self._buffer = bytearray()
+        self._assembler = _MessageAssembler(self.max_message_size)
+        self._messages = asyncio.Queue()
+        self._failed = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self._buffer += data
+        offset = 0
+        try:
+            while len(self._buffer) - offset >= 4 and not self._failed:
+                length = _frame_length(
+                    self._buffer[offset : offset + 4], self.max_message_size
+                )
+                end = offset + 4 + length
+                if len(self._buffer) < end:
+                    break
+                frame = self._buffer[offset + 4 : end]
+                offset = end
+                self._frame_received(frame)
+        except ProtocolError as e:
+            self._fail(e)
+        del self._buffer[:offset]
+
+    def connection_lost(self, exc):
+        if self._assembler.pending:
+            self._fail(ProtocolError("Connection closed in the middle of a message"))
+        else:
+            self._fail(ConnectionClosed("Connection closed"))
+
+    def _frame_received(self, frame):
+        if frame and frame[0] & FRAME_MARKER and frame[0] & FLAG_RAW:
+            if not self._assembler.pending:
+                data, more = _decode_stream_frame(frame, self._assembler.limit)
+                self.stream_received(data, more)
+                return
+        payload = self._assembler.feed(frame)
+        if payload is not None:
+            self.message_received(*_decode_payload(payload, self._assembler.limit))
+
+    def _fail(self, error: Exception):
+        if self._failed:
+            return
+        self._failed = True
+        self._messages.put_nowait(error)
+        if self.transport is not None:
+            self.transport.close()
+
+    def message_received(self, msg_type: str, data: Dict[str, Any]) -> None:
+        """Handle a complete message; the default queues it for receive()."""
+        self._messages.put_nowait((msg_type, data))
+
+    def stream_received(self, data: bytes, more: bool) -> None:
+        """Handle a chunk of stream data; subclasses that expect streams override this."""
+        raise ProtocolError("Invalid message format: unexpected stream data")
+
+    async def receive(self) -> Tuple[str, Dict[str, Any]]:
+        """Return the next message queued by message_received()."""
+        item = await self._messages.get()
+        if isinstance(item, Exception):
+            # Leave the error for any later caller too
+            self._messages.put_nowait(item)
+            raise item
+        return item
+
+    def send(self, msg_type: str, data: Dict[str, Any]) -> None:
+        """Frame a message and write it to the transport."""
+        frames = _encode_frames(msg_type, data, self.max_message_size, **self.wire)
+        for header, body in frames:
+            self.transport.write(header)
+            if len(body):
+                self.transport.write(body)
+
+
 # Message type constants
 MSG_PHASE = "phase"
 MSG_RUN = "run"
 MSG_CONFIG = "config"
 MSG_RESULT = "result"
+MSG_RESULTS = "results"  # A batch of results: {"results": [{code, message}, ...]}
 MSG_DONE = "done"
 MSG_ERROR = "error"
+MSG_HELLO = "hello"  # Connection setup; see conductor.handshake for the fields
+MSG_PLAN = "plan"  # Every phase of a trial: {"phases": {name: phase data, ...}}
+MSG_TRIGGER = "trigger"  # Queue a planned phase: {"phase": name, "trial": n}
+MSG_HEARTBEAT = "heartbeat"  # Player is alive mid-phase: {"completed": steps}
+# A line of step output: {"step": index, "stream": "stdout", "time": t, "line": text}
+MSG_OUTPUT = "output"
+# Read spooled step output: {"spool": id, "offset": n, "length": n or None};
+# acknowledged with a result, then the bytes follow as a stream
+MSG_FETCH = "fetch"
+MSG_PING = "ping"  # Is the player answering? Acknowledged with a result
+# What the player is doing; answered with MSG_STATUS, see Player.status()
+MSG_STATUS = "status"
+MSG_SHUTDOWN = "shutdown"  # Stop the player once the reply is sent
+# Stop the running phase, skipping its remaining steps: {"all": bool};
+# acknowledged with a result, the phase's partial results follow its RUN
+MSG_CANCEL = "cancel"
@@ -35,36 +35,156 @@
 # Description: A Phase object encapsulates a set of Steps to be taken
 # by the Client when asked by the Conductor.
 
-import socket
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 from conductor import retval
+from conductor.json_protocol import send_message, MSG_RESULTS
+
+# Ways a player can execute a phase's steps
+ENGINE_THREAD = "thread"
+ENGINE_ASYNCIO = "asyncio"
+ENGINES = [ENGINE_THREAD, ENGINE_ASYNCIO]
+
+# Per-result allowance for the JSON envelope when sizing result batches
+_RESULT_OVERHEAD = 32
 
 
 class Phase:
     """Each Phase contains one, or more, steps."""
 
-    def __init__(self, resulthost, resultport):
+    def __init__(self, resulthost, resultport, max_parallel=None, name=None):
         self.resulthost = resulthost
         self.resultport = resultport
+        # startup, run, collect or reset, when the conductor says which
+        self.name = name
+        # Most steps of a parallel group that may run at once (None: all)
+        self.max_parallel = max_parallel
         self.steps = []
         self.results = []
 
     def append(self, step):
         self.steps.append(step)
 
-    def run(self):
-        """Execute all the steps"""
+    def groups(self):
+        """Split the steps into runs of steps that execute together
+
+        Consecutive steps with the same group run concurrently; steps
+        without a group run alone, in order.
+        """
+        runs = []
         for step in self.steps:
-            ret = step.run()
-            self.results.append(ret)
-
-    def return_results(self):
-        """Return the results of the steps"""
-        for result in self.results:
-            ressock = socket.create_connection((self.resulthost, self.resultport))
-            result.send(ressock)
-            ressock.close()
-        ressock = socket.create_connection((self.resulthost, self.resultport))
-        ret = retval.RetVal(retval.RETVAL_DONE, "phases complete")
-        ret.send(ressock)
-        ressock.close()
+            if runs and step.group is not None and runs[-1][0].group == step.group:
+                runs[-1].append(step)
+            else:
+                runs.append([step])
+        return runs
+
+    def run(self, output=None, spool=None, spawned=None, cancel=None):
+        """Execute all the steps, keeping results in declaration order
+
+        With an output callback, every line of step output is passed to
+        output(index, stream, line) as it is produced, index being the
+        step's position in the phase.  With an OutputSpool, each step's
+        stdout is written to a spool file of its own, and spawned steps
+        are tracked in the SpawnRegistry given as spawned.
+
+        Once the Cancellation given as cancel is cancelled, no further
+        steps start, and only the steps that ran have results.
+        """
+        for steps in self.groups():
+            if cancel is not None and cancel.cancelled:
+                return
+            first = len(self.results)
+
+            def run_step(i):
+                if cancel is not None and cancel.cancelled:
+                    return None
+                return steps[i].run(
+                    **self._step_args(first + i, output, spool, spawned, cancel)
+                )
+
+            if len(steps) == 1:
+                results = [run_step(0)]
+            else:
+                workers = min(self.max_parallel or len(steps), len(steps))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(run_step, range(len(steps))))
+            self.results.extend(result for result in results if result is not None)
+
+    async def async_run(self, output=None, spool=None, spawned=None, cancel=None):
+        """Execute all the steps as coroutines, like run()
+
+        A parallel group's steps share the event loop instead of a
+        thread pool, with a semaphore enforcing max_parallel.
+        """
+        for steps in self.groups():
+            if cancel is not None and cancel.cancelled:
+                return
+            first = len(self.results)
+            limit = asyncio.Semaphore(self.max_parallel or len(steps))
+
+            async def run_step(i):
+                async with limit:
+                    if cancel is not None and cancel.cancelled:
+                        return None
+                    return await steps[i].async_run(
+                        **self._step_args(first + i, output, spool, spawned, cancel)
+                    )
+
+            if len(steps) == 1:
+                results = [await run_step(0)]
+            else:
+                results = await asyncio.gather(*map(run_step, range(len(steps))))
+            self.results.extend(result for result in results if result is not None)
+
+    @staticmethod
+    def _step_args(index, output, spool, spawned, cancel=None):
+        """Return the arguments passing a step's output on, if wanted"""
+        args = {}
+        if output is not None:
+            args["output"] = lambda stream, line: output(index, stream, line)
+        if spool is not None:
+            args["spool"] = spool
+        if spawned is not None:
+            args["spawned"] = spawned
+        if cancel is not None:
+            args["cancel"] = cancel
+        return args
+
+    def execute(
+        self, engine=ENGINE_THREAD, output=None, spool=None, spawned=None, cancel=None
+    ):
+        """Run the phase with the given execution engine"""
+        if engine == ENGINE_ASYNCIO:
+            asyncio.run(self.async_run(output, spool, spawned, cancel))
+        else:
+            self.run(output, spool, spawned, cancel)
+
+    def return_results(self, sock, max_batch_bytes=None, **wire):
+        """Return the results of the steps over the conductor's session
+
+        With max_batch_bytes set, results are packed into MSG_RESULTS
+        frames of roughly that many bytes each, with the DONE marker as
+        the final entry of the last batch.  Otherwise every result is
+        sent as its own frame, followed by a separate DONE frame.  Any
+        other keyword arguments (e.g. codec) are passed to send_message.
+        """
+        done = retval.RetVal(retval.RETVAL_DONE, "phases complete")
+        if max_batch_bytes is None:
+            for result in self.results:
+                result.send(sock, **wire)
+            done.send(sock, **wire)
+            return
+
+        batch = []
+        batch_bytes = 0
+        for result in self.results + [done]:
+            size = len(result.message) + _RESULT_OVERHEAD
+            if batch and batch_bytes + size > max_batch_bytes:
+                send_message(sock, MSG_RESULTS, {"results": batch}, **wire)
+                batch = []
+                batch_bytes = 0
+            batch.append(result.to_dict())
+            batch_bytes += size
+        send_message(sock, MSG_RESULTS, {"results": batch}, **wire)
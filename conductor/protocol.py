@@ -1,31 +1,37 @@
-"""JSON-based protocol for conductor communication.
+"""Object-level interface to the conductor wire protocol.
 
-This module provides JSON-based network communication (PLAIN TEXT)
-between conductor and players.
+Messages are framed and encoded by conductor.json_protocol; this module
+adds the Message class and converters between conductor objects and
+message data.
 WARNING: No encryption - use only on private networks.
 """
 
 import json
-import struct
 import socket
 from enum import Enum
 from typing import Dict, Any
 
+from conductor.json_protocol import (
+    ProtocolError,
+    encode_json_message,
+    send_message,
+    receive_message,
+    MSG_PHASE,
+    MSG_RUN,
+    MSG_CONFIG,
+    MSG_RESULT,
+    MSG_ERROR,
+)
+
 
 class MessageType(Enum):
     """Types of messages in the conductor protocol."""
 
-    PHASE = "phase"
-    RUN = "run"
-    CONFIG = "config"
-    RESULT = "result"
-    ERROR = "error"
-
-
-class ProtocolError(Exception):
-    """Raised when protocol errors occur."""
-
-    pass
+    PHASE = MSG_PHASE
+    RUN = MSG_RUN
+    CONFIG = MSG_CONFIG
+    RESULT = MSG_RESULT
+    ERROR = MSG_ERROR
 
 
 class Message:
@@ -40,60 +46,39 @@ class Message:
 
     def to_json(self) -> str:
         """Serialize message to JSON string."""
-        return json.dumps(
-            {"version": self.version, "type": self.type.value, "payload": self.payload},
-            separators=(",", ":"),
-        )  # Compact JSON
+        return encode_json_message(self.type.value, self.payload, self.version).decode(
+            "utf-8"
+        )
 
     @classmethod
     def from_json(cls, data: str) -> "Message":
-        """Deserialize message from JSON string."""
+        """Deserialize message from JSON string.
+
+        Messages written by older releases carry their data under
+        "payload" rather than "data" and are still accepted.
+        """
         try:
             obj = json.loads(data)
-            if "version" not in obj or "type" not in obj or "payload" not in obj:
+            payload = obj.get("data", obj.get("payload"))
+            if "version" not in obj or "type" not in obj or payload is None:
                 raise ProtocolError("Invalid message format")
-            return cls(MessageType(obj["type"]), obj["payload"], obj["version"])
-        except (json.JSONDecodeError, ValueError) as e:
+            return cls(MessageType(obj["type"]), payload, obj["version"])
+        except (json.JSONDecodeError, AttributeError, ValueError) as e:
             raise ProtocolError(f"Failed to parse message: {e}")
 
 
 def send_json_message(sock: socket.socket, message: Message) -> None:
     """Send a JSON message with length prefix."""
-    data = message.to_json().encode("utf-8")
-    length = struct.pack("!I", len(data))
-    sock.sendall(length + data)
+    send_message(sock, message.type.value, message.payload)
 
 
 def receive_json_message(sock: socket.socket) -> Message:
-    """Receive a JSON message with length prefix."""
-    # Read length header
-    length_data = _recv_exactly(sock, 4)
-    if len(length_data) < 4:
-        raise ProtocolError("Connection closed while reading length")
-
-    length = struct.unpack("!I", length_data)[0]
-
-    # Sanity check length
-    if length > 10 * 1024 * 1024:  # 10MB max
-        raise ProtocolError(f"Message too large: {length} bytes")
-
-    # Read message data
-    data = _recv_exactly(sock, length)
-    if len(data) < length:
-        raise ProtocolError("Connection closed while reading message")
-
-    return Message.from_json(data.decode("utf-8"))
-
-
-def _recv_exactly(sock: socket.socket, length: int) -> bytes:
-    """Receive exactly length bytes from socket."""
-    data = b""
-    while len(data) < length:
-        chunk = sock.recv(min(4096, length - len(data)))
-        if not chunk:
-            break
-        data += chunk
-    return data
+    """Receive a message with length prefix."""
+    msg_type, data = receive_message(sock)
+    try:
+        return Message(MessageType(msg_type), data)
+    except ValueError:
+        raise ProtocolError(f"Unexpected message type: {msg_type}")
 
 
 # Converter functions for existing objects
@@ -101,17 +86,23 @@ def _recv_exactly(sock: socket.socket, length: int) -> bytes:
 
 def phase_to_dict(phase) -> Dict[str, Any]:
     """Convert a Phase object to a dictionary."""
-    return {
+    data = {
         "steps": [step_to_dict(step) for step in phase.steps],
         "resulthost": phase.resulthost,
         "resultport": phase.resultport,
         "results": [result_to_dict(r) for r in phase.results],
     }
+    if getattr(phase, "max_parallel", None) is not None:
+        data["max_parallel"] = phase.max_parallel
+    return data
 
 
 def step_to_dict(step) -> Dict[str, Any]:
     """Convert a Step object to a dictionary."""
-    return {"args": step.args, "spawn": step.spawn, "timeout": step.timeout}
+    data = {"args": step.args, "spawn": step.spawn, "timeout": step.timeout}
+    if getattr(step, "group", None) is not None:
+        data["group"] = step.group
+    return data
 
 
 def result_to_dict(result) -> Dict[str, Any]:
@@ -137,7 +128,10 @@ def step_from_dict(data: Dict[str, Any]):
         shlex.join(data["args"]) if isinstance(data["args"], list) else data["args"]
     )
     return Step(
-        command, spawn=data.get("spawn", False), timeout=data.get("timeout", None)
+        command,
+        spawn=data.get("spawn", False),
+        timeout=data.get("timeout", None),
+        group=data.get("group"),
     )
 
 
@@ -145,7 +139,7 @@ def phase_from_dict(data: Dict[str, Any]):
     """Create a Phase object from a dictionary."""
     from conductor.phase import Phase
 
-    phase = Phase(data["resulthost"], data["resultport"])
+    phase = Phase(data["resulthost"], data["resultport"], data.get("max_parallel"))
     for step_data in data.get("steps", []):
         phase.append(step_from_dict(step_data))
     # Note: results are not deserialized as they're typically only sent back
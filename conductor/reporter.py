@@ -2,7 +2,10 @@
 
 import json
 import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+# Optional fields of a result that are recorded along with it
+RESULT_DETAILS = ("output", "spawned", "usage", "killed")
 
 
 class Reporter:
@@ -81,17 +84,81 @@ class Reporter:
             worker_data["end_time"] = datetime.datetime.now().isoformat()
             self.current_worker = None
 
-    def add_result(self, code: int, message: str):
-        """Add a result from the current worker."""
+    def add_result(
+        self,
+        code: int,
+        message: str,
+        output: Optional[Dict[str, Any]] = None,
+        spawned: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, Any]] = None,
+        killed: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """Add a result from the current worker.
+
+        output is the summary of the step's spooled output, if the
+        player spooled it, spawned describes a background command that
+        has ended, usage is what the command used on the player and
+        killed lists the processes stopped when it timed out; any of
+        them is recorded with the result.
+        """
+        if self.current_trial and self.current_phase and self.current_worker:
+            worker_data = self.current_trial["phases"][self.current_phase]["workers"][
+                self.current_worker
+            ]
+            result = {
+                "timestamp": datetime.datetime.now().isoformat(),
+                "code": code,
+                "message": message,
+            }
+            if output is not None:
+                result["output"] = output
+            if spawned is not None:
+                result["spawned"] = spawned
+            if usage is not None:
+                result["usage"] = usage
+            if killed is not None:
+                result["killed"] = killed
+            worker_data["results"].append(result)
+
+    def add_results(self, results: List[Dict[str, Any]]):
+        """Add a batch of results from the current worker.
+
+        Each entry is a result as sent on the wire, a dict with "code"
+        and "message" keys and any of the RESULT_DETAILS fields.
+        """
+        if self.current_trial and self.current_phase and self.current_worker:
+            worker_data = self.current_trial["phases"][self.current_phase]["workers"][
+                self.current_worker
+            ]
+            timestamp = datetime.datetime.now().isoformat()
+            for result in results:
+                entry = {
+                    "timestamp": timestamp,
+                    "code": result.get("code", 0),
+                    "message": result.get("message", ""),
+                }
+                for detail in RESULT_DETAILS:
+                    if detail in result:
+                        entry[detail] = result[detail]
+                worker_data["results"].append(entry)
+
+    def add_output(self, step: int, stream: str, timestamp: float, line: str):
+        """Add a line of output streamed from a step of the current worker.
+
+        step is the step's index in the phase and timestamp the player's
+        time (in seconds since the epoch) at which the line was read.
+        Lines are kept under the worker's "output" key as they arrive.
+        """
         if self.current_trial and self.current_phase and self.current_worker:
             worker_data = self.current_trial["phases"][self.current_phase]["workers"][
                 self.current_worker
             ]
-            worker_data["results"].append(
+            worker_data.setdefault("output", []).append(
                 {
-                    "timestamp": datetime.datetime.now().isoformat(),
-                    "code": code,
-                    "message": message,
+                    "timestamp": datetime.datetime.fromtimestamp(timestamp).isoformat(),
+                    "step": step,
+                    "stream": stream,
+                    "line": line,
                 }
             )
 
@@ -122,15 +189,38 @@ class JSONReporter(Reporter):
 class TextReporter(Reporter):
     """Traditional text format reporter."""
 
-    def add_result(self, code: int, message: str):
+    def add_result(
+        self,
+        code: int,
+        message: str,
+        output: Optional[Dict[str, Any]] = None,
+        spawned: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, Any]] = None,
+        killed: Optional[List[Dict[str, Any]]] = None,
+    ):
         """Add a result and print it immediately."""
-        super().add_result(code, message)
+        super().add_result(code, message, output, spawned, usage, killed)
         # Print in traditional format
         if code == 0 and message.lower() == "done":
             print("done")
         else:
             print(code, message)
 
+    def add_results(self, results: List[Dict[str, Any]]):
+        """Add a batch of results and print them immediately."""
+        super().add_results(results)
+        for result in results:
+            code = result.get("code", 0)
+            message = result.get("message", "")
+            if code == 0 and message.lower() == "done":
+                print("done")
+            else:
+                print(code, message)
+
+    def add_output(self, step: int, stream: str, timestamp: float, line: str):
+        """Print a line of streamed output immediately, without keeping it."""
+        print(line, end="")
+
     def write_output(self):
         """Text reporter writes output incrementally, so nothing to do here."""
         if self.output_file:
@@ -156,6 +246,30 @@ class TextReporter(Reporter):
                                 f.write(
                                     f"        Code: {result['code']}, Message: {result['message']}\n"
                                 )
+                                if "usage" in result:
+                                    f.write(f"          {format_usage(result['usage'])}\n")
+                                if "killed" in result:
+                                    f.write(f"          {format_killed(result['killed'])}\n")
+
+
+def format_usage(usage: Dict[str, Any]) -> str:
+    """Format a result's resource usage as one line of text."""
+    text = (
+        f"Wall: {usage['wall']:.3f}s, User: {usage['user']:.3f}s, "
+        f"Sys: {usage['sys']:.3f}s, Max RSS: {usage['maxrss']} KB, "
+        f"Switches: {usage['nvcsw']}/{usage['nivcsw']}"
+    )
+    if "stdout_bytes" in usage:
+        text += f", Out: {usage['stdout_bytes']}/{usage['stderr_bytes']} bytes"
+    return text
+
+
+def format_killed(killed: List[Dict[str, Any]]) -> str:
+    """Format the processes stopped with a timed-out step as one line of text."""
+    return "Killed: " + ", ".join(
+        f"{process['pid']} {process['command']} ({process['signal']})"
+        for process in killed
+    )
 
 
 def create_reporter(format: str, output_file: Optional[str] = None) -> Reporter:
@@ -44,7 +44,9 @@ RETVAL_DONE = 65535
 
 
 class RetVal:
-    def __init__(self, code=0, message=""):
+    def __init__(
+        self, code=0, message="", output=None, spawned=None, usage=None, killed=None
+    ):
         # Ensure code is an integer and message is a string
         # This matches actual usage throughout the codebase
         if not isinstance(code, int):
@@ -54,14 +56,33 @@ class RetVal:
         
         self.code = code
         self.message = message
+        # Summary of the step's spooled output, if it was spooled
+        self.output = output
+        # Details of a spawned command that has ended, if that is what
+        # this result reports
+        self.spawned = spawned
+        # What the command used on the player, see conductor.accounting
+        self.usage = usage
+        # Processes stopped when the command timed out, each as
+        # {"pid", "command", "signal"}; see background.terminate_group()
+        self.killed = killed
 
-    def send(self, sock):
-        """Send this RetVal as a JSON message."""
-        # RetVal should always have integer code and string message
-        # based on actual usage in the codebase
-        data = {
-            "code": self.code,
-            "message": self.message
-        }
-        
-        send_message(sock, MSG_RESULT, data)
+    def to_dict(self):
+        """Return the wire representation of this RetVal."""
+        data = {"code": self.code, "message": self.message}
+        if self.output is not None:
+            data["output"] = self.output
+        if self.spawned is not None:
+            data["spawned"] = self.spawned
+        if self.usage is not None:
+            data["usage"] = self.usage
+        if self.killed is not None:
+            data["killed"] = self.killed
+        return data
+
+    def send(self, sock, **wire):
+        """Send this RetVal as a result message.
+
+        Any keyword arguments (e.g. codec) are passed to send_message.
+        """
+        send_message(sock, MSG_RESULT, self.to_dict(), **wire)
@@ -38,6 +38,9 @@
 
 # "system" imports
 import configparser
+import functools
+import itertools
+import operator
 import sys
 import argparse
 import os
@@ -45,6 +48,17 @@ import logging
 
 # local imports
 from conductor import client
+from conductor import retval
+from conductor.handshake import DEFAULT_HEARTBEAT_INTERVAL, DEFAULT_HEARTBEAT_MISSES
+from conductor.json_protocol import (
+    ProtocolError,
+    CODEC_JSON,
+    SUPPORTED_CODECS,
+    COMPRESS_NONE,
+    COMPRESS_ZLIB,
+    SUPPORTED_COMPRESSION,
+    DEFAULT_COMPRESS_THRESHOLD,
+)
 from conductor.reporter import create_reporter
 
 
@@ -65,35 +79,91 @@ def setup_logging(verbose, quiet):
     return logging.getLogger(__name__)
 
 
-def run_phase(clients, phase_name, phase_methods, reporter=None):
-    """Run a single phase across all clients."""
+def run_phase(
+    clients, phase_name, phase_methods, reporter=None, failed=None, fail_fast=False
+):
+    """Run a single phase across all clients.
+
+    Clients whose results cannot be collected are added to failed, and
+    clients already in it are skipped, so one dead player does not hold
+    up the others for the rest of the trial.  An optional "queue" method
+    sends the next phase ahead while this one's results are collected.
+
+    With fail_fast, the first player with a failed step has the phase
+    cancelled on every other player, which then only returns partial
+    results, and any phase queued ahead is dropped.  Returns whether
+    that happened.
+    """
     logger = logging.getLogger(__name__)
+    if failed is None:
+        failed = set()
+    active = [client for client in clients if client not in failed]
 
     if reporter:
         reporter.start_phase(phase_name)
 
     # Download phase
     logger.info(f"Downloading {phase_name} phase to all clients")
-    for client in clients:
+    for client in active:
         phase_methods["download"](client)
 
     # Execute phase
     logger.info(f"Executing {phase_name} phase on all clients")
-    for client in clients:
+    for client in active:
         client.doit()
+    if "queue" in phase_methods:
+        for client in active:
+            phase_methods["queue"](client)
 
     # Collect results
     logger.info(f"Collecting {phase_name} results from all clients")
+    cancelled = False
     for idx, client in enumerate(clients):
         worker_name = f"worker_{idx}"  # TODO: Get actual worker name from config
         if reporter:
             reporter.start_worker(worker_name)
-        client.results(reporter)
+        if client not in active:
+            if reporter:
+                reporter.add_result(retval.RETVAL_ERROR, "player failed earlier")
+        else:
+            try:
+                failures = client.results(reporter)
+            except (OSError, ProtocolError) as e:
+                # Record the player as failed and carry on with the others
+                logger.error(f"{worker_name} failed during {phase_name}: {e}")
+                failed.add(client)
+                failures = 1
+                if reporter:
+                    reporter.add_result(retval.RETVAL_ERROR, f"player failed: {e}")
+            if fail_fast and failures and not cancelled:
+                logger.warning(
+                    f"{worker_name} failed during {phase_name}; "
+                    "cancelling it on the other players"
+                )
+                cancel_phase(active, failed)
+                cancelled = True
         if reporter:
             reporter.end_worker()
 
     if reporter:
         reporter.end_phase()
+    return cancelled
+
+
+def cancel_phase(clients, failed):
+    """Cancel the running phase, and any queued after it, on every client
+
+    Clients that cannot be reached are added to failed.
+    """
+    logger = logging.getLogger(__name__)
+    for client in clients:
+        if client in failed:
+            continue
+        try:
+            logger.debug(f"{client.endpoint}: {client.cancel()}")
+        except (OSError, ProtocolError) as e:
+            logger.error(f"Failed to cancel the phase on {client.endpoint}: {e}")
+            failed.add(client)
 
 
 def validate_positive_int(value):
@@ -104,6 +174,14 @@ def validate_positive_int(value):
     return ivalue
 
 
+def validate_non_negative_float(value):
+    """Validate that value is a number of seconds, zero included."""
+    fvalue = float(value)
+    if fvalue < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, got {value}")
+    return fvalue
+
+
 def parse_args(argv=None):
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -174,6 +252,65 @@ def parse_args(argv=None):
         help="Maximum message size in megabytes (default: 10)"
     )
 
+    parser.add_argument(
+        "--codec",
+        choices=SUPPORTED_CODECS,
+        default=None,
+        help="Preferred wire encoding, negotiated with each player; "
+        "binary is more compact, json is faster (default: json)",
+    )
+
+    parser.add_argument(
+        "--compression",
+        choices=[COMPRESS_NONE] + SUPPORTED_COMPRESSION,
+        default=None,
+        help="Preferred compression for large messages, negotiated with each "
+        "player (default: zlib)",
+    )
+
+    parser.add_argument(
+        "--compress-threshold",
+        type=validate_positive_int,
+        default=None,
+        metavar="BYTES",
+        help="Only compress messages of at least this size "
+        f"(default: {DEFAULT_COMPRESS_THRESHOLD})",
+    )
+
+    parser.add_argument(
+        "--heartbeat-interval",
+        type=validate_non_negative_float,
+        default=None,
+        metavar="SECONDS",
+        help="Ask players for a heartbeat this often while a phase runs; "
+        f"0 disables (default: {DEFAULT_HEARTBEAT_INTERVAL:g})",
+    )
+
+    parser.add_argument(
+        "--heartbeat-misses",
+        type=validate_positive_int,
+        default=None,
+        metavar="N",
+        help="Mark a player failed after this many missed heartbeats "
+        f"(default: {DEFAULT_HEARTBEAT_MISSES})",
+    )
+
+    parser.add_argument(
+        "--stream-output",
+        action="store_true",
+        default=None,
+        help="Have players send step output line by line as it is produced "
+        "instead of with the step's result",
+    )
+
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        default=None,
+        help="Once a step fails on one player, cancel its phase on the others "
+        "and skip the rest of the trial up to its reset phase",
+    )
+
     return parser.parse_args(argv)
 
 
@@ -226,6 +363,61 @@ def main():
                     logger.error(f"Invalid max_message_size in config: {e}")
                     sys.exit(1)
 
+        # Get codec from config if not specified on command line
+        if args.codec is None:
+            args.codec = defaults.get("codec", CODEC_JSON)
+            if args.codec not in SUPPORTED_CODECS:
+                logger.error(
+                    f"Invalid codec in config: {args.codec} "
+                    f"(choose from {', '.join(SUPPORTED_CODECS)})"
+                )
+                sys.exit(1)
+
+        # Get compression settings from config if not specified on command line
+        if args.compression is None:
+            args.compression = defaults.get("compression", COMPRESS_ZLIB)
+            if args.compression not in [COMPRESS_NONE] + SUPPORTED_COMPRESSION:
+                logger.error(f"Invalid compression in config: {args.compression}")
+                sys.exit(1)
+        if args.compress_threshold is None:
+            try:
+                args.compress_threshold = validate_positive_int(
+                    defaults.get("compress_threshold", DEFAULT_COMPRESS_THRESHOLD)
+                )
+            except (ValueError, argparse.ArgumentTypeError) as e:
+                logger.error(f"Invalid compress_threshold in config: {e}")
+                sys.exit(1)
+
+        # Get heartbeat settings from config if not specified on command line
+        try:
+            if args.heartbeat_interval is None:
+                args.heartbeat_interval = validate_non_negative_float(
+                    defaults.get("heartbeat_interval", DEFAULT_HEARTBEAT_INTERVAL)
+                )
+            if args.heartbeat_misses is None:
+                args.heartbeat_misses = validate_positive_int(
+                    defaults.get("heartbeat_misses", DEFAULT_HEARTBEAT_MISSES)
+                )
+        except (ValueError, argparse.ArgumentTypeError) as e:
+            logger.error(f"Invalid heartbeat setting in config: {e}")
+            sys.exit(1)
+
+        # Get output streaming from config if not specified on command line
+        if args.stream_output is None:
+            try:
+                args.stream_output = defaults.getboolean("stream_output", False)
+            except ValueError as e:
+                logger.error(f"Invalid stream_output in config: {e}")
+                sys.exit(1)
+
+        # Get fail-fast mode from config if not specified on command line
+        if args.fail_fast is None:
+            try:
+                args.fail_fast = defaults.getboolean("fail_fast", False)
+            except ValueError as e:
+                logger.error(f"Invalid fail_fast in config: {e}")
+                sys.exit(1)
+
     except KeyError:
         logger.error("Configuration missing [Test] section")
         sys.exit(1)
@@ -258,7 +450,18 @@ def main():
         try:
             with open(worker_config_path) as file:
                 worker_config.read_file(file)
-            clients.append(client.Client(worker_config, max_message_size=args.max_message_size))
+            clients.append(
+                client.Client(
+                    worker_config,
+                    max_message_size=args.max_message_size,
+                    codec=args.codec,
+                    compression=args.compression,
+                    compress_threshold=args.compress_threshold,
+                    heartbeat_interval=args.heartbeat_interval or None,
+                    heartbeat_misses=args.heartbeat_misses,
+                    stream_output=args.stream_output,
+                )
+            )
         except Exception as e:
             logger.error(f"Failed to load worker {worker_name}: {e}")
             sys.exit(1)
@@ -283,11 +486,13 @@ def main():
     reporter.start_trials(trials, len(clients))
 
     # Phase method mapping
+    # Players that accept a plan get every phase once per session, and
+    # each trial then only names the phase to run.
     phase_methods = {
-        "startup": lambda c: c.startup(),
-        "run": lambda c: c.run(),
-        "collect": lambda c: c.collect(),
-        "reset": lambda c: c.reset(),
+        "startup": lambda c, trial: c.startup(trial),
+        "run": lambda c, trial: c.run(trial),
+        "collect": lambda c, trial: c.collect(trial),
+        "reset": lambda c, trial: c.reset(trial),
     }
 
     # Run trials
@@ -295,13 +500,32 @@ def main():
         logger.info(f"Starting trial {trial + 1} of {trials}")
         reporter.start_trial(trial + 1)
 
-        for phase in phases_to_run:
-            if phase in phase_methods:
-                run_phase(clients, phase, {"download": phase_methods[phase]}, reporter)
+        # Players that fail are skipped until the next trial
+        failed = set()
+        cancelled = False
+        planned = [phase for phase in phases_to_run if phase in phase_methods]
+        for phase, after in itertools.zip_longest(planned, planned[1:]):
+            if cancelled and phase != "reset":
+                # Players are still reset for the next trial
+                logger.warning(f"Skipping {phase} phase after a failure")
+                continue
+            methods = {
+                "download": functools.partial(phase_methods[phase], trial=trial + 1)
+            }
+            # Players with request IDs receive the next phase while they
+            # still run this one
+            if after is not None:
+                methods["queue"] = operator.methodcaller("queue", after, trial + 1)
+            if run_phase(clients, phase, methods, reporter, failed, args.fail_fast):
+                cancelled = True
 
         reporter.end_trial()
         logger.info(f"Completed trial {trial + 1} of {trials}")
 
+    # Release the control sessions to the players
+    for c in clients:
+        c.close()
+
     # Finalize report
     reporter.finalize()
     logger.info("All trials completed successfully")
@@ -0,0 +1,44 @@
+"""Tests for resource accounting of player commands."""
+
+import subprocess
+import sys
+
+from conductor.accounting import AccountedPopen
+
+
+class TestAccountedPopen:
+    """Test collecting a child's rusage when it is reaped."""
+
+    def test_usage_of_a_reaped_child(self):
+        """Test that the child's own CPU time and memory are reported."""
+        burn = "x = bytearray(32 * 1024 * 1024); sum(range(3000000))"
+        proc = AccountedPopen([sys.executable, "-c", burn])
+
+        assert proc.usage() is None
+        proc.wait()
+
+        usage = proc.usage(10, 0)
+        assert usage["ended"] >= usage["started"]
+        assert usage["wall"] == usage["ended"] - usage["started"]
+        assert usage["user"] + usage["sys"] > 0
+        assert usage["maxrss"] >= 32 * 1024
+        assert usage["nvcsw"] >= 0 and usage["nivcsw"] >= 0
+        assert usage["stdout_bytes"] == 10
+        assert usage["stderr_bytes"] == 0
+
+    def test_byte_counts_are_optional(self):
+        """Test that output sizes are left out when nobody counted them."""
+        proc = AccountedPopen(["true"])
+        proc.wait()
+
+        assert "stdout_bytes" not in proc.usage()
+        assert "stderr_bytes" not in proc.usage()
+
+    def test_communicate_and_kill_still_work(self):
+        """Test that the usual Popen calls reap through wait4."""
+        proc = AccountedPopen(["sleep", "10"], stdout=subprocess.PIPE)
+        proc.kill()
+        proc.communicate()
+
+        assert proc.returncode == -9
+        assert proc.usage()["wall"] < 5
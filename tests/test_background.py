@@ -0,0 +1,91 @@
+"""Tests for tracking spawned background steps."""
+
+import os
+import signal
+import time
+
+from conductor.background import SpawnRegistry
+
+
+def wait_until(predicate, timeout=5.0):
+    """Poll predicate until it is true or timeout seconds have passed."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestSpawnRegistry:
+    """Test spawning, reaping and terminating background commands."""
+
+    def test_exited_command_is_reaped_and_reported(self):
+        """Test that a command's exit code and runtime are kept once."""
+        registry = SpawnRegistry()
+        registry.phase = "run"
+        entry = registry.spawn("sleep 0.1; exit 3")
+
+        assert registry.running() == [entry]
+        assert wait_until(lambda: not registry.running())
+
+        finished = registry.finished()
+        assert finished == [entry]
+        assert registry.finished() == []
+        result = entry.to_retval()
+        assert result.code == 3
+        assert "exited with 3" in result.message
+        assert result.spawned["command"] == "sleep 0.1; exit 3"
+        assert result.spawned["phase"] == "run"
+        assert result.spawned["terminated"] is False
+        assert result.spawned["runtime"] >= 0.1
+
+    def test_terminate_stops_the_process_group(self, tmp_path):
+        """Test that children of a spawned command are stopped with it."""
+        pidfile = tmp_path / "child.pid"
+        registry = SpawnRegistry(kill_grace=0.5)
+        entry = registry.spawn(f"sleep 30 & echo $! > {pidfile}; wait")
+        assert wait_until(lambda: pidfile.exists() and pidfile.read_text().strip())
+        child = int(pidfile.read_text())
+
+        registry.terminate()
+
+        assert registry.running() == []
+        assert registry.finished() == [entry]
+        assert entry.terminated is True
+        assert entry.returncode == -signal.SIGTERM
+        assert "was terminated" in entry.to_retval().message
+        # The grandchild went with the group rather than being orphaned
+        assert wait_until(lambda: not _alive(child))
+
+    def test_stubborn_command_is_killed_after_grace(self):
+        """Test that a command ignoring SIGTERM gets SIGKILL."""
+        registry = SpawnRegistry(kill_grace=0.2)
+        entry = registry.spawn("trap '' TERM; sleep 30 & wait; sleep 30")
+        time.sleep(0.2)
+
+        started = time.monotonic()
+        registry.terminate()
+
+        assert time.monotonic() - started < 5
+        assert entry.returncode == -signal.SIGKILL
+        assert entry.terminated is True
+
+    def test_terminate_without_commands(self):
+        """Test that there is nothing to do when nothing was spawned."""
+        registry = SpawnRegistry()
+        registry.terminate()
+        assert registry.finished() == []
+
+
+def _alive(pid):
+    """Return whether a process exists and is not a zombie."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().split(")")[-1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
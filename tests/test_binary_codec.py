@@ -0,0 +1,164 @@
+"""Tests for the binary message codec."""
+
+import json
+import socket
+import struct
+
+import pytest
+
+from conductor import binary_codec
+from conductor.json_protocol import (
+    send_message,
+    receive_message,
+    ProtocolError,
+    CODEC_BINARY,
+    CODEC_JSON,
+    MSG_RESULT,
+    MSG_RESULTS,
+)
+
+
+class TestBinaryCodecRoundTrip:
+    """Test that values survive encoding and decoding."""
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {},
+            {"code": 0, "message": "hello"},
+            {"negative": -1, "big": 2**70, "small": -(2**70)},
+            {"pi": 3.14159, "none": None, "yes": True, "no": False},
+            {"nested": {"list": [1, "two", [3.0, None]], "empty": []}},
+            {"unicode": "café ☃ \U0001f600", "quotes": '"\\\n\t'},
+            {"raw": b"\x00\xff binary"},
+        ],
+    )
+    def test_round_trip(self, data):
+        """Test that encode followed by decode returns the same data."""
+        encoded = binary_codec.encode_message(1, "result", data)
+        version, msg_type, decoded = binary_codec.decode_message(encoded)
+
+        assert version == 1
+        assert msg_type == "result"
+        assert decoded == data
+
+    def test_tuples_decode_as_lists(self):
+        """Test that tuples are carried as lists, as with JSON."""
+        encoded = binary_codec.encode_message(1, "phase", {"steps": (1, 2)})
+        assert binary_codec.decode_message(encoded)[2] == {"steps": [1, 2]}
+
+    def test_unknown_message_type_is_spelled_out(self):
+        """Test that message types without a tag still round trip."""
+        encoded = binary_codec.encode_message(1, "custom", {"x": 1})
+        assert binary_codec.decode_message(encoded) == (1, "custom", {"x": 1})
+
+    def test_request_id_round_trip(self):
+        """Test that an optional trailing request ID is carried."""
+        encoded = binary_codec.encode_message(1, "result", {"code": 0}, request_id=300)
+
+        assert binary_codec.decode_envelope(encoded) == (1, "result", {"code": 0}, 300)
+        assert binary_codec.decode_message(encoded) == (1, "result", {"code": 0})
+        untagged = binary_codec.encode_message(1, "result", {"code": 0})
+        assert binary_codec.decode_envelope(untagged)[3] is None
+
+    def test_encoding_is_more_compact_than_json(self):
+        """Test that a typical result is smaller than its JSON envelope."""
+        data = {"results": [{"code": 0, "message": f"line {i}\n"} for i in range(100)]}
+        encoded = binary_codec.encode_message(1, "results", data)
+        as_json = json.dumps({"version": 1, "type": "results", "data": data})
+
+        assert len(encoded) < len(as_json.encode("utf-8")) * 0.75
+
+
+class TestBinaryCodecErrors:
+    """Test handling of bad input."""
+
+    def test_rejects_unencodable_values(self):
+        """Test that arbitrary objects raise TypeError."""
+        with pytest.raises(TypeError):
+            binary_codec.encode_message(1, "result", {"obj": object()})
+
+    def test_rejects_non_string_keys(self):
+        """Test that dict keys must be strings."""
+        with pytest.raises(TypeError):
+            binary_codec.encode_message(1, "result", {1: "one"})
+
+    def test_rejects_truncated_input(self):
+        """Test that a truncated message raises ValueError."""
+        encoded = binary_codec.encode_message(1, "result", {"message": "hello"})
+        with pytest.raises(ValueError):
+            binary_codec.decode_message(encoded[:-2])
+
+    def test_rejects_trailing_bytes(self):
+        """Test that extra bytes after the message raise ValueError."""
+        encoded = binary_codec.encode_message(1, "result", {})
+        with pytest.raises(ValueError, match="trailing"):
+            binary_codec.decode_message(encoded + b"\x00")
+
+    def test_rejects_unknown_tags(self):
+        """Test that an unknown value tag raises ValueError."""
+        with pytest.raises(ValueError, match="unknown value tag"):
+            binary_codec.decode_message(b"\x01\x04\x63")
+
+
+class TestBinaryFrames:
+    """Test binary frames through send_message/receive_message."""
+
+    def test_binary_frame_round_trip(self):
+        """Test that a binary-encoded message is received transparently."""
+        sender, receiver = socket.socketpair()
+        data = {"results": [{"code": 0, "message": "out\n"}, {"code": 1, "message": ""}]}
+        try:
+            send_message(sender, MSG_RESULTS, data, codec=CODEC_BINARY)
+            assert receive_message(receiver) == (MSG_RESULTS, data)
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_codecs_can_be_mixed_on_one_connection(self):
+        """Test that each frame carries its own encoding."""
+        sender, receiver = socket.socketpair()
+        try:
+            send_message(sender, MSG_RESULT, {"code": 0}, codec=CODEC_JSON)
+            send_message(sender, MSG_RESULT, {"code": 1}, codec=CODEC_BINARY)
+            send_message(sender, MSG_RESULT, {"code": 2}, codec=CODEC_JSON)
+
+            codes = [receive_message(receiver)[1]["code"] for _ in range(3)]
+            assert codes == [0, 1, 2]
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_binary_frame_starts_with_flags_byte(self):
+        """Test that binary frames are marked so they are never parsed as JSON."""
+        sender, receiver = socket.socketpair()
+        try:
+            send_message(sender, MSG_RESULT, {"code": 0}, codec=CODEC_BINARY)
+            length = struct.unpack("!I", receiver.recv(4))[0]
+            body = receiver.recv(length)
+            assert body[0] == 0x81
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_corrupt_binary_frame_raises_protocol_error(self):
+        """Test that a damaged binary body is reported as a protocol error."""
+        sender, receiver = socket.socketpair()
+        try:
+            body = b"\x81\x01\x04\x08\x05"  # Dict claiming 5 entries, no data
+            sender.sendall(struct.pack("!I", len(body)) + body)
+            with pytest.raises(ProtocolError, match="Invalid message format"):
+                receive_message(receiver)
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_unknown_codec_is_rejected(self):
+        """Test that send_message refuses codecs it does not know."""
+        sender, receiver = socket.socketpair()
+        try:
+            with pytest.raises(ValueError):
+                send_message(sender, MSG_RESULT, {}, codec="msgpack")
+        finally:
+            sender.close()
+            receiver.close()
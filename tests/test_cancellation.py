@@ -0,0 +1,99 @@
+"""Tests for cancelling the steps a player is running."""
+
+import os
+import signal
+import threading
+import time
+
+from conductor import retval
+from conductor.accounting import AccountedPopen
+from conductor.cancellation import Cancellation
+from conductor.step import Step
+
+
+def wait_until(predicate, timeout=5.0):
+    """Poll predicate until it is true or timeout seconds have passed."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestCancellation:
+    """Test stopping the process groups of running steps."""
+
+    def test_cancel_stops_a_step_and_its_children(self, tmp_path):
+        """Test that a cancelled step returns at once with its group gone."""
+        pidfile = tmp_path / "child.pid"
+        cancel = Cancellation(kill_grace=0.5)
+        step = Step(f"sleep 30 & echo $! > {pidfile}; wait", timeout=30)
+        results = []
+        worker = threading.Thread(
+            target=lambda: results.append(step.run(cancel=cancel))
+        )
+        worker.start()
+        assert wait_until(lambda: pidfile.exists() and pidfile.read_text().strip())
+        child = int(pidfile.read_text())
+
+        started = time.monotonic()
+        assert cancel.cancel() == 1
+        worker.join(5)
+
+        assert time.monotonic() - started < 5
+        (result,) = results
+        assert result.code == retval.RETVAL_ERROR
+        assert result.message == "Command cancelled"
+        assert result.usage["wall"] < 30
+        # The grandchild went with the group rather than being orphaned
+        assert wait_until(lambda: not _alive(child))
+
+    def test_stubborn_step_is_killed_after_grace(self):
+        """Test that a command ignoring SIGTERM gets SIGKILL."""
+        cancel = Cancellation(kill_grace=0.2)
+        proc = AccountedPopen(
+            "trap '' TERM; sleep 30 & wait; sleep 30",
+            shell=True,
+            start_new_session=True,
+        )
+        cancel.started(proc)
+        time.sleep(0.2)
+
+        cancel.cancel()
+        cancel.wait()
+
+        assert proc.wait(5) == -signal.SIGKILL
+
+    def test_command_started_after_cancel_is_killed(self):
+        """Test that a step racing the cancellation does not keep running."""
+        cancel = Cancellation()
+        assert cancel.cancel() == 0
+        assert cancel.cancelled
+
+        proc = AccountedPopen("sleep 30", shell=True, start_new_session=True)
+        cancel.started(proc)
+
+        assert proc.wait(5) == -signal.SIGKILL
+
+    def test_finished_step_keeps_its_result(self):
+        """Test that a step that succeeded before the cancel is not changed."""
+        cancel = Cancellation()
+        result = Step("echo hello").run(cancel=cancel)
+        cancel.cancel()
+
+        assert result.code == retval.RETVAL_OK
+        assert result.message == "hello\n"
+
+
+def _alive(pid):
+    """Return whether a process exists and is not a zombie."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().split(")")[-1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
@@ -1,14 +1,19 @@
 """Tests for the Client class."""
 
 import pytest
-from unittest.mock import MagicMock, patch, call
+from unittest.mock import ANY, MagicMock, patch, call
 import configparser
+import io
+import json
 import socket
 import struct
+import threading
+import time
 
 from conductor.client import Client
 from conductor.phase import Phase
 from conductor.retval import RetVal, RETVAL_DONE
+from conductor.json_protocol import ConnectionClosed, HeartbeatTimeout, ProtocolError
 
 
 class TestClientInitialization:
@@ -115,6 +120,39 @@ class TestClientInitialization:
         assert len(client.reset_phase.steps) == 1
         assert client.reset_phase.steps[0].args == ["rm", "-rf", "/tmp/test"]
 
+    def test_parallel_keys_form_step_groups(self):
+        """Test that consecutive parallel keys share one group."""
+        config = self.create_test_config()
+        config["Coordinator"]["max_parallel"] = "2"
+        config["Run"] = {
+            "step1": "echo before",
+            "parallel1": "ab -n 100 http://a/",
+            "parallel2": "timeout5:ab -n 100 http://b/",
+            "step2": "echo between",
+            "parallel3": "ab -n 100 http://c/",
+        }
+
+        client = Client(config)
+
+        groups = [s.group for s in client.run_phase.steps]
+        assert groups == [None, 1, 1, None, 4]
+        assert client.run_phase.steps[2].timeout == 5
+        assert client.run_phase.max_parallel == 2
+        data = client._phase_data(client.run_phase)
+        assert data["max_parallel"] == 2
+        assert [step.get("group") for step in data["steps"]] == groups
+        # Sequential phases keep the fields older players know
+        assert "max_parallel" in client._phase_data(client.reset_phase)
+        assert "group" not in client._phase_data(client.reset_phase)["steps"][0]
+
+    def test_invalid_max_parallel(self):
+        """Test that max_parallel must be a positive integer."""
+        config = self.create_test_config()
+        config["Coordinator"]["max_parallel"] = "0"
+
+        with pytest.raises(ValueError, match="Invalid max_parallel"):
+            Client(config)
+
 
 class TestClientCommunication:
     """Test Client socket communication methods."""
@@ -159,8 +197,13 @@ class TestClientCommunication:
         # Verify data was sent
         mock_socket.sendall.assert_called_once()
 
-        # Verify socket was closed
+        # The control session stays open for the next message
+        mock_socket.close.assert_not_called()
+        assert client.cmd is mock_socket
+
+        client.close()
         mock_socket.close.assert_called_once()
+        assert client.cmd is None
 
     @patch("socket.create_connection")
     @patch("builtins.print")
@@ -184,21 +227,14 @@ class TestClientCommunication:
         assert "Connection refused" in args[0]
 
     @patch("socket.create_connection")
-    @patch("socket.socket")
-    def test_doit_sends_run_command_and_sets_up_results_socket(
-        self, mock_socket_class, mock_create_connection
-    ):
-        """Test that doit sends Run command and sets up results socket."""
+    def test_doit_sends_run_command_over_session(self, mock_create_connection):
+        """Test that doit sends Run command without opening a results listener."""
         client = self.create_test_client()
 
         # Mock command socket
         mock_cmd_socket = MagicMock()
         mock_create_connection.return_value = mock_cmd_socket
 
-        # Mock results socket
-        mock_results_socket = MagicMock()
-        mock_socket_class.return_value = mock_results_socket
-
         # Call doit
         with patch("builtins.print"):  # Suppress Run() print
             client.doit()
@@ -207,21 +243,10 @@ class TestClientCommunication:
         mock_create_connection.assert_called_once_with(("localhost", 6970))
         mock_cmd_socket.settimeout.assert_called_once_with(1.0)
         mock_cmd_socket.sendall.assert_called_once()
-        mock_cmd_socket.close.assert_called_once()
-
-        # Verify results socket setup
-        mock_socket_class.assert_called_once_with(socket.AF_INET, socket.SOCK_STREAM, 0)
-        mock_results_socket.setsockopt.assert_any_call(
-            socket.SOL_SOCKET, socket.SO_REUSEADDR, 1
-        )
-        mock_results_socket.setsockopt.assert_any_call(
-            socket.SOL_SOCKET, socket.SO_REUSEPORT, 1
-        )
-        mock_results_socket.bind.assert_called_once_with(("0.0.0.0", 6971))
-        mock_results_socket.listen.assert_called_once_with(5)
+        mock_cmd_socket.close.assert_not_called()
 
-        # Verify socket is stored
-        assert client.ressock is mock_results_socket
+        # Results come back over the same session
+        assert not hasattr(client, "ressock")
 
     @patch("socket.create_connection")
     @patch("builtins.print")
@@ -239,27 +264,84 @@ class TestClientCommunication:
         assert "Failed to connect to localhost:6970" in args[0]
         assert "Connection refused" in args[0]
 
+    @patch("select.select")
+    @patch("socket.create_connection")
     @patch("conductor.client.receive_message")
-    def test_results_receives_messages_until_done(self, mock_receive_message):
-        """Test that results receives messages until RETVAL_DONE."""
+    def test_session_is_reused_across_messages(
+        self, mock_receive_message, mock_create_connection, mock_select
+    ):
+        """Test that several messages share one control connection."""
         client = self.create_test_client()
+        mock_socket = MagicMock()
+        mock_create_connection.return_value = mock_socket
+        mock_select.return_value = ([], [], [])
+        mock_receive_message.return_value = ("result", {"code": 0, "message": "ok"})
+
+        with patch("builtins.print"):
+            client.download(Phase("localhost", 6971))
+            client.download(Phase("localhost", 6971))
+            client.doit()
+
+        mock_create_connection.assert_called_once_with(("localhost", 6970))
+        assert mock_socket.sendall.call_count == 3
+
+    @patch("select.select")
+    @patch("socket.create_connection")
+    @patch("conductor.client.receive_message")
+    def test_session_reconnects_after_player_hangs_up(
+        self, mock_receive_message, mock_create_connection, mock_select
+    ):
+        """Test that a session closed by the player is reopened."""
+        client = self.create_test_client()
+        stale_socket = MagicMock()
+        fresh_socket = MagicMock()
+        mock_create_connection.side_effect = [stale_socket, fresh_socket]
+        mock_receive_message.return_value = ("result", {"code": 0, "message": "ok"})
+
+        with patch("builtins.print"):
+            client.download(Phase("localhost", 6971))
 
-        # Create mock results socket
-        mock_ressock = MagicMock()
-        client.ressock = mock_ressock
+            # The idle session becomes readable with EOF: the player is gone
+            mock_select.return_value = ([stale_socket], [], [])
+            stale_socket.recv.return_value = b""
+            client.download(Phase("localhost", 6971))
 
-        # Create mock connections with different messages
-        mock_conn1 = MagicMock()
-        mock_conn2 = MagicMock()
-        mock_conn3 = MagicMock()
+        assert mock_create_connection.call_count == 2
+        stale_socket.close.assert_called_once()
+        fresh_socket.sendall.assert_called_once()
+        assert client.cmd is fresh_socket
 
-        # Set up accept to return connections in sequence
-        mock_ressock.accept.side_effect = [
-            (mock_conn1, ("127.0.0.1", 12345)),
-            (mock_conn2, ("127.0.0.1", 12346)),
-            (mock_conn3, ("127.0.0.1", 12347)),
+    @patch("socket.create_connection")
+    @patch("conductor.client.receive_message")
+    def test_request_is_retried_once_on_failure(
+        self, mock_receive_message, mock_create_connection
+    ):
+        """Test that a request failing mid-flight is retried on a new session."""
+        client = self.create_test_client()
+        first_socket = MagicMock()
+        second_socket = MagicMock()
+        mock_create_connection.side_effect = [first_socket, second_socket]
+        mock_receive_message.side_effect = [
+            ConnectionResetError("reset by peer"),
+            ("result", {"code": 0, "message": "phase received"}),
         ]
 
+        with patch("builtins.print") as mock_print:
+            client.download(Phase("localhost", 6971))
+            mock_print.assert_called_once_with(0, "phase received")
+
+        first_socket.close.assert_called_once()
+        assert client.cmd is second_socket
+
+    @patch("conductor.client.receive_message")
+    def test_results_receives_messages_until_done(self, mock_receive_message):
+        """Test that results reads the session until RETVAL_DONE."""
+        client = self.create_test_client()
+
+        # Results arrive over the open control session
+        mock_cmd = MagicMock()
+        client.cmd = mock_cmd
+
         # Mock receive_message to return different messages
         mock_receive_message.side_effect = [
             ("result", {"code": 0, "message": "Step 1 complete"}),
@@ -271,16 +353,12 @@ class TestClientCommunication:
         with patch("builtins.print") as mock_print:
             client.results()
 
-        # Verify correct number of accepts
-        assert mock_ressock.accept.call_count == 3
-
-        # Verify all connections were closed
-        mock_conn1.close.assert_called_once()
-        mock_conn2.close.assert_called_once()
-        mock_conn3.close.assert_called_once()
-
-        # Verify results socket was closed
-        mock_ressock.close.assert_called_once()
+        # Every message was read from the session, which stays open
+        assert mock_receive_message.call_count == 3
+        for args, _ in mock_receive_message.call_args_list:
+            assert args[0] is mock_cmd
+        mock_cmd.close.assert_not_called()
+        mock_cmd.settimeout.assert_has_calls([call(None), call(1.0)])
 
         # Verify prints
         expected_prints = [
@@ -290,6 +368,242 @@ class TestClientCommunication:
         ]
         mock_print.assert_has_calls(expected_prints)
 
+    @patch("conductor.client.receive_message")
+    def test_results_drops_session_when_player_disconnects(
+        self, mock_receive_message
+    ):
+        """Test that results closes a session the player dropped mid-phase."""
+        client = self.create_test_client()
+        mock_cmd = MagicMock()
+        client.cmd = mock_cmd
+
+        mock_receive_message.side_effect = [
+            ("result", {"code": 0, "message": "Step 1 complete"}),
+            ConnectionClosed("Connection closed"),
+        ]
+
+        with patch("builtins.print"):
+            with pytest.raises(ConnectionClosed):
+                client.results()
+
+        mock_cmd.close.assert_called_once()
+        assert client.cmd is None
+
+    @patch("conductor.client.receive_message")
+    def test_results_consumes_batched_frames(self, mock_receive_message):
+        """Test that batched result frames are passed to the reporter whole."""
+        client = self.create_test_client()
+        client.cmd = MagicMock()
+        reporter = MagicMock()
+
+        first = [{"code": 0, "message": "Step 1"}, {"code": 0, "message": "Step 2"}]
+        last = [{"code": 1, "message": "Step 3"}, {"code": RETVAL_DONE, "message": "x"}]
+        mock_receive_message.side_effect = [
+            ("results", {"results": first}),
+            ("results", {"results": last}),
+        ]
+
+        client.results(reporter)
+
+        assert mock_receive_message.call_count == 2
+        reporter.add_results.assert_has_calls([call(first), call(last)])
+        reporter.add_result.assert_not_called()
+
+    @patch("socket.create_connection")
+    def test_doit_requests_batched_results(self, mock_create_connection):
+        """Test that RUN asks the player for size-bounded result batches."""
+        client = self.create_test_client()
+        mock_socket = MagicMock()
+        mock_create_connection.return_value = mock_socket
+
+        client.doit()
+
+        frame = mock_socket.sendall.call_args[0][0]
+        message = json.loads(frame[4:].decode("utf-8"))
+        assert message["type"] == "run"
+        assert message["data"]["max_batch_bytes"] == client.max_message_size // 2
+
+    @patch("socket.create_connection")
+    @patch("conductor.client.receive_message")
+    def test_binary_codec_is_negotiated_on_connect(
+        self, mock_receive_message, mock_create_connection
+    ):
+        """Test that a preferred binary codec is agreed through MSG_HELLO."""
+        config = self.create_test_client().config
+        client = Client(config, codec="binary")
+        mock_socket = MagicMock()
+        mock_create_connection.return_value = mock_socket
+        mock_receive_message.side_effect = [
+            ("hello", {"codec": "binary"}),
+            ("result", {"code": 0, "message": "phase received"}),
+        ]
+
+        with patch("builtins.print"):
+            client.download(Phase("localhost", 6971))
+
+        hello, phase_frame = [c[0][0] for c in mock_socket.sendall.call_args_list]
+        message = json.loads(hello[4:].decode("utf-8"))
+        assert message["type"] == "hello"
+        assert message["data"]["codecs"] == ["binary", "json"]
+        # The phase itself goes out binary encoded
+        assert phase_frame[4] == 0x81
+        assert client.wire == {"codec": "binary"}
+
+    @patch("socket.create_connection")
+    @patch("conductor.client.receive_message")
+    def test_old_player_falls_back_to_json(
+        self, mock_receive_message, mock_create_connection
+    ):
+        """Test that a player without MSG_HELLO support is spoken to in JSON."""
+        config = self.create_test_client().config
+        client = Client(config, codec="binary")
+        mock_socket = MagicMock()
+        mock_create_connection.return_value = mock_socket
+        mock_receive_message.side_effect = [
+            ("result", {"code": 2, "message": "no such command"}),
+            ("result", {"code": 0, "message": "phase received"}),
+        ]
+
+        with patch("builtins.print"):
+            client.download(Phase("localhost", 6971))
+
+        phase_frame = mock_socket.sendall.call_args_list[1][0][0]
+        assert json.loads(phase_frame[4:].decode("utf-8"))["type"] == "phase"
+        assert client.wire == {}
+
+    @patch("socket.create_connection")
+    @patch("conductor.client.receive_message")
+    def test_compression_is_negotiated_on_connect(
+        self, mock_receive_message, mock_create_connection
+    ):
+        """Test that compression is offered and adopted through MSG_HELLO."""
+        config = self.create_test_client().config
+        client = Client(config, compression="zlib", compress_threshold=100)
+        mock_socket = MagicMock()
+        mock_create_connection.return_value = mock_socket
+        mock_receive_message.return_value = (
+            "hello",
+            {"codec": "json", "compression": "zlib"},
+        )
+
+        client.connect()
+
+        hello = mock_socket.sendall.call_args[0][0]
+        message = json.loads(hello[4:].decode("utf-8"))
+        assert message["data"]["compression"][0] == "zlib"
+        assert client.wire == {
+            "codec": "json",
+            "compression": "zlib",
+            "compress_threshold": 100,
+        }
+
+    @patch("socket.create_connection")
+    @patch("conductor.client.receive_message")
+    def test_compression_declined_by_player(
+        self, mock_receive_message, mock_create_connection
+    ):
+        """Test that frames stay uncompressed if the player declines."""
+        config = self.create_test_client().config
+        client = Client(config, codec="binary", compression="zlib")
+        mock_create_connection.return_value = MagicMock()
+        mock_receive_message.return_value = (
+            "hello",
+            {"codec": "binary", "compression": "none"},
+        )
+
+        client.connect()
+
+        assert client.wire == {"codec": "binary"}
+
+    @patch("socket.create_connection")
+    @patch("conductor.client.receive_message")
+    def test_frame_size_is_negotiated_on_connect(
+        self, mock_receive_message, mock_create_connection
+    ):
+        """Test that both sides fragment to the smaller frame limit."""
+        config = self.create_test_client().config
+        client = Client(config, codec="binary", max_message_size=2)
+        mock_socket = MagicMock()
+        mock_create_connection.return_value = mock_socket
+        mock_receive_message.return_value = (
+            "hello",
+            {"codec": "binary", "max_frame_size": 10 * 1024 * 1024},
+        )
+
+        client.connect()
+
+        hello = json.loads(mock_socket.sendall.call_args[0][0][4:].decode("utf-8"))
+        assert hello["data"]["max_frame_size"] == 2 * 1024 * 1024
+        assert client.wire["fragment_size"] == 2 * 1024 * 1024
+
+    @patch("socket.create_connection")
+    @patch("conductor.client.receive_message")
+    def test_batching_only_when_agreed(
+        self, mock_receive_message, mock_create_connection
+    ):
+        """Test that batched results are not requested if the player declined."""
+        config = self.create_test_client().config
+        client = Client(config, codec="binary")
+        mock_socket = MagicMock()
+        mock_create_connection.return_value = mock_socket
+        mock_receive_message.return_value = (
+            "hello",
+            {"version": 1, "codec": "json", "batching": False, "streaming": False},
+        )
+
+        client.doit()
+
+        frame = mock_socket.sendall.call_args[0][0]
+        message = json.loads(frame[4:].decode("utf-8"))
+        assert message["type"] == "run"
+        assert "max_batch_bytes" not in message["data"]
+        assert client.features["streaming"] is False
+
+    @patch("socket.create_connection")
+    @patch("conductor.client.receive_message")
+    def test_refused_handshake_raises(self, mock_receive_message, mock_create_connection):
+        """Test that a player refusing the offer fails the connection."""
+        config = self.create_test_client().config
+        client = Client(config, codec="binary")
+        mock_create_connection.return_value = MagicMock()
+        mock_receive_message.return_value = (
+            "result",
+            {"code": 1, "message": "No common protocol version"},
+        )
+
+        with pytest.raises(ProtocolError, match="No common protocol version"):
+            client.connect()
+        assert client.cmd is None
+
+    def test_unknown_compression_is_rejected(self):
+        """Test that Client refuses compressors it does not know."""
+        config = self.create_test_client().config
+        with pytest.raises(ValueError):
+            Client(config, compression="brotli")
+
+    def test_json_client_skips_handshake(self):
+        """Test that the default JSON client sends no MSG_HELLO."""
+        client = self.create_test_client()
+        assert client.codec == "json"
+        with patch("socket.create_connection") as mock_create_connection:
+            mock_socket = MagicMock()
+            mock_create_connection.return_value = mock_socket
+            client.connect()
+        mock_socket.sendall.assert_not_called()
+
+    def test_unknown_codec_is_rejected(self):
+        """Test that Client refuses codecs it cannot speak."""
+        config = self.create_test_client().config
+        with pytest.raises(ValueError):
+            Client(config, codec="msgpack")
+
+    def test_results_without_session_raises(self):
+        """Test that results fails cleanly when no session was opened."""
+        client = self.create_test_client()
+
+        with pytest.raises(ProtocolError):
+            client.results()
+
 
 class TestClientPhaseMethods:
     """Test Client phase execution methods."""
@@ -316,7 +630,9 @@ class TestClientPhaseMethods:
 
         client.startup()
 
-        client.download.assert_called_once_with(client.startup_phase)
+        client.download.assert_called_once_with(
+            client.startup_phase, name="startup", trial=None
+        )
 
     def test_run_calls_download_with_run_phase(self):
         """Test that run() calls download with run_phase."""
@@ -325,7 +641,9 @@ class TestClientPhaseMethods:
 
         client.run()
 
-        client.download.assert_called_once_with(client.run_phase)
+        client.download.assert_called_once_with(
+            client.run_phase, name="run", trial=None
+        )
 
     def test_collect_calls_download_with_collect_phase(self):
         """Test that collect() calls download with collect_phase."""
@@ -334,7 +652,9 @@ class TestClientPhaseMethods:
 
         client.collect()
 
-        client.download.assert_called_once_with(client.collect_phase)
+        client.download.assert_called_once_with(
+            client.collect_phase, name="collect", trial=None
+        )
 
     def test_reset_calls_download_with_reset_phase(self):
         """Test that reset() calls download with reset_phase."""
@@ -343,5 +663,776 @@ class TestClientPhaseMethods:
 
         client.reset()
 
-        client.download.assert_called_once_with(client.reset_phase)
+        client.download.assert_called_once_with(
+            client.reset_phase, name="reset", trial=None
+        )
+
+
+    @patch("socket.create_connection")
+    @patch("conductor.client.receive_message")
+    def test_planned_phase_is_triggered_by_name(
+        self, mock_receive_message, mock_create_connection
+    ):
+        """Test that a player holding the plan only gets a trigger."""
+        config = self.create_test_client().config
+        client = Client(config, codec="binary")
+        mock_socket = MagicMock()
+        mock_create_connection.return_value = mock_socket
+        mock_receive_message.side_effect = [
+            ("hello", {"version": 1, "codec": "json", "plans": True}),
+            ("result", {"code": 0, "message": "plan received"}),
+            ("result", {"code": 0, "message": "phase received"}),
+        ]
+
+        with patch("builtins.print"):
+            client.run(trial=3)
+
+        plan, trigger = [
+            json.loads(c[0][0][4:].decode("utf-8"))
+            for c in mock_socket.sendall.call_args_list[1:]
+        ]
+        assert plan["type"] == "plan"
+        assert list(plan["data"]["phases"]) == ["startup", "run", "collect", "reset"]
+        assert plan["data"]["phases"]["run"]["steps"][0]["command"] == "echo run"
+        assert trigger == {
+            "version": 1,
+            "type": "trigger",
+            "data": {"phase": "run", "trial": 3},
+        }
+
+
+class TestPlannedTrials:
+    """Test uploading a plan to a real Player and running it twice."""
+
+    def test_plan_is_sent_once_and_rerun(self, capsys):
+        """Test that trials after the first reuse the player's phases."""
+        from conductor.scripts.player import Player
+
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {
+            "conductor": "localhost",
+            "player": "localhost",
+            "cmdport": "6970",
+            "resultsport": "6971",
+        }
+        config["Startup"] = {}
+        config["Run"] = {"step1": "echo planned"}
+        config["Collect"] = {}
+        config["Reset"] = {}
+        client = Client(config, compression="zlib")
+
+        player = Player("127.0.0.1", 0)
+        ours, theirs = socket.socketpair()
+        server = threading.Thread(target=player.serve, args=(theirs,))
+        server.start()
+        try:
+            with patch("socket.create_connection", return_value=ours), patch.object(
+                Player, "build_phase", wraps=player.build_phase
+            ) as build_phase:
+                for trial in (1, 2):
+                    client.run(trial)
+                    client.doit()
+                    client.results()
+            # All four phases were built once, from the plan
+            assert build_phase.call_count == 4
+        finally:
+            client.close()
+            player.shutdown()
+            server.join()
+            theirs.close()
+
+        out = capsys.readouterr().out
+        assert out.count("0 phase received") == 2
+        assert out.count("0 planned") == 2
+
+
+class TestHeartbeats:
+    """Test detecting silent players through heartbeats."""
+
+    def create_test_client(self, run_step="echo test", **kwargs):
+        """Create a test client with one Run step."""
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {
+            "conductor": "localhost",
+            "player": "localhost",
+            "cmdport": "6970",
+            "resultsport": "6971",
+        }
+        config["Startup"] = {}
+        config["Run"] = {"step1": run_step}
+        config["Collect"] = {}
+        config["Reset"] = {}
+        return Client(config, **kwargs)
+
+    def test_heartbeats_are_offered(self):
+        """Test that a heartbeat interval alone makes the client say hello."""
+        client = self.create_test_client(heartbeat_interval=0.5)
+        with patch("socket.create_connection") as mock_create_connection, patch(
+            "conductor.client.receive_message",
+            return_value=("hello", {"version": 1, "heartbeat_interval": 0.5}),
+        ):
+            mock_socket = MagicMock()
+            mock_create_connection.return_value = mock_socket
+            client.connect()
+
+        hello = json.loads(mock_socket.sendall.call_args[0][0][4:].decode("utf-8"))
+        assert hello["data"]["heartbeat_interval"] == 0.5
+        assert client.features["heartbeat_interval"] == 0.5
+
+    def test_silent_player_times_out(self):
+        """Test that results() gives up after the agreed heartbeats are missed."""
+        client = self.create_test_client(heartbeat_misses=2)
+        ours, theirs = socket.socketpair()
+        client.cmd = ours
+        client.features = {"heartbeat_interval": 0.05}
+        try:
+            with pytest.raises(HeartbeatTimeout, match="No heartbeat"):
+                client.results()
+            assert client.cmd is None
+        finally:
+            theirs.close()
+
+    def test_slow_phase_is_kept_alive(self, capsys):
+        """Test that a phase longer than the deadline survives on heartbeats."""
+        from conductor.scripts.player import Player
+
+        client = self.create_test_client(
+            run_step="sleep 0.5; echo slow",
+            heartbeat_interval=0.05,
+            heartbeat_misses=3,
+        )
+        player = Player("127.0.0.1", 0)
+        ours, theirs = socket.socketpair()
+        server = threading.Thread(target=player.serve, args=(theirs,))
+        server.start()
+        try:
+            with patch("socket.create_connection", return_value=ours):
+                client.run(1)
+                client.doit()
+                client.results()
+        finally:
+            client.close()
+            player.shutdown()
+            server.join()
+            theirs.close()
+
+        assert "0 slow" in capsys.readouterr().out
+
+
+class TestAsyncEngine:
+    """Test a Player that runs its steps with the asyncio engine."""
+
+    def test_phase_runs_on_asyncio_engine(self, capsys):
+        """Test that results from asyncio subprocesses reach the conductor."""
+        from conductor.scripts.player import Player
+
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {
+            "conductor": "localhost",
+            "player": "localhost",
+            "cmdport": "6970",
+            "resultsport": "6971",
+        }
+        config["Startup"] = {}
+        config["Run"] = {"parallel1": "echo first", "parallel2": "echo second"}
+        config["Collect"] = {}
+        config["Reset"] = {}
+        client = Client(config)
+
+        player = Player("127.0.0.1", 0, engine="asyncio")
+        ours, theirs = socket.socketpair()
+        server = threading.Thread(target=player.serve, args=(theirs,))
+        server.start()
+        try:
+            with patch("socket.create_connection", return_value=ours):
+                client.run(1)
+                client.doit()
+                client.results()
+        finally:
+            client.close()
+            player.shutdown()
+            server.join()
+            theirs.close()
+
+        out = capsys.readouterr().out
+        assert out.index("0 first") < out.index("0 second")
+
+
+class TestOutputStreaming:
+    """Test step output streamed from a real Player while the step runs."""
+
+    def test_lines_arrive_before_the_step_ends(self):
+        """Test that output is reported as produced, ahead of the result."""
+        from conductor.scripts.player import Player
+
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {
+            "conductor": "localhost",
+            "player": "localhost",
+            "cmdport": "6970",
+            "resultsport": "6971",
+        }
+        config["Startup"] = {}
+        config["Run"] = {"step1": "echo early; sleep 0.5; echo late"}
+        config["Collect"] = {}
+        config["Reset"] = {}
+        client = Client(config, stream_output=True)
+
+        events = []
+        reporter = MagicMock()
+        reporter.add_output.side_effect = lambda step, stream, stamp, line: (
+            events.append((time.monotonic(), line))
+        )
+        reporter.add_results.side_effect = lambda results: events.append(
+            (time.monotonic(), results)
+        )
+
+        player = Player("127.0.0.1", 0)
+        ours, theirs = socket.socketpair()
+        server = threading.Thread(target=player.serve, args=(theirs,))
+        server.start()
+        try:
+            with patch("socket.create_connection", return_value=ours):
+                client.run(1)
+                client.doit()
+                client.results(reporter)
+        finally:
+            client.close()
+            player.shutdown()
+            server.join()
+            theirs.close()
+
+        assert client.features["stream_output"] is True
+        assert [event for _, event in events[:2]] == ["early\n", "late\n"]
+        assert events[1][0] - events[0][0] >= 0.4
+        assert events[2][1][0]["code"] == 0
+        assert events[2][1][0]["message"] == ""
+        assert events[2][1][0]["usage"]["stdout_bytes"] == len("early\nlate\n")
+        reporter.add_output.assert_any_call(0, "stdout", ANY, "early\n")
+
+
+class TestSpooledOutput:
+    """Test fetching spooled output from a real Player."""
+
+    def test_excerpt_is_returned_and_rest_fetched(self, tmp_path):
+        """Test that a long output is summarised and can be read back."""
+        from conductor.scripts.player import Player
+
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {
+            "conductor": "localhost",
+            "player": "localhost",
+            "cmdport": "6970",
+            "resultsport": "6971",
+        }
+        config["Startup"] = {}
+        config["Run"] = {"step1": "seq 1 20000"}
+        config["Collect"] = {}
+        config["Reset"] = {}
+        client = Client(config)
+        reporter = MagicMock()
+
+        player = Player(
+            "127.0.0.1", 0, spool_dir=str(tmp_path / "spool"), excerpt_bytes=64
+        )
+        ours, theirs = socket.socketpair()
+        server = threading.Thread(target=player.serve, args=(theirs,))
+        server.start()
+        try:
+            with patch("socket.create_connection", return_value=ours):
+                client.run(1)
+                client.doit()
+                client.results(reporter)
+                result = reporter.add_results.call_args_list[0][0][0][0]
+                summary = result["output"]
+                everything = io.BytesIO()
+                copied = client.fetch_output(summary["spool"], everything)
+                middle = io.BytesIO()
+                client.fetch_output(summary["spool"], middle, offset=6, length=4)
+                with pytest.raises(ProtocolError, match="no such spool"):
+                    client.fetch_output("1-999999", io.BytesIO())
+        finally:
+            client.close()
+            player.shutdown()
+            server.join()
+            theirs.close()
+
+        expected = "".join(f"{i}\n" for i in range(1, 20001)).encode()
+        assert result["code"] == 0
+        assert "bytes omitted" in result["message"]
+        assert len(result["message"]) < 200
+        assert copied == summary["size"] == len(expected)
+        assert everything.getvalue() == expected
+        assert middle.getvalue() == expected[6:10]
+        # Spool files go when the player shuts down
+        assert list((tmp_path / "spool").iterdir()) == []
+
+
+class TestSpawnedSteps:
+    """Test the lifecycle of spawned steps on a real Player."""
+
+    def test_reset_terminates_and_reports_spawned(self):
+        """Test that reset stops what run spawned and reports how it ended."""
+        from conductor.scripts.player import Player
 
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {
+            "conductor": "localhost",
+            "player": "localhost",
+            "cmdport": "6970",
+            "resultsport": "6971",
+        }
+        config["Startup"] = {}
+        config["Run"] = {"step1": "spawn:sleep 30", "step2": "echo ran"}
+        config["Collect"] = {}
+        config["Reset"] = {"step1": "true"}
+        client = Client(config)
+        run_reporter = MagicMock()
+        reset_reporter = MagicMock()
+
+        player = Player("127.0.0.1", 0)
+        player.kill_grace = 0.5
+        ours, theirs = socket.socketpair()
+        server = threading.Thread(target=player.serve, args=(theirs,))
+        server.start()
+        try:
+            with patch("socket.create_connection", return_value=ours):
+                client.run(1)
+                client.doit()
+                client.results(run_reporter)
+                (session,) = player.sessions
+                running = session.spawned.running()
+                client.reset(1)
+                client.doit()
+                client.results(reset_reporter)
+        finally:
+            client.close()
+            player.shutdown()
+            server.join()
+            theirs.close()
+
+        assert [entry.command for entry in running] == ["sleep 30"]
+        run_results = run_reporter.add_results.call_args[0][0]
+        assert [r["message"] for r in run_results[:2]] == ["Spawned", "ran\n"]
+        reset_results = reset_reporter.add_results.call_args[0][0]
+        assert (reset_results[0]["code"], reset_results[0]["message"]) == (0, "")
+        ended = reset_results[1]
+        assert ended["code"] == -15
+        assert ended["spawned"]["command"] == "sleep 30"
+        assert ended["spawned"]["phase"] == "run"
+        assert ended["spawned"]["terminated"] is True
+        assert ended["usage"]["wall"] >= 0
+        assert running[0].returncode == -15
+
+
+class TestUnixSockets:
+    """Test co-located players reached through Unix domain sockets."""
+
+    def create_config(self, path):
+        """Create a config for a player on a Unix domain socket."""
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {"conductor": "localhost", "player": f"unix:{path}"}
+        config["Startup"] = {}
+        config["Run"] = {"step1": "echo over unix"}
+        config["Collect"] = {}
+        config["Reset"] = {}
+        return config
+
+    def test_unix_endpoint_needs_no_ports(self, tmp_path):
+        """Test that cmdport and resultsport are optional for unix: players."""
+        client = Client(self.create_config(tmp_path / "player.sock"))
+
+        assert client.socket_path == str(tmp_path / "player.sock")
+        assert client.cmdport is None
+        assert client.endpoint == f"unix:{tmp_path / 'player.sock'}"
+
+    def test_phase_over_unix_socket(self, tmp_path, capsys):
+        """Test a full phase against a Player listening on a Unix socket."""
+        from conductor.scripts.player import Player
+
+        path = tmp_path / "player.sock"
+        player = Player(f"unix:{path}", None)
+        server = threading.Thread(target=player.run)
+        server.start()
+        client = Client(self.create_config(path), compression="zlib")
+        try:
+            client.run(1)
+            client.doit()
+            client.results()
+        finally:
+            client.close()
+            player.shutdown()
+            server.join()
+
+        assert "0 over unix" in capsys.readouterr().out
+        assert not path.exists()
+
+    @patch("builtins.print")
+    def test_missing_unix_socket(self, mock_print, tmp_path):
+        """Test that a player that is not listening is reported, not raised."""
+        client = Client(self.create_config(tmp_path / "absent.sock"))
+
+        client.download(client.run_phase)
+
+        assert f"Failed to connect to unix:{tmp_path}" in mock_print.call_args[0][0]
+
+
+class TestConcurrentSessions:
+    """Test several conductors sharing one Player."""
+
+    def create_config(self, path, command):
+        """Create a config for a player on a Unix domain socket."""
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {"conductor": "localhost", "player": f"unix:{path}"}
+        config["Startup"] = {}
+        config["Run"] = {"step1": command}
+        config["Collect"] = {}
+        config["Reset"] = {}
+        return config
+
+    def test_sessions_run_phases_concurrently(self, tmp_path):
+        """Test that each conductor's phases run at once and stay its own."""
+        from conductor.scripts.player import Player
+
+        path = tmp_path / "player.sock"
+        player = Player(f"unix:{path}", None)
+        server = threading.Thread(target=player.run)
+        server.start()
+        slow = Client(
+            self.create_config(path, "sleep 0.5; echo slow"), compression="zlib"
+        )
+        fast = Client(self.create_config(path, "echo fast"), compression="zlib")
+        finished = {}
+
+        def trial(name, client):
+            reporter = MagicMock()
+            client.run(1)
+            client.doit()
+            client.results(reporter)
+            finished[name] = (time.monotonic(), reporter.add_results.call_args[0][0])
+
+        threads = [
+            threading.Thread(target=trial, args=("slow", slow)),
+            threading.Thread(target=trial, args=("fast", fast)),
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert len(player.sessions) == 2
+        finally:
+            slow.close()
+            fast.close()
+            player.shutdown()
+            server.join()
+
+        # The fast phase did not wait for the slow one
+        assert finished["fast"][0] < finished["slow"][0]
+        assert finished["slow"][1][0]["message"] == "slow\n"
+        assert finished["fast"][1][0]["message"] == "fast\n"
+
+    def test_sessions_beyond_the_limit_are_refused(self, tmp_path):
+        """Test that a conductor over max_sessions is told the player is busy."""
+        from conductor.scripts.player import Player
+
+        path = tmp_path / "player.sock"
+        player = Player(f"unix:{path}", None, max_sessions=1)
+        server = threading.Thread(target=player.run)
+        server.start()
+        first = Client(self.create_config(path, "echo first"), compression="zlib")
+        second = Client(self.create_config(path, "echo second"), compression="zlib")
+        try:
+            first.connect()
+            with pytest.raises(ProtocolError, match="player busy: 1 sessions open"):
+                second.connect()
+            # A slot opens again once the first conductor hangs up
+            first.close()
+            for _ in range(100):
+                if not player.sessions:
+                    break
+                time.sleep(0.05)
+            second.connect()
+            assert second.features["plans"] is True
+        finally:
+            first.close()
+            second.close()
+            player.shutdown()
+            server.join()
+
+
+class TestControlMessages:
+    """Test control messages answered while phases run."""
+
+    def create_config(self, path, command):
+        """Create a config for a player on a Unix domain socket."""
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {"conductor": "localhost", "player": f"unix:{path}"}
+        config["Startup"] = {}
+        config["Run"] = {"step1": command, "step2": "echo done"}
+        config["Collect"] = {}
+        config["Reset"] = {}
+        return config
+
+    def test_status_and_ping_during_a_phase(self, tmp_path):
+        """Test that another session sees a running phase and gets answers."""
+        from conductor.scripts.player import Player
+
+        path = tmp_path / "player.sock"
+        player = Player(f"unix:{path}", None)
+        server = threading.Thread(target=player.run)
+        server.start()
+        busy = Client(self.create_config(path, "sleep 1"), compression="zlib")
+        control = Client(self.create_config(path, "true"), compression="zlib")
+
+        def trial():
+            busy.run(1)
+            busy.doit()
+            busy.results(MagicMock())
+
+        worker = threading.Thread(target=trial)
+        try:
+            worker.start()
+            for _ in range(100):
+                status = control.status()
+                running = [s for s in status["sessions"] if s["running"]]
+                if running:
+                    break
+                time.sleep(0.02)
+            started = time.monotonic()
+            round_trip = control.ping()
+            answered = time.monotonic() - started
+            worker.join()
+            after = control.status()
+        finally:
+            busy.close()
+            control.close()
+            player.shutdown()
+            server.join()
+
+        assert status["max_sessions"] == 8
+        assert running == [
+            {
+                "peer": None,
+                "running": True,
+                "phase": "run",
+                "steps": 2,
+                "completed": 0,
+                "queued": [],
+                "spawned": 0,
+                "current": False,
+            }
+        ]
+        assert [s["current"] for s in status["sessions"]].count(True) == 1
+        # The ping did not wait for the sleeping step
+        assert round_trip < 0.5 and answered < 0.5
+        assert not any(s["running"] for s in after["sessions"])
+
+    def test_shutdown_is_immediate(self, tmp_path):
+        """Test that a shutdown request stops the player and idle sessions."""
+        from conductor.scripts.player import Player
+
+        path = tmp_path / "player.sock"
+        player = Player(f"unix:{path}", None)
+        server = threading.Thread(target=player.run)
+        server.start()
+        idle = Client(self.create_config(path, "true"), compression="zlib")
+        control = Client(self.create_config(path, "true"), compression="zlib")
+        try:
+            idle.connect()
+            started = time.monotonic()
+            control.shutdown_player()
+            server.join(5)
+            for _ in range(100):
+                if not player.sessions:
+                    break
+                time.sleep(0.01)
+            stopped = time.monotonic() - started
+        finally:
+            idle.close()
+            control.close()
+            player.shutdown()
+            server.join()
+
+        assert control.cmd is None
+        assert not player.sessions
+        assert stopped < 0.5
+        assert not path.exists()
+
+
+class TestCancellation:
+    """Test cancelling the phase a player is running."""
+
+    def create_config(self, path):
+        """Create a config whose Run phase would sleep for a long time."""
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {"conductor": "localhost", "player": f"unix:{path}"}
+        config["Startup"] = {}
+        config["Run"] = {"step1": "sleep 30", "step2": "echo never"}
+        config["Collect"] = {"step1": "echo collected"}
+        config["Reset"] = {}
+        return config
+
+    def start_player(self, path):
+        """Start a player on a Unix domain socket with a short kill grace."""
+        from conductor.scripts.player import Player
+
+        player = Player(f"unix:{path}", None)
+        player.kill_grace = 0.5
+        server = threading.Thread(target=player.run)
+        server.start()
+        return player, server
+
+    def wait_for_step(self, control):
+        """Wait until a session of the player is running its first step."""
+        for _ in range(250):
+            if any(s["running"] for s in control.status()["sessions"]):
+                # Give the step a moment to start its command
+                time.sleep(0.2)
+                return
+            time.sleep(0.02)
+
+    def test_cancel_returns_partial_results(self, tmp_path):
+        """Test that a cancelled phase ends at once and the next one runs."""
+        path = tmp_path / "player.sock"
+        player, server = self.start_player(path)
+        busy = Client(self.create_config(path), compression="zlib")
+        control = Client(self.create_config(path), compression="zlib")
+        run_reporter, collect_reporter = MagicMock(), MagicMock()
+        try:
+            busy.run(1)
+            busy.doit()
+            busy.queue("collect", 1)
+            self.wait_for_step(control)
+            started = time.monotonic()
+            summary = busy.cancel()
+            failures = busy.results(run_reporter)
+            cancelled = time.monotonic() - started
+            busy.collect(1)
+            busy.doit()
+            busy.results(collect_reporter)
+        finally:
+            busy.close()
+            control.close()
+            player.shutdown()
+            server.join()
+
+        assert summary == "cancelled 1 phases, stopped 1 steps, dropped 1 queued phases"
+        assert cancelled < 5
+        run_results = run_reporter.add_results.call_args[0][0]
+        assert [(r["code"], r["message"]) for r in run_results] == [
+            (1, "Command cancelled"),
+            (1, "phase cancelled: 1 of 2 steps skipped"),
+            (65535, "phases complete"),
+        ]
+        assert failures == 2
+        # The queued phase was dropped, so Collect ran on its own
+        collect_results = collect_reporter.add_results.call_args[0][0]
+        assert [r["message"] for r in collect_results] == [
+            "collected\n",
+            "phases complete",
+        ]
+
+    def test_cancel_all_sessions(self, tmp_path):
+        """Test that a separate session can cancel every running phase."""
+        path = tmp_path / "player.sock"
+        player, server = self.start_player(path)
+        busy = Client(self.create_config(path), compression="zlib")
+        control = Client(self.create_config(path), compression="zlib")
+        reporter = MagicMock()
+        try:
+            busy.run(1)
+            busy.doit()
+            self.wait_for_step(control)
+            summary = control.cancel(all_sessions=True)
+            busy.results(reporter)
+            idle = control.cancel()
+        finally:
+            busy.close()
+            control.close()
+            player.shutdown()
+            server.join()
+
+        assert summary.startswith("cancelled 1 phases, stopped 1 steps")
+        assert idle == "cancelled 0 phases, stopped 0 steps, dropped 0 queued phases"
+        results = reporter.add_results.call_args[0][0]
+        assert results[0]["message"] == "Command cancelled"
+
+
+class TestRequestIds:
+    """Test several outstanding requests on one session."""
+
+    def create_test_client(self, **kwargs):
+        """Create a test client with one Run and one Collect step."""
+        config = configparser.ConfigParser()
+        config["Coordinator"] = {
+            "conductor": "localhost",
+            "player": "localhost",
+            "cmdport": "6970",
+            "resultsport": "6971",
+        }
+        config["Startup"] = {}
+        config["Run"] = {"step1": "sleep 0.3"}
+        config["Collect"] = {"step1": "echo collected"}
+        config["Reset"] = {}
+        return Client(config, **kwargs)
+
+    def test_replies_are_demultiplexed(self):
+        """Test that replies arriving out of order reach their requests."""
+        from conductor.json_protocol import send_message
+
+        client = self.create_test_client()
+        ours, theirs = socket.socketpair()
+        client.cmd = ours
+        client.features = {"request_ids": True}
+        try:
+            send_message(theirs, "result", {"code": 0, "message": "two"}, request_id=2)
+            send_message(theirs, "result", {"code": 0, "message": "one"}, request_id=1)
+
+            assert client._receive(1) == ("result", {"code": 0, "message": "one"})
+            assert client._receive(2) == ("result", {"code": 0, "message": "two"})
+        finally:
+            client.close()
+            theirs.close()
+
+    def test_next_phase_is_queued_during_run(self, capsys):
+        """Test that the next phase travels while the current one runs."""
+        from conductor.scripts.player import Player, Session
+
+        client = self.create_test_client(compression="zlib")
+        player = Player("127.0.0.1", 0)
+        ours, theirs = socket.socketpair()
+        handled = []
+        handle = Session.handle
+
+        def record(session, msg_type, *args):
+            handled.append((msg_type, session.running))
+            return handle(session, msg_type, *args)
+
+        server = threading.Thread(target=player.serve, args=(theirs,))
+        try:
+            with patch("socket.create_connection", return_value=ours), patch.object(
+                Session, "handle", record
+            ):
+                server.start()
+                client.run(1)
+                client.doit()
+                client.queue("collect", 1)
+                client.results()
+                client.collect(1)
+                client.doit()
+                client.results()
+            # The collect trigger was handled while the run phase ran
+            assert [h for h in handled if h[0] == "trigger"] == [
+                ("trigger", False),
+                ("trigger", True),
+            ]
+        finally:
+            client.close()
+            player.shutdown()
+            server.join()
+            theirs.close()
+
+        out = capsys.readouterr().out
+        assert out.count("0 phase received") == 2
+        assert "0 collected" in out
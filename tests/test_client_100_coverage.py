@@ -201,43 +201,6 @@ resultsport = 6971
                 args = mock_print.call_args[0]
                 assert "Failed to connect to testplayer:6970" in args[0]
     
-    def test_so_reuseport_not_available(self):
-        """Test handling when SO_REUSEPORT is not available on platform."""
-        config = configparser.ConfigParser()
-        config.read_string("""
-[Coordinator]
-conductor = localhost
-player = testplayer
-cmdport = 6970
-resultsport = 6971
-
-[Startup]
-[Run]
-[Collect]
-[Reset]
-""")
-        client = Client(config)
-        
-        # Test that doit handles missing SO_REUSEPORT gracefully
-        with patch('socket.create_connection') as mock_create_connection:
-            with patch('socket.socket') as mock_socket_class:
-                mock_cmd_socket = Mock()
-                mock_create_connection.return_value = mock_cmd_socket
-                
-                mock_results_socket = Mock()
-                mock_socket_class.return_value = mock_results_socket
-                
-                # Make SO_REUSEPORT raise AttributeError
-                mock_results_socket.setsockopt.side_effect = lambda level, optname, value: (
-                    None if optname != socket.SO_REUSEPORT else (_ for _ in ()).throw(AttributeError)
-                )
-                
-                # Should not raise exception
-                client.doit()
-                
-                # Verify SO_REUSEADDR was still set
-                mock_results_socket.setsockopt.assert_any_call(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    
     def test_results_with_reporter(self):
         """Test results method with a reporter object."""
         config = configparser.ConfigParser()
@@ -255,11 +218,9 @@ resultsport = 6971
 """)
         client = Client(config)
         
-        # Create mock result socket and reporter
-        mock_ressock = Mock()
-        mock_conn = Mock()
+        # Results arrive over the control session
         mock_reporter = Mock()
-        client.ressock = mock_ressock
+        client.cmd = Mock()
         
         # Mock receive_message to return results then DONE
         with patch('conductor.client.receive_message') as mock_receive:
@@ -268,12 +229,6 @@ resultsport = 6971
                 (MSG_RESULT, {"code": RETVAL_DONE, "message": "All done"})
             ]
             
-            # Setup accept to return connections
-            mock_ressock.accept.side_effect = [
-                (mock_conn, ("127.0.0.1", 12345)),
-                (mock_conn, ("127.0.0.1", 12346))
-            ]
-            
             # Call results with reporter
             client.results(reporter=mock_reporter)
             
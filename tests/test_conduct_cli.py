@@ -160,6 +160,132 @@ class TestConductMaxMessageSize:
         pytest.skip("To be implemented after basic argument parsing")
 
 
+class TestConductCodec:
+    """Test conduct CLI codec and compression options."""
+
+    def test_codec_choices(self):
+        """Test that --codec accepts the supported codecs only."""
+        from conductor.scripts.conduct import parse_args
+
+        assert parse_args(["--codec", "json", "x.cfg"]).codec == "json"
+        assert parse_args(["--codec", "binary", "x.cfg"]).codec == "binary"
+        assert parse_args(["x.cfg"]).codec is None
+        with pytest.raises(SystemExit):
+            parse_args(["--codec", "msgpack", "x.cfg"])
+
+    def test_compression_options(self):
+        """Test that --compression and --compress-threshold are parsed."""
+        from conductor.scripts.conduct import parse_args
+
+        args = parse_args(
+            ["--compression", "none", "--compress-threshold", "1024", "x.cfg"]
+        )
+        assert args.compression == "none"
+        assert args.compress_threshold == 1024
+        args = parse_args(["x.cfg"])
+        assert args.compression is None
+        assert args.compress_threshold is None
+        with pytest.raises(SystemExit):
+            parse_args(["--compression", "brotli", "x.cfg"])
+
+
+class TestConductHeartbeats:
+    """Test conduct heartbeat options and failed players."""
+
+    def test_heartbeat_options(self):
+        """Test that --heartbeat-interval and --heartbeat-misses are parsed."""
+        from conductor.scripts.conduct import parse_args
+
+        args = parse_args(
+            ["--heartbeat-interval", "0.5", "--heartbeat-misses", "4", "x.cfg"]
+        )
+        assert args.heartbeat_interval == 0.5
+        assert args.heartbeat_misses == 4
+        assert parse_args(["--heartbeat-interval", "0", "x.cfg"]).heartbeat_interval == 0
+        with pytest.raises(SystemExit):
+            parse_args(["--heartbeat-interval", "-1", "x.cfg"])
+        with pytest.raises(SystemExit):
+            parse_args(["--heartbeat-misses", "0", "x.cfg"])
+
+    def test_stream_output_option(self):
+        """Test that --stream-output is left unset unless given."""
+        from conductor.scripts.conduct import parse_args
+
+        assert parse_args(["--stream-output", "x.cfg"]).stream_output is True
+        assert parse_args(["x.cfg"]).stream_output is None
+
+    def test_failed_player_does_not_stop_the_phase(self):
+        """Test that one silent player is recorded and the rest still run."""
+        from unittest.mock import MagicMock
+        from conductor.json_protocol import HeartbeatTimeout
+        from conductor.scripts.conduct import run_phase
+
+        dead, alive = MagicMock(), MagicMock()
+        dead.results.side_effect = HeartbeatTimeout("No heartbeat")
+        reporter = MagicMock()
+
+        failed = set()
+        run_phase([dead, alive], "run", {"download": MagicMock()}, reporter, failed)
+
+        alive.results.assert_called_once_with(reporter)
+        reporter.add_result.assert_called_once_with(1, "player failed: No heartbeat")
+        assert reporter.end_worker.call_count == 2
+        assert failed == {dead}
+
+        # The dead player is skipped for the rest of the trial
+        run_phase([dead, alive], "collect", {"download": MagicMock()}, reporter, failed)
+        dead.doit.assert_called_once()
+        assert alive.doit.call_count == 2
+        reporter.add_result.assert_called_with(1, "player failed earlier")
+
+    def test_next_phase_is_queued_before_collecting(self):
+        """Test that the queue method runs after doit and before results."""
+        from unittest.mock import MagicMock
+        from conductor.scripts.conduct import run_phase
+
+        player = MagicMock()
+        queue = lambda c: c.queue("collect", 1)
+
+        run_phase([player], "run", {"download": MagicMock(), "queue": queue})
+
+        names = [name for name, _, _ in player.mock_calls if not name.startswith("_")]
+        assert names == ["doit", "queue", "results"]
+        player.queue.assert_called_once_with("collect", 1)
+
+    def test_fail_fast_cancels_the_other_players(self):
+        """Test that a failed step cancels the phase on every live player."""
+        from unittest.mock import MagicMock
+        from conductor.scripts.conduct import parse_args, run_phase
+
+        first, failing, last, dead = MagicMock(), MagicMock(), MagicMock(), MagicMock()
+        first.results.return_value = 0
+        failing.results.return_value = 1
+        last.results.return_value = 2
+        failed = {dead}
+
+        cancelled = run_phase(
+            [first, failing, last, dead],
+            "startup",
+            {"download": MagicMock()},
+            failed=failed,
+            fail_fast=True,
+        )
+
+        assert cancelled is True
+        # Players that finished drop what was queued; the rest stop at once
+        for player in (first, failing, last):
+            player.cancel.assert_called_once_with()
+        dead.cancel.assert_not_called()
+        last.results.assert_called_once()
+
+        # Without fail_fast a failure is only reported
+        failing.reset_mock()
+        assert run_phase([failing], "run", {"download": MagicMock()}) is False
+        failing.cancel.assert_not_called()
+        assert parse_args(["--fail-fast", "x.cfg"]).fail_fast is True
+        assert parse_args(["x.cfg"]).fail_fast is None
+
+
 class TestConductCLIErrors:
     """Test conduct CLI error handling."""
 
@@ -0,0 +1,117 @@
+"""Tests for MSG_HELLO capability negotiation."""
+
+import pytest
+
+from conductor import handshake
+from conductor.json_protocol import ProtocolError
+
+
+class TestOffer:
+    """Test the conductor's side of the handshake."""
+
+    def test_offer_lists_everything_supported(self):
+        """Test that an offer carries versions, codecs and features."""
+        offer = handshake.make_offer("binary", "lzma", max_frame_size=1024)
+
+        assert offer["versions"] == [1]
+        assert offer["codecs"] == ["binary", "json"]
+        assert offer["compression"][0] == "lzma"
+        assert offer["batching"] is True
+        assert offer["streaming"] is True
+        assert offer["max_frame_size"] == 1024
+
+    def test_no_compression_offers_none(self):
+        """Test that disabled compression is not offered at all."""
+        offer = handshake.make_offer("json", "none")
+        assert offer["compression"] == []
+        assert offer["codecs"] == ["json", "binary"]
+
+
+class TestAgree:
+    """Test the player's choice of feature set."""
+
+    def test_agrees_on_common_features(self):
+        """Test that both sides' preferences pick the feature set."""
+        offer = handshake.make_offer("binary", "zlib", max_frame_size=2048)
+        answer = handshake.agree(offer, "zlib", max_frame_size=4096)
+
+        assert answer == {
+            "version": 1,
+            "codec": "binary",
+            "compression": "zlib",
+            "batching": True,
+            "streaming": True,
+            "plans": True,
+            "request_ids": True,
+            "max_frame_size": 4096,
+        }
+
+    def test_player_compression_preferred_when_accepted(self):
+        """Test that the player's own compression wins if offered."""
+        offer = handshake.make_offer("json", "zlib")
+        assert handshake.agree(offer, "lzma")["compression"] == "lzma"
+
+    def test_compression_off_on_either_side(self):
+        """Test that compression needs both sides to want it."""
+        assert handshake.agree(handshake.make_offer("json", "none"), "zlib")[
+            "compression"
+        ] == "none"
+        assert handshake.agree(handshake.make_offer("json", "zlib"), "none")[
+            "compression"
+        ] == "none"
+
+    def test_unknown_codecs_are_skipped(self):
+        """Test that codecs we cannot speak are passed over."""
+        answer = handshake.agree({"codecs": ["msgpack", "binary"]})
+        assert answer["codec"] == "binary"
+
+    def test_older_offer_gets_no_optional_features(self):
+        """Test that an offer without feature fields leaves them off."""
+        answer = handshake.agree({"codecs": ["json"]})
+
+        assert answer["version"] == 1
+        assert answer["batching"] is False
+        assert answer["streaming"] is False
+
+    def test_heartbeat_interval_is_agreed(self):
+        """Test that a requested heartbeat interval is echoed back."""
+        offer = handshake.make_offer(heartbeat_interval=0.5)
+        assert handshake.agree(offer)["heartbeat_interval"] == 0.5
+        assert "heartbeat_interval" not in handshake.agree(handshake.make_offer())
+        assert "heartbeat_interval" not in handshake.agree({"heartbeat_interval": True})
+
+    def test_output_streaming_is_agreed(self):
+        """Test that streamed output is only used when asked for."""
+        offer = handshake.make_offer(stream_output=True)
+        assert offer["stream_output"] is True
+        assert handshake.agree(offer)["stream_output"] is True
+        assert "stream_output" not in handshake.make_offer()
+        assert "stream_output" not in handshake.agree(handshake.make_offer())
+
+    def test_no_common_version(self):
+        """Test that disjoint protocol versions are refused."""
+        with pytest.raises(ProtocolError, match="No common protocol version"):
+            handshake.agree({"versions": [7, 8]})
+
+
+class TestWireSettings:
+    """Test turning an agreement into send_message arguments."""
+
+    def test_wire_settings(self):
+        """Test that codec, compression and fragment size are set."""
+        agreed = {"codec": "binary", "compression": "zlib"}
+        wire = handshake.wire_settings(
+            agreed, peer_max_frame_size=4096, max_frame_size=1024, compress_threshold=10
+        )
+
+        assert wire == {
+            "codec": "binary",
+            "compression": "zlib",
+            "compress_threshold": 10,
+            "fragment_size": 1024,
+        }
+
+    def test_no_compression_and_unknown_peer_limit(self):
+        """Test that nothing is set for features that were not agreed."""
+        wire = handshake.wire_settings({"codec": "json", "compression": "none"})
+        assert wire == {"codec": "json"}
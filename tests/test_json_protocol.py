@@ -3,12 +3,14 @@
 import json
 import socket
 import struct
+import threading
 import pytest
 from unittest.mock import Mock
 
 from conductor.json_protocol import (
     send_message,
     receive_message,
+    receive_tagged_message,
     ProtocolError,
     MSG_PHASE,
     MSG_RUN,
@@ -16,6 +18,13 @@ from conductor.json_protocol import (
     MSG_RESULT,
     MSG_DONE,
     MSG_ERROR,
+    _recv_exactly,
+    _send_frame,
+    CODEC_BINARY,
+    COMPRESS_ZLIB,
+    SUPPORTED_COMPRESSION,
+    send_stream,
+    receive_stream,
 )
 
 
@@ -189,6 +198,370 @@ class TestJSONProtocol:
             client_sock.close()
 
 
+class TestFraming:
+    """Test the frame send/receive helpers on real sockets."""
+
+    def test_large_message_round_trip(self):
+        """Test a multi-megabyte message crosses a socket intact."""
+        sender, receiver = socket.socketpair()
+        data = {"output": "abc\n" * (1024 * 1024)}
+        try:
+            # The payload exceeds the socket buffers, so send from a thread
+            thread = threading.Thread(
+                target=send_message, args=(sender, MSG_RESULT, data)
+            )
+            thread.start()
+            msg_type, received = receive_message(receiver)
+            thread.join()
+
+            assert msg_type == MSG_RESULT
+            assert received == data
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_request_ids_round_trip(self):
+        """Test that each codec carries a request ID when given one."""
+        sender, receiver = socket.socketpair()
+        try:
+            send_message(sender, MSG_RESULT, {"code": 0}, request_id=7)
+            send_message(sender, MSG_RESULT, {"code": 1}, codec=CODEC_BINARY, request_id=8)
+            send_message(sender, MSG_RESULT, {"code": 2})
+            send_message(sender, MSG_RESULT, {"code": 3}, request_id=9)
+
+            assert receive_tagged_message(receiver) == (MSG_RESULT, {"code": 0}, 7)
+            assert receive_tagged_message(receiver) == (MSG_RESULT, {"code": 1}, 8)
+            assert receive_tagged_message(receiver) == (MSG_RESULT, {"code": 2}, None)
+            # Readers that do not know about request IDs just ignore them
+            assert receive_message(receiver) == (MSG_RESULT, {"code": 3})
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_send_frame_writes_header_and_payload(self):
+        """Test that scatter/gather sending produces one contiguous frame."""
+        sender, receiver = socket.socketpair()
+        try:
+            _send_frame(sender, b"HEAD", b"payload")
+            sender.close()
+
+            assert _recv_exactly(receiver, 11) == b"HEADpayload"
+        finally:
+            receiver.close()
+
+    def test_recv_exactly_returns_short_data_on_close(self):
+        """Test that a peer closing early yields only what was sent."""
+        sender, receiver = socket.socketpair()
+        try:
+            sender.sendall(b"partial")
+            sender.close()
+
+            data = _recv_exactly(receiver, 100)
+            assert data == b"partial"
+        finally:
+            receiver.close()
+
+    def test_send_frame_falls_back_to_sendall(self):
+        """Test that socket-like objects receive a single joined buffer."""
+        mock_socket = Mock()
+
+        _send_frame(mock_socket, b"HEAD", b"payload")
+
+        mock_socket.sendall.assert_called_once_with(b"HEADpayload")
+
+
+class TestCompression:
+    """Test per-frame compression."""
+
+    def _frame(self, sender, receiver, *args, **kwargs):
+        """Send a message and return the raw frame body that arrives."""
+        send_message(sender, *args, **kwargs)
+        length = struct.unpack("!I", _recv_exactly(receiver, 4))[0]
+        return _recv_exactly(receiver, length)
+
+    @pytest.mark.parametrize("compression", SUPPORTED_COMPRESSION)
+    @pytest.mark.parametrize("codec", ["json", CODEC_BINARY])
+    def test_compressed_round_trip(self, compression, codec):
+        """Test that compressed frames are received transparently."""
+        sender, receiver = socket.socketpair()
+        data = {"code": 0, "message": "tcp 0 0 10.0.0.1:22 ESTABLISHED\n" * 200}
+        try:
+            send_message(
+                sender, MSG_RESULT, data, codec=codec, compression=compression
+            )
+            assert receive_message(receiver) == (MSG_RESULT, data)
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_large_output_fits_once_compressed(self):
+        """Test that the size limit applies to the compressed frame."""
+        sender, receiver = socket.socketpair()
+        data = {"message": "a" * 50000}
+        try:
+            with pytest.raises(ProtocolError, match="exceeds maximum"):
+                send_message(sender, MSG_RESULT, data, max_message_size=10000)
+            send_message(
+                sender,
+                MSG_RESULT,
+                data,
+                max_message_size=10000,
+                compression=COMPRESS_ZLIB,
+            )
+            assert receive_message(receiver, max_message_size=10000)[1] == data
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_small_messages_are_not_compressed(self):
+        """Test that bodies below the threshold are sent as they are."""
+        sender, receiver = socket.socketpair()
+        try:
+            body = self._frame(
+                sender, receiver, MSG_RESULT, {"code": 0}, compression=COMPRESS_ZLIB
+            )
+            assert body[:1] == b"{"
+
+            body = self._frame(
+                sender,
+                receiver,
+                MSG_RESULT,
+                {"message": "x" * 100},
+                compression=COMPRESS_ZLIB,
+                compress_threshold=50,
+            )
+            assert body[0] == 0x82
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_incompressible_body_is_sent_uncompressed(self):
+        """Test that compression is skipped when it would not save bytes."""
+        sender, receiver = socket.socketpair()
+        try:
+            body = self._frame(
+                sender,
+                receiver,
+                MSG_RESULT,
+                {"code": 0},
+                compression=COMPRESS_ZLIB,
+                compress_threshold=1,
+            )
+            assert body[:1] == b"{"
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_decompression_is_bounded(self):
+        """Test that a small frame cannot inflate past the ratio limit."""
+        import zlib
+
+        sender, receiver = socket.socketpair()
+        message = json.dumps(
+            {"version": 1, "type": "result", "data": {"message": "a" * 200000}}
+        ).encode("utf-8")
+        body = b"\x82" + zlib.compress(message)
+        try:
+            sender.sendall(struct.pack("!I", len(body)) + body)
+            with pytest.raises(ProtocolError, match="decompressed"):
+                receive_message(receiver, max_message_size=10000)
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_corrupt_compressed_frame_raises_protocol_error(self):
+        """Test that damaged compressed data is a protocol error."""
+        sender, receiver = socket.socketpair()
+        body = b"\x82not zlib data"
+        try:
+            sender.sendall(struct.pack("!I", len(body)) + body)
+            with pytest.raises(ProtocolError, match="Invalid message format"):
+                receive_message(receiver)
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_unknown_compression_is_rejected(self):
+        """Test that send_message refuses compressors it does not know."""
+        sender, receiver = socket.socketpair()
+        try:
+            with pytest.raises(ValueError):
+                send_message(
+                    sender,
+                    MSG_RESULT,
+                    {"message": "x" * 10000},
+                    compression="brotli",
+                )
+        finally:
+            sender.close()
+            receiver.close()
+
+
+class TestFragmentation:
+    """Test messages split across frames and raw streams."""
+
+    def _frames(self, receiver):
+        """Read all pending frames and return their bodies."""
+        receiver.setblocking(False)
+        frames = []
+        try:
+            while True:
+                length = struct.unpack("!I", _recv_exactly(receiver, 4))[0]
+                frames.append(bytes(_recv_exactly(receiver, length)))
+        except BlockingIOError:
+            pass
+        finally:
+            receiver.setblocking(True)
+        return frames
+
+    @pytest.mark.parametrize("codec", ["json", CODEC_BINARY])
+    def test_message_larger_than_limit_is_fragmented(self, codec):
+        """Test that a message over the frame limit arrives in one piece."""
+        sender, receiver = socket.socketpair()
+        data = {"code": 0, "message": "line of output\n" * 5000}
+        try:
+            thread = threading.Thread(
+                target=send_message,
+                args=(sender, MSG_RESULT, data),
+                kwargs={"max_message_size": 8192, "codec": codec, "fragment_size": 8192},
+            )
+            thread.start()
+            assert receive_message(receiver, max_message_size=8192) == (MSG_RESULT, data)
+            thread.join()
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_fragments_respect_frame_size(self):
+        """Test that every fragment fits in the agreed frame size."""
+        sender, receiver = socket.socketpair()
+        try:
+            send_message(
+                sender, MSG_RESULT, {"message": "x" * 1000}, fragment_size=100
+            )
+            frames = self._frames(receiver)
+            assert len(frames) > 1
+            assert all(len(frame) <= 100 for frame in frames)
+            assert all(frame[0] & 0x08 for frame in frames[:-1])
+            assert not frames[-1][0] & 0x08
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_small_message_is_not_fragmented(self):
+        """Test that messages that fit are sent as a single plain frame."""
+        sender, receiver = socket.socketpair()
+        try:
+            send_message(sender, MSG_RESULT, {"code": 0}, fragment_size=100)
+            frames = self._frames(receiver)
+            assert len(frames) == 1
+            assert frames[0][:1] == b"{"
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_compressed_message_is_fragmented(self):
+        """Test that compression and fragmentation combine."""
+        sender, receiver = socket.socketpair()
+        data = {"message": "".join(f"{i:08x}" for i in range(2000))}
+        try:
+            send_message(
+                sender,
+                MSG_RESULT,
+                data,
+                compression=COMPRESS_ZLIB,
+                fragment_size=1024,
+            )
+            assert receive_message(receiver) == (MSG_RESULT, data)
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_reassembly_is_bounded(self):
+        """Test that fragments cannot add up to more than the ratio limit."""
+        sender, receiver = socket.socketpair()
+        try:
+            fragment = struct.pack("!IB", 101, 0x88) + b"x" * 100
+            sender.sendall(fragment * 11)
+            with pytest.raises(ProtocolError, match="too large"):
+                receive_message(receiver, max_message_size=101)
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_inconsistent_fragment_flags_are_rejected(self):
+        """Test that fragments of one message must share their flags."""
+        sender, receiver = socket.socketpair()
+        try:
+            sender.sendall(
+                struct.pack("!IB", 2, 0x88) + b"{"
+                + struct.pack("!IB", 2, 0x81) + b"}"
+            )
+            with pytest.raises(ProtocolError, match="inconsistent"):
+                receive_message(receiver)
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_close_mid_message_is_an_error(self):
+        """Test that losing the peer between fragments is not a clean close."""
+        sender, receiver = socket.socketpair()
+        try:
+            sender.sendall(struct.pack("!IB", 2, 0x88) + b"{")
+            sender.close()
+            with pytest.raises(ProtocolError, match="middle"):
+                receive_message(receiver)
+        finally:
+            receiver.close()
+
+    @pytest.mark.parametrize("compression", [None, COMPRESS_ZLIB])
+    def test_stream_round_trip(self, compression):
+        """Test that stream chunks arrive in order and end the stream."""
+        sender, receiver = socket.socketpair()
+        chunks = [b"first " * 1000, b"", b"second", bytes(range(256)) * 100]
+        try:
+            thread = threading.Thread(
+                target=send_stream,
+                args=(sender, iter(chunks)),
+                kwargs={"compression": compression, "fragment_size": 4096},
+            )
+            thread.start()
+            received = list(receive_stream(receiver))
+            thread.join()
+
+            assert b"".join(received) == b"".join(chunks)
+            assert all(len(chunk) < 4096 for chunk in received)
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_stream_and_messages_interleave(self):
+        """Test that a stream can follow a message announcing it."""
+        sender, receiver = socket.socketpair()
+        try:
+            send_message(sender, MSG_RESULT, {"code": 0, "stream": True})
+            send_stream(sender, [b"artifact"])
+            send_message(sender, MSG_DONE, {})
+
+            assert receive_message(receiver)[0] == MSG_RESULT
+            assert list(receive_stream(receiver)) == [b"artifact"]
+            assert receive_message(receiver)[0] == MSG_DONE
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_stream_data_is_not_a_message(self):
+        """Test that receive_message refuses raw stream frames."""
+        sender, receiver = socket.socketpair()
+        try:
+            send_stream(sender, [b"data"])
+            with pytest.raises(ProtocolError, match="stream"):
+                receive_message(receiver)
+        finally:
+            sender.close()
+            receiver.close()
+
+
 class TestJSONProtocolIntegration:
     """Integration tests with actual conductor objects."""
 
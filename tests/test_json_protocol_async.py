@@ -0,0 +1,322 @@
+"""Tests for the asyncio counterparts of the JSON protocol functions."""
+
+import asyncio
+import json
+import socket
+import struct
+import threading
+
+import pytest
+
+from conductor.json_protocol import (
+    send_message,
+    receive_message,
+    send_stream,
+    async_send_message,
+    async_receive_message,
+    async_send_stream,
+    async_receive_stream,
+    MessageProtocol,
+    ConnectionClosed,
+    ProtocolError,
+    CODEC_BINARY,
+    COMPRESS_ZLIB,
+    MSG_PHASE,
+    MSG_RESULT,
+    MSG_DONE,
+)
+
+
+def run(coro):
+    """Run a coroutine to completion on a fresh event loop."""
+    return asyncio.run(coro)
+
+
+def reader_for(data, eof=True):
+    """Return a StreamReader pre-loaded with data."""
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    if eof:
+        reader.feed_eof()
+    return reader
+
+
+def frame(message):
+    """Frame a JSON-encodable envelope the way send_message does."""
+    body = json.dumps(message).encode("utf-8")
+    return struct.pack("!I", len(body)) + body
+
+
+async def stream_pair():
+    """Return ((reader, writer), (reader, writer)) over a socket pair."""
+    left, right = socket.socketpair()
+    return (
+        await asyncio.open_connection(sock=left),
+        await asyncio.open_connection(sock=right),
+    )
+
+
+class TestAsyncReceive:
+    """Test async_receive_message against hand-built frames."""
+
+    def test_receive_message(self):
+        """Test receiving a JSON message."""
+        data = frame({"version": 1, "type": MSG_RESULT, "data": {"code": 0}})
+
+        async def main():
+            return await async_receive_message(reader_for(data))
+
+        assert run(main()) == (MSG_RESULT, {"code": 0})
+
+    def test_receive_empty_stream(self):
+        """Test that a closed connection between messages is reported."""
+
+        async def main():
+            await async_receive_message(reader_for(b""))
+
+        with pytest.raises(ConnectionClosed, match="Connection closed"):
+            run(main())
+
+    def test_incomplete_header(self):
+        """Test that a truncated length header is a protocol error."""
+
+        async def main():
+            await async_receive_message(reader_for(b"\x00\x00"))
+
+        with pytest.raises(ProtocolError, match="Incomplete length header"):
+            run(main())
+
+    def test_incomplete_body(self):
+        """Test that a truncated body is a protocol error."""
+
+        async def main():
+            await async_receive_message(reader_for(struct.pack("!I", 10) + b"{}"))
+
+        with pytest.raises(ProtocolError, match="Incomplete message"):
+            run(main())
+
+    def test_message_too_large(self):
+        """Test that the size limit is checked before reading the body."""
+
+        async def main():
+            reader = reader_for(struct.pack("!I", 2048), eof=False)
+            await async_receive_message(reader, max_message_size=1024)
+
+        with pytest.raises(ProtocolError, match="Message too large"):
+            run(main())
+
+    def test_invalid_json(self):
+        """Test receiving invalid JSON data."""
+
+        async def main():
+            body = b"not valid json"
+            await async_receive_message(reader_for(struct.pack("!I", len(body)) + body))
+
+        with pytest.raises(ProtocolError, match="Invalid message format"):
+            run(main())
+
+    def test_version_is_checked(self):
+        """Test that other protocol versions are rejected."""
+        data = frame({"version": 2, "type": MSG_RESULT, "data": {}})
+
+        async def main():
+            await async_receive_message(reader_for(data))
+
+        with pytest.raises(ProtocolError, match="Unsupported protocol version"):
+            run(main())
+
+
+class TestAsyncSend:
+    """Test async_send_message over real streams."""
+
+    @pytest.mark.parametrize("codec", ["json", CODEC_BINARY])
+    def test_round_trip(self, codec):
+        """Test sending and receiving a message."""
+        data = {"steps": [{"command": "echo test", "spawn": False}], "resultport": 9999}
+
+        async def main():
+            (_, writer), (reader, other) = await stream_pair()
+            await async_send_message(writer, MSG_PHASE, data, codec=codec)
+            received = await async_receive_message(reader)
+            writer.close()
+            other.close()
+            return received
+
+        assert run(main()) == (MSG_PHASE, data)
+
+    def test_send_size_limit(self):
+        """Test that the size limit applies to async sends too."""
+
+        async def main():
+            (_, writer), (_, other) = await stream_pair()
+            try:
+                await async_send_message(
+                    writer, MSG_PHASE, {"data": "x" * 2048}, max_message_size=1024
+                )
+            finally:
+                writer.close()
+                other.close()
+
+        with pytest.raises(ProtocolError, match="exceeds maximum"):
+            run(main())
+
+    def test_compressed_fragmented_round_trip(self):
+        """Test that compression and fragments work over asyncio streams."""
+        data = {"message": "".join(f"{i:08x}" for i in range(20000))}
+
+        async def main():
+            (_, writer), (reader, other) = await stream_pair()
+            send = async_send_message(
+                writer,
+                MSG_RESULT,
+                data,
+                max_message_size=16384,
+                compression=COMPRESS_ZLIB,
+                fragment_size=4096,
+            )
+            received = await asyncio.gather(
+                send, async_receive_message(reader, max_message_size=16384)
+            )
+            writer.close()
+            other.close()
+            return received[1]
+
+        assert run(main()) == (MSG_RESULT, data)
+
+    def test_blocking_and_async_ends_interoperate(self):
+        """Test that a blocking sender and an async receiver agree."""
+        left, right = socket.socketpair()
+        data = {"message": "line\n" * 50000}
+        thread = threading.Thread(
+            target=send_message,
+            args=(left, MSG_RESULT, data),
+            kwargs={"codec": CODEC_BINARY, "fragment_size": 8192},
+        )
+
+        async def main():
+            reader, writer = await asyncio.open_connection(sock=right)
+            thread.start()
+            received = await async_receive_message(reader)
+            writer.close()
+            return received
+
+        try:
+            assert run(main()) == (MSG_RESULT, data)
+        finally:
+            thread.join()
+            left.close()
+
+
+class TestAsyncStreams:
+    """Test raw streams over asyncio streams."""
+
+    def test_stream_round_trip(self):
+        """Test that chunks from an async iterable arrive in order."""
+        chunks = [b"first " * 1000, b"second", bytes(range(256)) * 100]
+
+        async def produce():
+            for chunk in chunks:
+                yield chunk
+
+        async def main():
+            (_, writer), (reader, other) = await stream_pair()
+            await async_send_message(writer, MSG_RESULT, {"stream": True})
+            send = async_send_stream(writer, produce(), fragment_size=4096)
+
+            async def consume():
+                assert (await async_receive_message(reader))[0] == MSG_RESULT
+                return [chunk async for chunk in async_receive_stream(reader)]
+
+            _, received = await asyncio.gather(send, consume())
+            writer.close()
+            other.close()
+            return received
+
+        assert b"".join(run(main())) == b"".join(chunks)
+
+    def test_blocking_stream_to_async_receiver(self):
+        """Test that send_stream output is read by async_receive_stream."""
+        left, right = socket.socketpair()
+
+        async def main():
+            reader, writer = await asyncio.open_connection(sock=right)
+            send_stream(left, [b"artifact"], compression=COMPRESS_ZLIB)
+            received = [chunk async for chunk in async_receive_stream(reader)]
+            writer.close()
+            return received
+
+        try:
+            assert run(main()) == [b"artifact"]
+        finally:
+            left.close()
+
+
+class TestMessageProtocol:
+    """Test the asyncio.Protocol framer."""
+
+    def test_frames_split_across_reads(self):
+        """Test that messages are delivered however the bytes arrive."""
+        data = frame({"version": 1, "type": MSG_RESULT, "data": {"code": 0}})
+        data += frame({"version": 1, "type": MSG_DONE, "data": {}})
+
+        async def main():
+            protocol = MessageProtocol()
+            for i in range(len(data)):
+                protocol.data_received(data[i : i + 1])
+            return [await protocol.receive(), await protocol.receive()]
+
+        assert run(main()) == [(MSG_RESULT, {"code": 0}), (MSG_DONE, {})]
+
+    def test_round_trip_over_transport(self):
+        """Test send() and receive() over a real connection."""
+
+        async def main():
+            left, right = socket.socketpair()
+            loop = asyncio.get_running_loop()
+            _, sender = await loop.create_connection(
+                lambda: MessageProtocol(codec=CODEC_BINARY, fragment_size=1024),
+                sock=left,
+            )
+            _, receiver = await loop.create_connection(MessageProtocol, sock=right)
+            sender.send(MSG_RESULT, {"message": "x" * 5000})
+            received = await receiver.receive()
+            sender.transport.close()
+            with pytest.raises(ConnectionClosed):
+                await receiver.receive()
+            return received
+
+        assert run(main()) == (MSG_RESULT, {"message": "x" * 5000})
+
+    def test_protocol_error_closes_transport(self):
+        """Test that a bad frame is raised from receive() after good ones."""
+
+        class FakeTransport:
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        data = frame({"version": 1, "type": MSG_RESULT, "data": {}})
+        data += struct.pack("!I", 4) + b"junk"
+
+        async def main():
+            protocol = MessageProtocol()
+            protocol.connection_made(FakeTransport())
+            protocol.data_received(data)
+            assert await protocol.receive() == (MSG_RESULT, {})
+            with pytest.raises(ProtocolError, match="Invalid message format"):
+                await protocol.receive()
+            return protocol.transport.closed
+
+        assert run(main())
+
+    def test_size_limit(self):
+        """Test that oversized frames are refused by the framer."""
+
+        async def main():
+            protocol = MessageProtocol(max_message_size=1024)
+            protocol.data_received(struct.pack("!I", 2048))
+            await protocol.receive()
+
+        with pytest.raises(ProtocolError, match="Message too large"):
+            run(main())
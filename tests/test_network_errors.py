@@ -280,7 +280,11 @@ step1 = echo "test"
             shutil.rmtree(test_dir)
 
     def test_results_port_unavailable(self):
-        """Test conductor behavior when results port is blocked."""
+        """Test that a blocked results port no longer matters.
+
+        Results come back over the control session, so the conductor
+        never binds the configured results port.
+        """
         coordinator_config, client_config, test_dir = self.create_test_configs(21600)
 
         # Block the results port
@@ -303,7 +307,7 @@ step1 = echo "test"
             time.sleep(0.5)
 
             try:
-                # Run conductor - should fail to bind results port
+                # Run conductor - results port is not needed
                 result = subprocess.run(
                     [sys.executable, "scripts/conduct", coordinator_config],
                     capture_output=True,
@@ -311,8 +315,8 @@ step1 = echo "test"
                     timeout=5,
                 )
 
-                # Should fail
-                assert result.returncode != 0
+                # Should succeed
+                assert result.returncode == 0
 
             finally:
                 player_proc.terminate()
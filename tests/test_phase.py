@@ -1,10 +1,16 @@
 """Tests for the Phase class."""
 
+import asyncio
+import socket
+import threading
+import time
 from unittest.mock import MagicMock, patch, call
 
-from conductor.phase import Phase
+from conductor.cancellation import Cancellation
+from conductor.phase import Phase, ENGINE_ASYNCIO, ENGINES
 from conductor.step import Step
-from conductor.retval import RetVal
+from conductor.retval import RetVal, RETVAL_DONE
+from conductor.json_protocol import receive_message, MSG_RESULTS
 
 
 class TestPhaseInitialization:
@@ -98,12 +104,179 @@ class TestPhaseExecution:
         assert len(phase.results) == 0
 
 
+class TestPhaseParallelGroups:
+    """Test steps grouped to run concurrently."""
+
+    def make_step(self, group, delay, message, running):
+        """Create a step that takes delay seconds and tracks concurrency."""
+        lock = running["lock"]
+
+        def run():
+            with lock:
+                running["now"] += 1
+                running["peak"] = max(running["peak"], running["now"])
+            time.sleep(delay)
+            with lock:
+                running["now"] -= 1
+            return RetVal(0, message)
+
+        step = Step(f"echo {message}", group=group)
+        step.run = run
+        return step
+
+    def test_group_runs_together_and_reports_in_order(self):
+        """Test that a group's steps overlap but keep declaration order."""
+        running = {"lock": threading.Lock(), "now": 0, "peak": 0}
+        phase = Phase("localhost", 6971)
+        phase.append(self.make_step(None, 0, "before", running))
+        for message, delay in (("slow", 0.3), ("medium", 0.2), ("fast", 0.1)):
+            phase.append(self.make_step(1, delay, message, running))
+        phase.append(self.make_step(None, 0, "after", running))
+
+        start = time.monotonic()
+        phase.run()
+
+        assert time.monotonic() - start < 0.5
+        assert running["peak"] == 3
+        assert [r.message for r in phase.results] == [
+            "before",
+            "slow",
+            "medium",
+            "fast",
+            "after",
+        ]
+
+    def test_max_parallel_limits_concurrency(self):
+        """Test that no more than max_parallel steps of a group run at once."""
+        running = {"lock": threading.Lock(), "now": 0, "peak": 0}
+        phase = Phase("localhost", 6971, max_parallel=2)
+        for i in range(4):
+            phase.append(self.make_step(0, 0.05, f"step {i}", running))
+
+        phase.run()
+
+        assert running["peak"] == 2
+        assert [r.message for r in phase.results] == [f"step {i}" for i in range(4)]
+
+    def test_groups_split_consecutive_runs(self):
+        """Test that different groups and ungrouped steps run separately."""
+        phase = Phase("localhost", 6971)
+        steps = [Step("a", group=0), Step("b", group=0), Step("c"), Step("d", group=3)]
+        for step in steps:
+            phase.append(step)
+
+        assert phase.groups() == [steps[:2], [steps[2]], [steps[3]]]
+
+
+class TestPhaseAsyncEngine:
+    """Test executing a phase with the asyncio engine."""
+
+    def make_step(self, group, delay, message, running):
+        """Create a coroutine step that takes delay seconds and tracks concurrency."""
+
+        async def async_run():
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await asyncio.sleep(delay)
+            running["now"] -= 1
+            return RetVal(0, message)
+
+        step = Step(f"echo {message}", group=group)
+        step.async_run = async_run
+        return step
+
+    def test_group_runs_together_and_reports_in_order(self):
+        """Test that a group's coroutines overlap but keep declaration order."""
+        running = {"now": 0, "peak": 0}
+        phase = Phase("localhost", 6971)
+        phase.append(self.make_step(None, 0, "before", running))
+        for message, delay in (("slow", 0.3), ("medium", 0.2), ("fast", 0.1)):
+            phase.append(self.make_step(1, delay, message, running))
+        phase.append(self.make_step(None, 0, "after", running))
+
+        start = time.monotonic()
+        phase.execute(ENGINE_ASYNCIO)
+
+        assert time.monotonic() - start < 0.5
+        assert running["peak"] == 3
+        assert [r.message for r in phase.results] == [
+            "before",
+            "slow",
+            "medium",
+            "fast",
+            "after",
+        ]
+
+    def test_max_parallel_limits_concurrency(self):
+        """Test that max_parallel also bounds the asyncio engine."""
+        running = {"now": 0, "peak": 0}
+        phase = Phase("localhost", 6971, max_parallel=2)
+        for i in range(4):
+            phase.append(self.make_step(0, 0.05, f"step {i}", running))
+
+        phase.execute(ENGINE_ASYNCIO)
+
+        assert running["peak"] == 2
+        assert [r.message for r in phase.results] == [f"step {i}" for i in range(4)]
+
+    def test_runs_real_commands(self):
+        """Test that the asyncio engine runs shell commands end to end."""
+        phase = Phase("localhost", 6971)
+        phase.append(Step("echo one"))
+        phase.append(Step("exit 2"))
+
+        phase.execute(ENGINE_ASYNCIO)
+
+        assert [(r.code, r.message) for r in phase.results] == [
+            (0, "one\n"),
+            (2, "exit 2"),
+        ]
+
+
+class TestPhaseCancellation:
+    """Test cancelling a phase part way through."""
+
+    def test_cancel_skips_the_remaining_steps(self):
+        """Test that only the steps that ran report, with either engine."""
+        for engine in ENGINES:
+            phase = Phase("localhost", 6971)
+            phase.append(Step("echo one"))
+            phase.append(Step("sleep 30", group=1))
+            phase.append(Step("sleep 30", group=1))
+            phase.append(Step("echo never"))
+            cancel = Cancellation(kill_grace=0.5)
+            threading.Timer(0.3, cancel.cancel).start()
+
+            start = time.monotonic()
+            phase.execute(engine, cancel=cancel)
+
+            assert time.monotonic() - start < 5, engine
+            assert [(r.code, r.message) for r in phase.results] == [
+                (0, "one\n"),
+                (1, "Command cancelled"),
+                (1, "Command cancelled"),
+            ], engine
+
+    def test_cancelled_phase_runs_nothing(self):
+        """Test that a phase started after the cancel skips every step."""
+        phase = Phase("localhost", 6971)
+        step = MagicMock()
+        step.group = None
+        phase.append(step)
+        cancel = Cancellation()
+        cancel.cancel()
+
+        phase.run(cancel=cancel)
+
+        step.run.assert_not_called()
+        assert phase.results == []
+
+
 class TestPhaseResultsReporting:
     """Test Phase results reporting functionality."""
 
-    @patch("socket.create_connection")
-    def test_return_results_sends_all_results(self, mock_create_connection):
-        """Test that return_results sends all results to conductor."""
+    def test_return_results_sends_all_results(self):
+        """Test that return_results sends all results over the session."""
         phase = Phase("localhost", 6971)
 
         # Add some results
@@ -113,45 +286,76 @@ class TestPhaseResultsReporting:
             RetVal(0, "Step 3 success"),
         ]
 
-        # Create mock sockets
-        mock_sockets = [MagicMock() for _ in range(4)]  # 3 results + 1 done message
-        mock_create_connection.side_effect = mock_sockets
+        mock_socket = MagicMock()
 
         # Call return_results
-        phase.return_results()
+        phase.return_results(mock_socket)
 
-        # Verify socket connections were created
-        expected_calls = [call(("localhost", 6971)) for _ in range(4)]
-        mock_create_connection.assert_has_calls(expected_calls)
+        # 3 results + 1 done message, all on the one socket, which stays open
+        assert mock_socket.sendall.call_count == 4
+        mock_socket.close.assert_not_called()
 
-        # Verify each result was sent
-        for i, result in enumerate(phase.results):
-            # The result's send method should have been called with the socket
-            mock_sockets[i].sendall.assert_called_once()
-            mock_sockets[i].close.assert_called_once()
+        # The last message is the DONE marker
+        last_frame = mock_socket.sendall.call_args_list[-1][0][0]
+        assert b'"code":65535' in last_frame
 
-        # Verify DONE message was sent
-        mock_sockets[3].sendall.assert_called_once()
-        mock_sockets[3].close.assert_called_once()
-
-    @patch("socket.create_connection")
-    def test_return_results_with_no_results(self, mock_create_connection):
+    def test_return_results_with_no_results(self):
         """Test that return_results still sends DONE with no results."""
         phase = Phase("localhost", 6971)
 
         # No results
         phase.results = []
 
-        # Create mock socket for DONE message
         mock_socket = MagicMock()
-        mock_create_connection.return_value = mock_socket
 
         # Call return_results
-        phase.return_results()
-
-        # Should only create one connection for DONE message
-        mock_create_connection.assert_called_once_with(("localhost", 6971))
+        phase.return_results(mock_socket)
 
-        # Verify DONE message was sent
+        # Only the DONE message is sent
         mock_socket.sendall.assert_called_once()
-        mock_socket.close.assert_called_once()
+        mock_socket.close.assert_not_called()
+
+    def test_return_results_batches_into_one_frame(self):
+        """Test that batched results travel in a single frame with DONE last."""
+        phase = Phase("localhost", 6971)
+        phase.results = [RetVal(0, f"line {i}") for i in range(50)]
+
+        sender, receiver = socket.socketpair()
+        try:
+            phase.return_results(sender, max_batch_bytes=64 * 1024)
+            sender.close()
+
+            msg_type, data = receive_message(receiver)
+            assert msg_type == MSG_RESULTS
+            assert len(data["results"]) == 51
+            assert data["results"][0] == {"code": 0, "message": "line 0"}
+            assert data["results"][-1]["code"] == RETVAL_DONE
+
+            # Nothing else was sent
+            assert receiver.recv(1) == b""
+        finally:
+            receiver.close()
+
+    def test_return_results_splits_batches_by_size(self):
+        """Test that batches are bounded by max_batch_bytes."""
+        phase = Phase("localhost", 6971)
+        phase.results = [RetVal(0, "x" * 100) for _ in range(10)]
+
+        sender, receiver = socket.socketpair()
+        try:
+            phase.return_results(sender, max_batch_bytes=320)
+            sender.close()
+
+            batches = []
+            while True:
+                try:
+                    batches.append(receive_message(receiver)[1]["results"])
+                except Exception:
+                    break
+
+            # Two 132-byte results fit per batch, plus the small DONE entry
+            assert [len(b) for b in batches] == [2, 2, 2, 2, 3]
+            assert [r["message"] for b in batches for r in b][:10] == ["x" * 100] * 10
+            assert batches[-1][-1]["code"] == RETVAL_DONE
+        finally:
+            receiver.close()
@@ -1,5 +1,6 @@
 """Integration tests for player CLI with argparse options."""
 
+import pytest
 import subprocess
 import os
 import tempfile
@@ -136,6 +137,25 @@ class TestPlayerMaxMessageSize:
             os.unlink(config_file)
 
 
+    def test_max_sessions_option(self):
+        """Test the limit on concurrent conductor sessions."""
+        from conductor.scripts.player import parse_args
+
+        assert parse_args(["player.cfg"]).max_sessions is None
+        assert parse_args(["--max-sessions", "3", "player.cfg"]).max_sessions == 3
+        with pytest.raises(SystemExit):
+            parse_args(["--max-sessions", "0", "player.cfg"])
+
+    def test_kill_grace_option(self):
+        """Test the time commands get between SIGTERM and SIGKILL."""
+        from conductor.scripts.player import parse_args
+
+        assert parse_args(["player.cfg"]).kill_grace is None
+        assert parse_args(["--kill-grace", "0.5", "player.cfg"]).kill_grace == 0.5
+        assert parse_args(["--kill-grace", "0", "player.cfg"]).kill_grace == 0
+        with pytest.raises(SystemExit):
+            parse_args(["--kill-grace", "-1", "player.cfg"])
+
 class TestPlayerCLIErrors:
     """Test player CLI error handling."""
 
@@ -42,7 +42,7 @@ class TestMessage:
 
         assert data["version"] == 1
         assert data["type"] == "run"
-        assert data["payload"] == {"command": "execute"}
+        assert data["data"] == {"command": "execute"}
 
     def test_message_from_json(self):
         """Test deserializing message from JSON."""
@@ -55,6 +55,17 @@ class TestMessage:
         assert msg.type == MessageType.RESULT
         assert msg.payload == {"code": 0, "message": "OK"}
 
+    def test_message_to_json_is_compact(self):
+        """Test that messages use the same compact envelope as send_message."""
+        msg = Message(MessageType.RESULT, {"code": 0})
+        assert msg.to_json() == '{"version":1,"type":"result","data":{"code":0}}'
+
+    def test_message_from_data_envelope(self):
+        """Test that the current "data" envelope is accepted."""
+        msg = Message.from_json('{"version":1,"type":"run","data":{}}')
+        assert msg.type == MessageType.RUN
+        assert msg.payload == {}
+
     def test_message_from_invalid_json(self):
         """Test deserializing invalid JSON raises error."""
         with pytest.raises(ProtocolError):
@@ -82,7 +93,7 @@ class TestNetworkFunctions:
         assert length == len(data)
         parsed = json.loads(data.decode("utf-8"))
         assert parsed["type"] == "config"
-        assert parsed["payload"] == {"setting": "value"}
+        assert parsed["data"] == {"setting": "value"}
 
     def test_receive_json_message(self):
         """Test receiving a JSON message."""
@@ -186,8 +197,8 @@ class TestProtocolHandler:
         data = json.loads(call_args[4:].decode("utf-8"))
 
         assert data["type"] == "phase"
-        assert data["payload"]["resulthost"] == "127.0.0.1"
-        assert data["payload"]["resultport"] == 8080
+        assert data["data"]["resulthost"] == "127.0.0.1"
+        assert data["data"]["resultport"] == 8080
 
     def test_json_protocol_send_retval(self):
         """Test sending a RetVal with JSON protocol."""
@@ -202,8 +213,8 @@ class TestProtocolHandler:
         data = json.loads(call_args[4:].decode("utf-8"))
 
         assert data["type"] == "result"
-        assert data["payload"]["code"] == 0
-        assert data["payload"]["message"] == "All good"
+        assert data["data"]["code"] == 0
+        assert data["data"]["message"] == "All good"
 
     def test_only_json_protocol_supported(self):
         """Test that only JSON protocol is supported."""
@@ -156,6 +156,222 @@ class TestTextReporter:
                 os.unlink(output_file)
 
 
+class TestReporterBatches:
+    """Test batched result handling."""
+
+    def test_add_results_records_every_entry(self):
+        """Test that a batch is recorded like individual results."""
+        reporter = JSONReporter()
+        reporter.start_trials(1, 1)
+        reporter.start_trial(1)
+        reporter.start_phase("collect")
+        reporter.start_worker("worker_0")
+        reporter.add_results(
+            [
+                {"code": 0, "message": "first"},
+                {"code": 1, "message": "second"},
+            ]
+        )
+        reporter.end_worker()
+        reporter.end_phase()
+        reporter.end_trial()
+
+        results = reporter.results["trials"][0]["phases"]["collect"]["workers"][
+            "worker_0"
+        ]["results"]
+        assert [(r["code"], r["message"]) for r in results] == [
+            (0, "first"),
+            (1, "second"),
+        ]
+        assert results[0]["timestamp"] == results[1]["timestamp"]
+
+    def test_text_reporter_prints_batch(self, capsys):
+        """Test that the text reporter prints each entry of a batch."""
+        reporter = TextReporter()
+        reporter.start_trials(1, 1)
+        reporter.start_trial(1)
+        reporter.start_phase("run")
+        reporter.start_worker("worker_0")
+        reporter.add_results(
+            [{"code": 0, "message": "hello"}, {"code": 0, "message": "done"}]
+        )
+
+        assert capsys.readouterr().out == "0 hello\ndone\n"
+
+
+class TestReporterOutput:
+    """Test streamed step output."""
+
+    def test_json_reporter_records_lines(self):
+        """Test that streamed lines are kept with their step and stream."""
+        reporter = JSONReporter()
+        reporter.start_trials(1, 1)
+        reporter.start_trial(1)
+        reporter.start_phase("run")
+        reporter.start_worker("worker_0")
+        reporter.add_output(0, "stdout", 1700000000.5, "first\n")
+        reporter.add_output(1, "stderr", 1700000001.0, "oops\n")
+        reporter.add_result(0, "")
+        reporter.end_worker()
+        reporter.end_phase()
+        reporter.end_trial()
+
+        worker = reporter.results["trials"][0]["phases"]["run"]["workers"]["worker_0"]
+        assert [(o["step"], o["stream"], o["line"]) for o in worker["output"]] == [
+            (0, "stdout", "first\n"),
+            (1, "stderr", "oops\n"),
+        ]
+        assert worker["output"][0]["timestamp"].endswith(":20.500000")
+        assert len(worker["results"]) == 1
+
+    def test_text_reporter_prints_lines(self, capsys):
+        """Test that the text reporter prints lines as they arrive."""
+        reporter = TextReporter()
+        reporter.start_trials(1, 1)
+        reporter.start_trial(1)
+        reporter.start_phase("run")
+        reporter.start_worker("worker_0")
+        reporter.add_output(0, "stdout", 1700000000.0, "hello\n")
+        reporter.add_output(0, "stdout", 1700000000.0, "world")
+
+        reporter.end_worker()
+        reporter.end_phase()
+        reporter.end_trial()
+
+        assert capsys.readouterr().out == "hello\nworld"
+        worker = reporter.results["trials"][0]["phases"]["run"]["workers"]["worker_0"]
+        assert "output" not in worker
+
+
+class TestReporterSpooledOutput:
+    """Test results carrying a spooled output summary."""
+
+    def test_summaries_are_recorded(self):
+        """Test that output summaries are kept with their results."""
+        summary = {"spool": "1-1", "size": 9000, "sha256": "ab", "truncated": True}
+        reporter = JSONReporter()
+        reporter.start_trials(1, 1)
+        reporter.start_trial(1)
+        reporter.start_phase("run")
+        reporter.start_worker("worker_0")
+        reporter.add_result(0, "excerpt", summary)
+        reporter.add_results([{"code": 0, "message": "more", "output": summary}])
+        reporter.add_result(0, "plain")
+        reporter.end_worker()
+        reporter.end_phase()
+        reporter.end_trial()
+
+        results = reporter.results["trials"][0]["phases"]["run"]["workers"][
+            "worker_0"
+        ]["results"]
+        assert [r.get("output") for r in results] == [summary, summary, None]
+
+    def test_spawned_details_are_recorded(self):
+        """Test that how a spawned command ended is kept with its result."""
+        spawned = {
+            "pid": 42,
+            "command": "sleep 30",
+            "phase": "run",
+            "runtime": 1.5,
+            "terminated": True,
+        }
+        reporter = JSONReporter()
+        reporter.start_trials(1, 1)
+        reporter.start_trial(1)
+        reporter.start_phase("reset")
+        reporter.start_worker("worker_0")
+        reporter.add_results([{"code": -15, "message": "gone", "spawned": spawned}])
+        reporter.end_worker()
+        reporter.end_phase()
+        reporter.end_trial()
+
+        results = reporter.results["trials"][0]["phases"]["reset"]["workers"][
+            "worker_0"
+        ]["results"]
+        assert results[0]["spawned"] == spawned
+
+
+class TestReporterUsage:
+    """Test results carrying the resource usage of their step."""
+
+    USAGE = {
+        "started": 10.0,
+        "ended": 10.5,
+        "wall": 0.5,
+        "user": 0.25,
+        "sys": 0.125,
+        "maxrss": 2048,
+        "nvcsw": 3,
+        "nivcsw": 1,
+        "stdout_bytes": 12,
+        "stderr_bytes": 0,
+    }
+
+    def test_usage_is_recorded(self):
+        """Test that usage is kept with single and batched results."""
+        reporter = JSONReporter()
+        reporter.start_trials(1, 1)
+        reporter.start_trial(1)
+        reporter.start_phase("run")
+        reporter.start_worker("worker_0")
+        reporter.add_result(0, "one", usage=self.USAGE)
+        reporter.add_results([{"code": 0, "message": "two", "usage": self.USAGE}])
+        reporter.end_worker()
+        reporter.end_phase()
+        reporter.end_trial()
+
+        results = reporter.results["trials"][0]["phases"]["run"]["workers"][
+            "worker_0"
+        ]["results"]
+        assert [r["usage"] for r in results] == [self.USAGE, self.USAGE]
+
+    def test_usage_is_tabulated_in_text_summary(self, tmp_path):
+        """Test that the text summary shows each result's usage."""
+        summary = tmp_path / "summary.txt"
+        reporter = TextReporter(str(summary))
+        reporter.start_trials(1, 1)
+        reporter.start_trial(1)
+        reporter.start_phase("run")
+        reporter.start_worker("worker_0")
+        reporter.add_results([{"code": 0, "message": "ok", "usage": self.USAGE}])
+        reporter.end_worker()
+        reporter.end_phase()
+        reporter.end_trial()
+        reporter.finalize()
+
+        assert (
+            "Wall: 0.500s, User: 0.250s, Sys: 0.125s, Max RSS: 2048 KB, "
+            "Switches: 3/1, Out: 12/0 bytes"
+        ) in summary.read_text()
+
+
+class TestReporterKilled:
+    """Test results listing the processes a timed-out step left behind."""
+
+    def test_killed_processes_in_text_summary(self, tmp_path):
+        """Test that the text summary names each killed process."""
+        summary = tmp_path / "summary.txt"
+        reporter = TextReporter(str(summary))
+        reporter.start_trials(1, 1)
+        reporter.start_trial(1)
+        reporter.start_phase("run")
+        reporter.start_worker("worker_0")
+        killed = [
+            {"pid": 41, "command": "/bin/sh -c iperf -c host", "signal": "SIGTERM"},
+            {"pid": 42, "command": "iperf -c host", "signal": "SIGKILL"},
+        ]
+        reporter.add_result(1, "Command timed out after 30 seconds", killed=killed)
+        reporter.end_worker()
+        reporter.end_phase()
+        reporter.end_trial()
+        reporter.finalize()
+
+        assert (
+            "Killed: 41 /bin/sh -c iperf -c host (SIGTERM), "
+            "42 iperf -c host (SIGKILL)"
+        ) in summary.read_text()
+
+
 class TestReporterFactory:
     """Test reporter factory function."""
 
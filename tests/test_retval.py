@@ -28,6 +28,34 @@ class TestRetValInitialization:
         assert retval.code == 1
         assert retval.message == "Error occurred"
 
+    def test_output_summary_is_sent_when_set(self):
+        """Test that a spooled output summary is part of the wire form."""
+        summary = {"spool": "1-1", "size": 10, "sha256": "00", "truncated": False}
+        assert RetVal(0, "ok").to_dict() == {"code": 0, "message": "ok"}
+        assert RetVal(0, "ok", summary).to_dict() == {
+            "code": 0,
+            "message": "ok",
+            "output": summary,
+        }
+
+    def test_usage_is_sent_when_set(self):
+        """Test that a step's resource usage is part of the wire form."""
+        usage = {"wall": 0.5, "user": 0.25, "sys": 0.125, "maxrss": 2048}
+        assert RetVal(0, "ok", usage=usage).to_dict() == {
+            "code": 0,
+            "message": "ok",
+            "usage": usage,
+        }
+
+    def test_killed_processes_are_sent_when_set(self):
+        """Test that the processes a timeout stopped are part of the wire form."""
+        killed = [{"pid": 42, "command": "sleep 30", "signal": "SIGTERM"}]
+        assert RetVal(1, "timed out", killed=killed).to_dict() == {
+            "code": 1,
+            "message": "timed out",
+            "killed": killed,
+        }
+
     def test_constants_are_correct(self):
         """Test that constants have correct values."""
         assert RETVAL_OK == 0
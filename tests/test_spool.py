@@ -0,0 +1,110 @@
+"""Tests for player-side output spooling."""
+
+import hashlib
+import os
+
+import pytest
+
+from conductor.spool import OutputSpool
+
+
+class TestSpoolWriter:
+    """Test writing step output to a spool file."""
+
+    def test_small_output_is_returned_whole(self, tmp_path):
+        """Test that output within the excerpt is kept in full."""
+        spool = OutputSpool(str(tmp_path), excerpt_bytes=16)
+        writer = spool.open()
+        writer.write(b"hello ")
+        writer.write(b"world\n")
+
+        excerpt, summary = writer.close()
+
+        assert excerpt == "hello world\n"
+        assert summary == {
+            "spool": writer.spool_id,
+            "size": 12,
+            "sha256": hashlib.sha256(b"hello world\n").hexdigest(),
+            "truncated": False,
+        }
+        assert (tmp_path / f"{writer.spool_id}.out").read_bytes() == b"hello world\n"
+
+    def test_large_output_keeps_head_and_tail(self, tmp_path):
+        """Test that only both ends of long output are kept in memory."""
+        spool = OutputSpool(str(tmp_path), excerpt_bytes=4)
+        writer = spool.open()
+        for piece in (b"ab", b"cdef", b"ghij", b"klmnop"):
+            writer.write(piece)
+
+        excerpt, summary = writer.close()
+
+        assert excerpt == "abcd\n[... 8 bytes omitted ...]\nmnop"
+        assert summary["size"] == 16
+        assert summary["truncated"] is True
+        assert len(writer.tail) == 4
+
+    def test_each_step_gets_its_own_file(self, tmp_path):
+        """Test that spool IDs are unique within a player."""
+        spool = OutputSpool(str(tmp_path))
+        first, second = spool.open(), spool.open()
+        first.close()
+        second.close()
+
+        assert first.spool_id != second.spool_id
+        assert first.spool_id.startswith(f"{os.getpid()}-")
+
+
+class TestSpoolRead:
+    """Test ranged reads of spool files."""
+
+    def make_spool(self, tmp_path, data):
+        spool = OutputSpool(str(tmp_path))
+        writer = spool.open()
+        writer.write(data)
+        writer.close()
+        return spool, writer.spool_id
+
+    def test_reads_a_range_in_chunks(self, tmp_path):
+        """Test that a range is returned in chunks of the given size."""
+        spool, spool_id = self.make_spool(tmp_path, b"0123456789")
+
+        length, chunks = spool.read(spool_id, 2, 5, chunk_size=2)
+
+        assert length == 5
+        assert list(chunks) == [b"23", b"45", b"6"]
+
+    def test_range_is_clipped_to_the_file(self, tmp_path):
+        """Test that reading past the end returns what there is."""
+        spool, spool_id = self.make_spool(tmp_path, b"0123456789")
+
+        assert spool.read(spool_id, 8)[0] == 2
+        assert b"".join(spool.read(spool_id, 8, 100)[1]) == b"89"
+        assert spool.read(spool_id, 50)[0] == 0
+
+    def test_unknown_and_unsafe_ids_are_refused(self, tmp_path):
+        """Test that only files this spool names can be read."""
+        spool, _ = self.make_spool(tmp_path, b"x")
+
+        with pytest.raises(KeyError):
+            spool.read("1-999")
+        with pytest.raises(KeyError):
+            spool.read("../../etc/passwd")
+        with pytest.raises(KeyError):
+            spool.read(None)
+
+    def test_negative_offset_is_refused(self, tmp_path):
+        """Test that a negative offset is an error."""
+        spool, spool_id = self.make_spool(tmp_path, b"x")
+
+        with pytest.raises(ValueError):
+            spool.read(spool_id, -1)
+
+    def test_clear_removes_files(self, tmp_path):
+        """Test that clear() deletes the spool files it created."""
+        spool, spool_id = self.make_spool(tmp_path, b"x")
+
+        spool.clear()
+
+        assert list(tmp_path.iterdir()) == []
+        with pytest.raises(KeyError):
+            spool.read(spool_id)
@@ -1,10 +1,16 @@
 """Tests for the Step class."""
 
 from unittest.mock import patch, MagicMock
+import asyncio
+import os
+import shlex
 import subprocess
+import sys
+import time
 
-from conductor.step import Step
+from conductor.step import Step, MAX_OUTPUT_CHUNK, needs_shell
 from conductor.retval import RetVal
+from conductor.spool import OutputSpool
 
 
 class TestStepParsing:
@@ -42,10 +48,11 @@ class TestStepParsing:
 class TestStepExecution:
     """Test command execution functionality of Step class."""
 
-    @patch("subprocess.check_output")
-    def test_executes_simple_command_successfully(self, mock_check_output):
+    @patch("conductor.accounting.AccountedPopen")
+    def test_executes_simple_command_successfully(self, mock_popen):
         """Test successful execution of a simple command."""
-        mock_check_output.return_value = "hello world\n"
+        mock_popen.return_value.communicate.return_value = (b"hello world\n", b"")
+        mock_popen.return_value.returncode = 0
 
         step = Step("echo hello world")
         result = step.run()
@@ -53,13 +60,14 @@ class TestStepExecution:
         assert isinstance(result, RetVal)
         assert result.code == 0
         assert result.message == "hello world\n"
-        mock_check_output.assert_called_once_with(
-            "echo hello world",
-            shell=True,
-            timeout=30,
-            universal_newlines=True,
-            errors="replace",
+        mock_popen.assert_called_once_with(
+            ["echo", "hello", "world"],
+            shell=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
         )
+        mock_popen.return_value.communicate.assert_called_once_with(timeout=30)
 
     @patch("subprocess.Popen")
     def test_spawns_command_without_waiting(self, mock_popen):
@@ -78,12 +86,11 @@ class TestStepExecution:
         mock_process.wait.assert_not_called()
         mock_process.communicate.assert_not_called()
 
-    @patch("subprocess.check_output")
-    def test_handles_command_failure(self, mock_check_output):
+    @patch("conductor.accounting.AccountedPopen")
+    def test_handles_command_failure(self, mock_popen):
         """Test handling of command that returns non-zero exit code."""
-        mock_check_output.side_effect = subprocess.CalledProcessError(
-            returncode=1, cmd="false", output="error output"
-        )
+        mock_popen.return_value.communicate.return_value = (b"error output", b"")
+        mock_popen.return_value.returncode = 1
 
         step = Step("false")
         result = step.run()
@@ -92,16 +99,272 @@ class TestStepExecution:
         assert result.code == 1
         assert result.message == "false"
 
-    @patch("subprocess.check_output")
-    def test_handles_command_timeout(self, mock_check_output):
+    @patch("conductor.accounting.AccountedPopen")
+    def test_handles_command_timeout(self, mock_popen):
         """Test handling of command timeout."""
-        mock_check_output.side_effect = subprocess.TimeoutExpired(
+        mock_popen.return_value.communicate.side_effect = subprocess.TimeoutExpired(
             cmd=["sleep", "100"], timeout=1
         )
 
         step = Step("sleep 100", timeout=1)
         result = step.run()
 
+        mock_popen.return_value.kill.assert_called_once_with()
         assert isinstance(result, RetVal)
         assert result.code == 1  # RETVAL_ERROR
         assert result.message == f"Command timed out after {step.timeout} seconds"
+
+
+class TestStepDirectExec:
+    """Test exec'ing plain commands without a shell."""
+
+    def test_plain_commands_need_no_shell(self):
+        """Test which commands can be exec'd directly."""
+        assert needs_shell("echo hello") is False
+        assert needs_shell('echo "hello world"') is False
+        assert needs_shell("dd if=/dev/zero of=/dev/null count=1") is False
+
+    def test_shell_syntax_needs_a_shell(self):
+        """Test that anything the shell interprets goes through it."""
+        for command in [
+            "ls | wc -l",
+            "echo $HOME",
+            "echo hi > /tmp/out",
+            "sleep 1 &",
+            "ls *.py",
+            "FOO=1 env",
+            "cd /tmp",
+            "exit 3",
+            'echo "unclosed',
+            "",
+        ]:
+            assert needs_shell(command) is True, command
+
+    @patch("conductor.accounting.AccountedPopen")
+    def test_shell_commands_keep_the_command_string(self, mock_popen):
+        """Test that a command with shell syntax is given to the shell."""
+        mock_popen.return_value.communicate.return_value = (b"1\n", b"")
+        mock_popen.return_value.returncode = 0
+
+        Step("echo hello | wc -l").run()
+
+        mock_popen.assert_called_once_with(
+            "echo hello | wc -l",
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+
+    def test_direct_and_shell_results_match(self):
+        """Test that both paths give the same results."""
+        for command in ['printf "%s," "a b" c', "false"]:
+            direct = Step(command)
+            shell = Step(command)
+            shell.shell = True
+            assert direct.shell is False
+            for run in (lambda s: s.run(), lambda s: asyncio.run(s.async_run())):
+                ours, theirs = run(direct), run(shell)
+                assert (ours.code, ours.message) == (theirs.code, theirs.message)
+
+    def test_missing_command_is_reported(self):
+        """Test that a binary that does not exist fails the step."""
+        step = Step("nonexistent_command_12345 --flag")
+
+        for result in (step.run(), asyncio.run(step.async_run())):
+            assert result.code == 1  # RETVAL_ERROR
+            assert result.message == "Command not found: nonexistent_command_12345"
+
+
+class TestStepUsage:
+    """Test the resource usage reported with step results."""
+
+    def test_usage_is_reported_by_both_engines(self):
+        """Test that both engines account for the command and its output."""
+        step = Step("printf hello")
+
+        for result in (step.run(), asyncio.run(step.async_run())):
+            assert result.code == 0
+            assert result.usage["stdout_bytes"] == 5
+            assert result.usage["stderr_bytes"] == 0
+            assert result.usage["wall"] >= 0
+            assert result.usage["maxrss"] > 0
+            assert result.to_dict()["usage"] == result.usage
+
+    def test_failed_and_timed_out_steps_have_usage(self):
+        """Test that usage is reported however the command ended."""
+        failed = Step("false")
+        slow = Step("sleep 10", timeout=0.2)
+
+        for result in (failed.run(), asyncio.run(failed.async_run())):
+            assert result.code == 1
+            assert "wall" in result.usage
+        for result in (slow.run(), asyncio.run(slow.async_run())):
+            assert result.message == "Command timed out after 0.2 seconds"
+            assert result.usage["wall"] < 5
+            assert "stdout_bytes" not in result.usage
+
+
+class TestStepTimeoutKillsGroup:
+    """Test that a timed-out step takes everything it started with it."""
+
+    def test_grandchildren_are_killed_and_reported(self, tmp_path):
+        """Test both engines stop the shell's children and list them."""
+        for engine in ("thread", "asyncio"):
+            pidfile = tmp_path / f"{engine}.pid"
+            step = Step(
+                f"sleep 30 & echo $! > {pidfile}; wait", timeout=0.3, kill_grace=1
+            )
+
+            start = time.monotonic()
+            if engine == "thread":
+                result = step.run()
+            else:
+                result = asyncio.run(step.async_run())
+
+            assert time.monotonic() - start < 5, engine
+            assert result.message == "Command timed out after 0.3 seconds"
+            child = int(pidfile.read_text())
+            assert {"pid": child, "command": "sleep 30", "signal": "SIGTERM"} in (
+                result.killed
+            ), engine
+            assert len(result.killed) == 2, engine
+            assert result.to_dict()["killed"] == result.killed
+            time.sleep(0.1)
+            try:
+                os.kill(child, 0)
+                alive = open(f"/proc/{child}/stat").read().split(")")[-1].split()[0]
+            except (ProcessLookupError, FileNotFoundError):
+                alive = None
+            assert alive in (None, "Z"), engine
+
+    def test_stubborn_children_get_sigkill_after_grace(self):
+        """Test that processes ignoring SIGTERM are killed after kill_grace."""
+        step = Step("trap '' TERM; sleep 30", timeout=0.2, kill_grace=0.3)
+
+        start = time.monotonic()
+        result = step.run()
+
+        assert 0.5 <= time.monotonic() - start < 5
+        assert {process["signal"] for process in result.killed} == {"SIGKILL"}
+
+
+class TestStepAsyncExecution:
+    """Test running steps as coroutines with asyncio subprocesses."""
+
+    def test_captures_output(self):
+        """Test that a successful command returns its stdout."""
+        result = asyncio.run(Step("echo hello world").async_run())
+
+        assert result.code == 0
+        assert result.message == "hello world\n"
+
+    def test_handles_command_failure(self):
+        """Test that a non-zero exit reports the code and the command."""
+        result = asyncio.run(Step("exit 3").async_run())
+
+        assert result.code == 3
+        assert result.message == "exit 3"
+
+    def test_handles_command_timeout(self):
+        """Test that the timeout is enforced by the event loop."""
+        step = Step("sleep 10", timeout=0.2)
+
+        start = time.monotonic()
+        result = asyncio.run(step.async_run())
+
+        assert time.monotonic() - start < 5
+        assert result.code == 1  # RETVAL_ERROR
+        assert result.message == "Command timed out after 0.2 seconds"
+
+    def test_large_output_on_both_pipes(self, capfd):
+        """Test that filling stdout and stderr together does not deadlock."""
+        command = (
+            f"{shlex.quote(sys.executable)} -c "
+            "\"import sys; sys.stderr.write('e' * 200000); "
+            "sys.stdout.write('o' * 200000)\""
+        )
+
+        result = asyncio.run(Step(command, timeout=10).async_run())
+
+        assert result.code == 0
+        assert result.message == "o" * 200000
+        assert "e" * 200000 in capfd.readouterr().err
+
+    @patch("subprocess.Popen")
+    def test_spawn_does_not_wait(self, mock_popen):
+        """Test that spawned commands outlive the event loop."""
+        result = asyncio.run(Step("iperf -s", spawn=True).async_run())
+
+        assert result.code == 0
+        assert result.message == "Spawned"
+        mock_popen.assert_called_once_with("iperf -s", shell=True)
+
+
+class TestStepOutputStreaming:
+    """Test passing step output on line by line."""
+
+    def run_streaming(self, step, engine_async=False):
+        """Run step with an output callback, returning (result, lines)."""
+        lines = []
+        output = lambda stream, line: lines.append((stream, line))
+        if engine_async:
+            result = asyncio.run(step.async_run(output))
+        else:
+            result = step.run(output)
+        return result, lines
+
+    def test_lines_are_passed_on_not_returned(self):
+        """Test that each line reaches the callback and none is kept."""
+        result, lines = self.run_streaming(Step("echo one; echo two; printf three"))
+
+        assert result.code == 0
+        assert result.message == ""
+        assert lines == [("stdout", "one\n"), ("stdout", "two\n"), ("stdout", "three")]
+
+    def test_stderr_is_streamed_too(self):
+        """Test that stderr lines are marked as such."""
+        result, lines = self.run_streaming(Step("echo bad >&2; exit 4"), True)
+
+        assert (result.code, result.message) == (4, "echo bad >&2; exit 4")
+        assert lines == [("stderr", "bad\n")]
+
+    def test_long_lines_are_split(self):
+        """Test that a line longer than the chunk size arrives in pieces."""
+        size = MAX_OUTPUT_CHUNK * 2 + 10
+        command = f"{shlex.quote(sys.executable)} -c \"print('x' * {size})\""
+
+        result, lines = self.run_streaming(Step(command, timeout=10))
+
+        assert result.code == 0
+        assert [len(line) for _, line in lines] == [
+            MAX_OUTPUT_CHUNK,
+            MAX_OUTPUT_CHUNK,
+            11,
+        ]
+
+
+class TestStepOutputSpooling:
+    """Test writing step output to a spool file."""
+
+    def test_output_is_spooled_with_an_excerpt(self, tmp_path):
+        """Test that stdout goes to the spool and only an excerpt returns."""
+        spool = OutputSpool(str(tmp_path), excerpt_bytes=4)
+
+        result = Step("printf 0123456789").run(spool=spool)
+
+        assert result.code == 0
+        assert result.message == "0123\n[... 2 bytes omitted ...]\n6789"
+        assert result.output["size"] == 10
+        assert result.output["truncated"] is True
+        length, chunks = spool.read(result.output["spool"])
+        assert b"".join(chunks) == b"0123456789"
+
+    def test_failed_step_keeps_its_summary(self, tmp_path):
+        """Test that a failing step's output can still be fetched."""
+        spool = OutputSpool(str(tmp_path))
+
+        result = asyncio.run(Step("echo partial; exit 5").async_run(spool=spool))
+
+        assert (result.code, result.message) == (5, "echo partial; exit 5")
+        assert result.output["size"] == len("partial\n")